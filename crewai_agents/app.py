@@ -1,53 +1,765 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File
-from pydantic import BaseModel
-from typing import List
+from fastapi import FastAPI, HTTPException, Request, UploadFile, File
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
 import os
-import shutil
-from crewai import llm
-from utils import create_data_analysis_crew
+import time
+import asyncio
+import logging
+import threading
+import functools
+from datetime import datetime, timezone
+from contextlib import asynccontextmanager, nullcontext
+from settings import config
+from file_hashes import content_hash
+from result_cache import ResultCache, context_hash
+from uploads import place_content, save_stream, save_upload
+from schema_index import SchemaIndex, list_knowledge_files, is_tabular
+from crew_registry import CrewRegistry
+from jobs import JobManager, QueueFullError, FAILED, TIMED_OUT, SUCCEEDED, FINISHED_STATES
+from progress import ProgressChannel, crew_progress, format_sse
+from fast_path import FastPathStats, try_fast_path, phrase_answer
+from tracing import Trace, metrics, record_span, span, use_trace
+from columnar import convert_csv, read_table
+from sessions import WorkspaceManager
+from batch import group_questions, run_batch
+from llm_backends import limit_llm_calls
+from budgets import AgentLimits, RequestBudget, load_agent_limits, partial_report, use_budget
 
-app = FastAPI()
+logger = logging.getLogger(__name__)
+
+
+def analysis_runtime():
+    """The crewai-based part of the service: LLM pool, knowledge indexes and crew building (utils).
+
+    Importing it takes seconds, so the server loads it in the background after
+    startup (see load_runtime) instead of when this module is imported.
+    """
+    import utils
+    return utils
+
+
+def create_data_analysis_crew(knowledge_files):
+    return analysis_runtime().create_data_analysis_crew(knowledge_files)
+
+
+def load_runtime(app: FastAPI):
+    """Imports crewai and creates the services built on it; runs on a background thread at startup."""
+    started = time.perf_counter()
+    runtime = analysis_runtime()
+    from map_reduce import MapReduceAnalyzer
+    if config.get("result_cache_similarity_threshold"):
+        app.state.result_cache.embedder = runtime.embedding_function()
+    app.state.map_reduce = MapReduceAnalyzer(runtime.llm, config.get("columnar_dir", ".columnar"),
+                                             processes=config.get("map_reduce_processes"),
+                                             llm_concurrency=config.get("map_reduce_llm_concurrency", 2),
+                                             partition_rows=config.get("map_reduce_partition_rows", 50_000),
+                                             max_partitions=config.get("map_reduce_max_partitions", 32),
+                                             partition_tokens=config.get("map_reduce_partition_tokens", 1200),
+                                             reduce_tokens=config.get("map_reduce_reduce_tokens", 3000))
+    runtime.llm_pool.start_keep_alive(config.get("llm_keep_alive_refresh_seconds", 120))
+    runtime.llm_pool.start_health_checks(config.get("llm_health_check_seconds", 15))
+    logger.info("Analysis runtime loaded in %.2fs", time.perf_counter() - started)
+    return runtime
+
+
+async def start_runtime(app: FastAPI):
+    """Loads the runtime, then warms the models and crews without holding up requests."""
+    loop = asyncio.get_running_loop()
+    runtime = await loop.run_in_executor(None, load_runtime, app)
+    if config.get("llm_warm_up", True):
+        # Load the models into Ollama before the first question instead of during it.
+        loop.run_in_executor(None, runtime.llm_pool.warm, runtime.configured_models())
+    knowledge_files = tuple(list_knowledge_files("knowledge"))
+    if knowledge_files:
+        # Every file is indexed separately, so crews for any routed subset reuse these indexes later.
+        loop.run_in_executor(None, app.state.crew_registry.warm, knowledge_files)
+    return runtime
+
+
+async def runtime_ready():
+    """Waits until the background runtime load has finished, re-raising its error if it failed."""
+    return await asyncio.shield(app.state.runtime)
+
+
+def knowledge_paths(knowledge_files) -> list:
+    """Paths of a crew's knowledge file key (one name or a tuple of names)."""
+    files = [knowledge_files] if isinstance(knowledge_files, str) else knowledge_files
+    return [os.path.join("knowledge", f) for f in files]
+
+
+def workspace_memory_bytes(workspace) -> int:
+    """Bytes a session's crews (knowledge indexes) and loaded datasets take in memory."""
+    crews = app.state.crew_registry.memory_bytes(lambda key: workspace.contains(knowledge_paths(key)))
+    return crews + analysis_runtime().dataset_profiles.memory_bytes(workspace.contains)
+
+
+def release_workspace(workspace) -> None:
+    """Drops a session's crews and datasets from memory; they reload from the disk caches on next use."""
+    app.state.crew_registry.evict(lambda key: workspace.contains(knowledge_paths(key)))
+    analysis_runtime().dataset_profiles.evict(workspace.contains)
+
+
+def session_workspace(session_id: Optional[str]):
+    """The workspace of a session id, None without one; 404 for unknown or expired sessions."""
+    if not session_id:
+        return None
+    workspace = app.state.workspaces.get(session_id)
+    if workspace is None:
+        raise HTTPException(status_code=404,
+                            detail=f"Session {session_id} not found or expired. Upload the files again.")
+    return workspace
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Only cheap state is created here: the server binds its socket and answers health
+    # checks while crewai loads in the background, which matters for autoscaled cold starts.
+    # Resolve the builder at call time so it can be swapped (e.g. patched in tests).
+    app.state.crew_registry = CrewRegistry(lambda knowledge_file: create_data_analysis_crew(knowledge_file),
+                                           lambda knowledge_file: analysis_runtime().crew_source_files(knowledge_file),
+                                           lambda crew: analysis_runtime().crew_memory_bytes(crew))
+    app.state.job_manager = JobManager(max_workers=config.get("analysis_workers", 1),
+                                       max_queued=config.get("analysis_queue_size", 8),
+                                       timeout=config.get("analysis_timeout_seconds", 600))
+    app.state.result_cache = ResultCache(max_entries=config.get("result_cache_max_entries", 256),
+                                         ttl_seconds=config.get("result_cache_ttl_seconds", 3600),
+                                         persist_path=config.get("result_cache_path"),
+                                         similarity_threshold=config.get("result_cache_similarity_threshold"))
+    app.state.schema_index = SchemaIndex("knowledge")
+    app.state.fast_path_stats = FastPathStats()
+    app.state.workspaces = WorkspaceManager("knowledge",
+                                            memory_budget_bytes=config.get("session_memory_budget_mb", 1024) << 20,
+                                            idle_seconds=config.get("session_idle_seconds", 3600),
+                                            measure=workspace_memory_bytes, release=release_workspace)
+    app.state.runtime = asyncio.create_task(start_runtime(app))
+    yield
+    app.state.job_manager.shutdown()
+    app.state.crew_registry.clear()
+    if app.state.runtime.done() and not app.state.runtime.cancelled() and not app.state.runtime.exception():
+        app.state.map_reduce.close()
+        app.state.runtime.result().llm_pool.close(unload=config.get("llm_unload_on_shutdown", False))
+
+
+app = FastAPI(lifespan=lifespan)
 
 class QueryInput(BaseModel):
     query: str
+    include_timings: bool = False
+    # "auto" uses map-reduce for CSVs of at least map_reduce_min_rows rows.
+    mode: Literal["auto", "crew", "map_reduce"] = "auto"
+    # Analyses the files uploaded to this session (see POST /sessions) instead of the shared knowledge folder.
+    session_id: Optional[str] = None
+    # Seconds the crew may run before it stops and returns a partial result; defaults to analysis_deadline_seconds.
+    deadline_seconds: Optional[float] = Field(default=None, gt=0)
 
 @app.post("/upload_files")
-async def upload_files(files: List[UploadFile] = File(...)):
-    """Endpoint to upload multiple files to the knowledge folder."""
+async def upload_files(files: List[UploadFile] = File(...), session_id: Optional[str] = None):
+    """Endpoint to upload multiple files to the knowledge folder, or to a session's workspace.
+
+    Files are streamed to disk and hashed on the way; identical re-uploads are
+    skipped. CSV files are converted to a columnar copy and profiled right away so
+    the Dataset Query tool is ready for the first question.
+    """
+    workspace = session_workspace(session_id)
+    # Checked for all files first, so a bad name in the batch leaves nothing half uploaded.
+    file_paths = [upload_path(file.filename, workspace) for file in files]
+    runtime = await runtime_ready()
     upload_paths = []
-    for file in files:
-        file_path = os.path.join("knowledge", file.filename)
+    profiles = {}
+    hashes = {}
+    skipped = []
+    for file, file_path in zip(files, file_paths):
         try:
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
+            file_hash, _, was_skipped = await save_upload(file, file_path)
             upload_paths.append(file_path)
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error uploading {file.filename}: {str(e)}")
-    return {"filenames": [file.filename for file in files], "paths": upload_paths}
+        hashes[file.filename] = file_hash
+        if was_skipped:
+            skipped.append(file.filename)
+        profile = await profile_upload(runtime, file.filename, file_path)
+        if profile is not None:
+            profiles[file.filename] = profile
+    if workspace:
+        await asyncio.to_thread(app.state.workspaces.loaded, workspace)
+    return {"filenames": [file.filename for file in files], "paths": upload_paths, "profiles": profiles,
+            "hashes": hashes, "skipped": skipped, "session_id": session_id}
 
-@app.post("/analyze_data")
-async def analyze_data(input_data: QueryInput):
-    user_query = input_data.query
+async def profile_upload(runtime, file_name: str, file_path: str) -> Optional[dict]:
+    """Profiles an uploaded table right away so the Dataset Query tool is ready; None for other files."""
+    if not is_tabular(file_name):
+        return None
+    try:
+        profile = await asyncio.to_thread(runtime.dataset_profiles.get, file_path)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Could not parse {file_name} as a table: {str(e)}")
+    return {"rows": len(profile.df), "columns": list(profile.columns)}
 
-    # Dynamically determine the CSV file path from the knowledge folder
-    csv_files = [f for f in os.listdir("knowledge") if f.endswith(".csv")]
 
-    if not csv_files:
-        raise HTTPException(status_code=404, detail="No CSV file found in the knowledge folder. Please upload one.")
-    else:
-        csv_file_path = os.path.join("", csv_files[0])
+def upload_path(file_name: str, workspace) -> str:
+    """Where an uploaded file goes: the session's workspace, or the shared knowledge folder."""
+    if not file_name or os.path.basename(file_name) != file_name or file_name.startswith("."):
+        raise HTTPException(status_code=400, detail=f"Invalid file name: {file_name}")
+    return os.path.join(workspace.knowledge_dir if workspace else "knowledge", file_name)
+
+
+class UploadManifestEntry(BaseModel):
+    name: str
+    sha256: str = Field(pattern=r"^[0-9a-fA-F]{64}$")
+
 
+class UploadCheckInput(BaseModel):
+    files: List[UploadManifestEntry] = Field(min_length=1)
+    session_id: Optional[str] = None
+
+
+@app.post("/upload_files/check")
+async def check_uploads(input_data: UploadCheckInput):
+    """First step of a hash-first upload: reports which files the server already has.
+
+    A file whose content is already stored under its name is left untouched
+    ("present"), so nothing derived from it is rebuilt. Content the server holds
+    under another name, in the same folder or the shared knowledge folder, is
+    copied into place ("copied"). Only the "missing" files need to be sent, with
+    PUT /upload_files/{file_name}.
+    """
+    workspace = session_workspace(input_data.session_id)
+    runtime = await runtime_ready()
+    directories = [workspace.knowledge_dir, "knowledge"] if workspace else ["knowledge"]
+    placed = {"present": [], "copied": [], "missing": []}
+    profiles = {}
+    for entry in input_data.files:
+        file_path = upload_path(entry.name, workspace)
+        outcome = await asyncio.to_thread(place_content, entry.sha256, file_path, directories)
+        placed[outcome or "missing"].append(entry.name)
+        if outcome is not None:
+            profile = await profile_upload(runtime, entry.name, file_path)
+            if profile is not None:
+                profiles[entry.name] = profile
+    if workspace and placed["copied"]:
+        await asyncio.to_thread(app.state.workspaces.loaded, workspace)
+    return {**placed, "profiles": profiles, "session_id": input_data.session_id}
+
+
+@app.put("/upload_files/{file_name}")
+async def put_upload(file_name: str, request: Request, sha256: Optional[str] = None,
+                     session_id: Optional[str] = None):
+    """Second step of a hash-first upload: stores one file sent as the raw (e.g. chunked) request body.
+
+    With sha256, content that hashes differently is rejected with 400 and not kept.
+    """
+    workspace = session_workspace(session_id)
+    file_path = upload_path(file_name, workspace)
+    runtime = await runtime_ready()
     try:
-        crew = create_data_analysis_crew( csv_file_path)
-        result = crew.kickoff(inputs={"question": user_query})
-        return {"result": result.raw}
-    except FileNotFoundError as e:
-        raise HTTPException(status_code=404, detail=str(e))
+        file_hash, size, skipped = await save_stream(request.stream(), file_path, sha256)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"CrewAI execution failed: {str(e)}")
-    
+        raise HTTPException(status_code=500, detail=f"Error uploading {file_name}: {str(e)}")
+    profile = await profile_upload(runtime, file_name, file_path)
+    if workspace:
+        await asyncio.to_thread(app.state.workspaces.loaded, workspace)
+    return {"filename": file_name, "path": file_path, "hash": file_hash, "size": size, "skipped": skipped,
+            "profile": profile, "session_id": session_id}
+
+
+def analysis_context(knowledge_files: tuple, large_file: Optional[str] = None) -> str:
+    """Hashes the datasets, crew configuration and route that a cached answer is only valid for.
+
+    large_file is the file map-reduce analyses instead of the crew, so a crew
+    answer is never served to a map_reduce request for the same question, or
+    the other way round.
+    """
+    file_hashes = {f: content_hash(os.path.join("knowledge", f)) for f in knowledge_files}
+    route = f"map_reduce:{large_file}" if large_file else "crew"
+    return context_hash(file_hashes, analysis_runtime().crew_fingerprint(), route)
+
+
+def request_budget(deadline_seconds: Optional[float] = None) -> RequestBudget:
+    """A fresh budget for one crew run: its deadline plus the per-agent limits in agents.yml."""
+    defaults = AgentLimits(config.get("max_llm_calls_per_agent"), config.get("max_delegations_per_agent"))
+    return RequestBudget(deadline_seconds or config.get("analysis_deadline_seconds"),
+                         load_agent_limits(config['agent_name'], defaults), defaults)
+
+
+def run_crew(knowledge_files: tuple, user_query: str, check_cancelled, channel=None, budget=None):
+    """Runs a copy of the crew for these files on one query.
+
+    Returns the crew, its raw output and, if the budget ran out before the crew
+    finished, a summary of what was left undone; the output is then the best
+    partial report (see budgets.partial_report) instead of an error.
+    """
+    with span("get_crew"):
+        crew = app.state.crew_registry.get_crew(knowledge_files)
+    crew.step_callback = check_cancelled
+    started = time.perf_counter()
+    with span("kickoff"), crew_progress(crew, channel) if channel else nullcontext(), use_budget(budget):
+        try:
+            raw, partial = crew.kickoff(inputs={"question": user_query}).raw, None
+        except Exception:
+            if budget is None or budget.exhausted is None:
+                raise
+            raw, partial = partial_report(budget, crew.tasks)
+            logger.warning("Returning a partial result for %r: %s", user_query, partial["reason"])
+    app.state.fast_path_stats.record_crew_run(time.perf_counter() - started)
+    return crew, raw, partial
+
+
+def run_analysis(job, knowledge_files: tuple, user_query: str, channel=None, cache_context=None, trace=None,
+                 deadline_seconds: Optional[float] = None):
+    """Runs the crew for one query; executed on a job worker thread.
+
+    Stage and crewai event spans are recorded into trace, when given, and attached to the job.
+    A partial result (the budget ran out) is marked on the job and not cached.
+    """
+    with use_trace(trace):
+        record_span("queue_wait", datetime.fromtimestamp(job.created_at, timezone.utc),
+                    job.started_at - job.created_at)
+        crew, result, job.partial = run_crew(knowledge_files, user_query, job.check_cancelled, channel,
+                                             request_budget(deadline_seconds))
+    if trace is not None:
+        job.timings = trace.breakdown()
+    job.token_usage = [task.token_report for task in crew.tasks if getattr(task, "token_report", None)]
+    if cache_context and job.partial is None:
+        app.state.result_cache.put(user_query, cache_context, result)
+    return result
+
+
+def run_map_reduce(job, file_name: str, user_query: str, channel=None, cache_context=None, trace=None):
+    """Analyses one large CSV partition by partition; executed on a job worker thread."""
+    def on_partition(part, done, total):
+        channel.publish("partition_completed", {"partition": part["label"], "rows": part["rows"],
+                                                "done": done, "total": total})
+
+    with use_trace(trace):
+        record_span("queue_wait", datetime.fromtimestamp(job.created_at, timezone.utc),
+                    job.started_at - job.created_at)
+        with span("map_reduce"):
+            outcome = app.state.map_reduce.run(os.path.join("knowledge", file_name), user_query,
+                                               partition_by=config.get("map_reduce_partition_by"),
+                                               check_cancelled=job.check_cancelled,
+                                               on_partition=on_partition if channel else None)
+    logger.info("Map-reduce answered %r from %s (%d rows, %d partitions) in %.3fs", user_query, file_name,
+                outcome["rows"], len(outcome["partitions"]), outcome["total_seconds"])
+    if trace is not None:
+        job.timings = trace.breakdown()
+    if cache_context:
+        app.state.result_cache.put(user_query, cache_context, outcome["report"])
+    return outcome["report"]
+
+
+def map_reduce_file(knowledge_files: tuple, mode: str):
+    """Picks the CSV to analyse by map-reduce, or returns None to run the crew.
+
+    In auto mode that is the largest routed CSV if it has at least map_reduce_min_rows rows.
+    """
+    if mode == "crew":
+        return None
+    csv_files = [f for f in knowledge_files if f.lower().endswith(".csv")]
+    if not csv_files:
+        if mode == "map_reduce":
+            raise HTTPException(status_code=400, detail="Map-reduce analysis needs a CSV file in the knowledge folder.")
+        return None
+    columnar_dir = config.get("columnar_dir", ".columnar")
+    # Row counts come from the memory-mapped columnar copies, without loading the data.
+    rows = {f: read_table(convert_csv(os.path.join("knowledge", f), columnar_dir)).num_rows for f in csv_files}
+    largest = max(csv_files, key=rows.get)
+    if mode == "map_reduce" or rows[largest] >= config.get("map_reduce_min_rows", 100_000):
+        return largest
+    return None
+
+
+def job_error(error: Exception):
+    """Maps a failed job's exception to the HTTP error the synchronous API used to return."""
+    if isinstance(error, FileNotFoundError):
+        return HTTPException(status_code=404, detail=str(error))
+    if isinstance(error, ValueError):
+        return HTTPException(status_code=400, detail=str(error))
+    if isinstance(error, TimeoutError):
+        return HTTPException(status_code=504, detail=str(error))
+    return HTTPException(status_code=500, detail=f"CrewAI execution failed: {str(error)}")
+
+
+def answer_with_fast_path(knowledge_files: tuple, user_query: str):
+    """Answers simple aggregate questions straight from the dataset profiles, or returns None."""
+    if not config.get("fast_path_enabled", True):
+        return None
+    started = time.perf_counter()
+    runtime = analysis_runtime()
+    try:
+        profiles = {f: runtime.dataset_profiles.get(os.path.join("knowledge", f))
+                    for f in knowledge_files if is_tabular(f)}
+    except Exception:
+        logger.exception("Could not profile %s for the fast path", knowledge_files)
+        return None
+    phrase = (lambda question, computed: phrase_answer(runtime.llm, question, computed)) \
+        if config.get("fast_path_llm_phrasing", False) else None
+    answered = try_fast_path(user_query, profiles, phrase)
+    if answered is None:
+        return None
+    result, plan, file_name = answered
+    elapsed = time.perf_counter() - started
+    app.state.fast_path_stats.record_fast_path(elapsed)
+    logger.info("Fast path answered %r from %s with %s in %.3fs", user_query, file_name, plan.to_dict(), elapsed)
+    return result
+
+
+def job_finished(channel=None, workspace=None):
+    """Callback for a finished job: ends its progress stream and updates its session's memory use."""
+    if channel is None and workspace is None:
+        return None
+
+    def on_finish(job):
+        if workspace is not None:
+            app.state.workspaces.loaded(workspace)
+        if channel is not None:
+            channel.publish("done", {})
+    return on_finish
+
+
+async def submit_analysis(user_query: str, channel=None, include_timings: bool = False, mode: str = "auto",
+                          session_id: Optional[str] = None, deadline_seconds: Optional[float] = None):
+    """Validates that there is data to analyze and queues the analysis job.
+
+    Answers already in the result cache, and simple aggregate questions the fast
+    path can compute directly, come back as an already-finished job without
+    taking a worker or queue slot. Large CSVs are analysed by map-reduce instead
+    of the crew (see map_reduce_file). With include_timings the job carries a
+    per-stage timing breakdown once finished. With a session_id only that
+    session's files are considered. deadline_seconds overrides how long the crew
+    may run before it returns a partial result.
+    """
+    workspace = session_workspace(session_id)
+    trace = Trace()
+    with use_trace(trace):
+        # Questions that arrive while crewai is still loading wait for it here.
+        with span("runtime_ready"):
+            await runtime_ready()
+        # Route the question to the relevant files in the knowledge folder using the schema index
+        with span("route_query"):
+            route_query = workspace.route if workspace else app.state.schema_index.route
+            knowledge_files = tuple(await asyncio.to_thread(route_query, user_query,
+                                                            config.get("max_routed_files", 3)))
+
+        if not knowledge_files:
+            raise HTTPException(status_code=404, detail="No data file (CSV, XLSX or PDF) found in the knowledge folder. Please upload one.")
+
+        on_finish = job_finished(channel, workspace)
+        large_file = await asyncio.to_thread(map_reduce_file, knowledge_files, mode)
+        with span("result_cache_lookup"):
+            cache_context = await asyncio.to_thread(analysis_context, knowledge_files, large_file)
+            cached = await asyncio.to_thread(app.state.result_cache.get, user_query, cache_context)
+        if cached is not None:
+            job = app.state.job_manager.add_completed(cached, on_finish=on_finish)
+        else:
+            with span("fast_path"):
+                result = await asyncio.to_thread(answer_with_fast_path, knowledge_files, user_query)
+            if result is not None:
+                job = app.state.job_manager.add_completed(result, on_finish=on_finish, cached=False,
+                                                          route="fast_path")
+            else:
+                if large_file:
+                    logger.info("Routing %r to map-reduce over %s", user_query, large_file)
+                    work, target, route = run_map_reduce, large_file, "map_reduce"
+                else:
+                    app.state.fast_path_stats.record_crew_route()
+                    logger.info("Routing %r to the crew", user_query)
+                    work = functools.partial(run_analysis, deadline_seconds=deadline_seconds)
+                    target, route = knowledge_files, "crew"
+                try:
+                    job = app.state.job_manager.submit(work, target, user_query, channel,
+                                                       cache_context, trace if include_timings else None,
+                                                       on_finish=on_finish)
+                except QueueFullError as e:
+                    raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+                except RuntimeError as e:
+                    raise HTTPException(status_code=503, detail=str(e))
+                job.route = route
+                return job
+    if include_timings:
+        job.timings = trace.breakdown()
+    return job
+
+
+@app.post("/analyze_data", status_code=202)
+async def analyze_data(input_data: QueryInput):
+    """Queues an analysis job and returns its id; poll GET /jobs/{job_id} for the result."""
+    job = await submit_analysis(input_data.query, include_timings=input_data.include_timings,
+                                mode=input_data.mode, session_id=input_data.session_id,
+                                deadline_seconds=input_data.deadline_seconds)
+    return job.to_dict()
+
+
+async def job_event_stream(job, channel: ProgressChannel):
+    """Yields a job's progress events as SSE messages, ending with its outcome."""
+    try:
+        yield format_sse("queued", job.to_dict())
+        while True:
+            item = await channel.get(timeout=15)
+            if item is None:
+                yield ": keep-alive\n\n"
+                continue
+            event, data = item
+            if event == "done":
+                break
+            yield format_sse(event, data)
+        if job.status == SUCCEEDED:
+            yield format_sse("result", job.to_dict())
+        elif job.status in (FAILED, TIMED_OUT):
+            error = job_error(job.error)
+            yield format_sse("error", {"job_id": job.id, "status_code": error.status_code, "detail": error.detail})
+        else:
+            yield format_sse("cancelled", job.to_dict())
+    finally:
+        # Stop the crew if the client went away before the job finished.
+        if job.status not in FINISHED_STATES:
+            app.state.job_manager.cancel(job.id)
+
+
+@app.post("/analyze_data/stream")
+async def analyze_data_stream(input_data: QueryInput):
+    """Queues an analysis job and streams task progress, intermediate outputs and LLM tokens as SSE."""
+    channel = ProgressChannel(asyncio.get_running_loop())
+    job = await submit_analysis(input_data.query, channel, input_data.include_timings, input_data.mode,
+                                input_data.session_id, input_data.deadline_seconds)
+    return StreamingResponse(job_event_stream(job, channel), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+class BatchQueryInput(BaseModel):
+    queries: List[str] = Field(min_length=1)
+    # Files to analyse, named as in the knowledge folder (or session); routed from all the questions if omitted.
+    files: Optional[List[str]] = None
+    mode: Literal["auto", "crew", "map_reduce"] = "auto"
+    session_id: Optional[str] = None
+    # Without streaming the job is returned right away; poll GET /jobs/{job_id} for the answers.
+    stream: bool = True
+    # Applies to each question's crew run separately.
+    deadline_seconds: Optional[float] = Field(default=None, gt=0)
+
+
+def batch_answer(outcome: dict) -> dict:
+    """The reported form of one batch question's outcome; failures carry the status code a job error would."""
+    if outcome.get("error") is None:
+        return outcome
+    error = job_error(outcome["error"])
+    answer = {key: value for key, value in outcome.items() if key != "error"}
+    return dict(answer, status_code=error.status_code, detail=error.detail)
+
+
+def run_analysis_batch(job, knowledge_files: tuple, queries: list, large_file: Optional[str], cache_context: str,
+                       channel=None, deadline_seconds: Optional[float] = None):
+    """Answers a batch of questions about the same files; executed on one job worker thread.
+
+    The crew template, knowledge index and dataset profiles of the files are loaded
+    once and shared by all questions; identical questions are answered once. Up to
+    batch_concurrency questions run at a time, their LLM calls share
+    batch_llm_concurrency slots and their knowledge searches are deduplicated.
+    Each answer is published to channel as soon as it is ready. Every crew run gets
+    its own budget; an answer cut short by it carries "partial" and is not cached.
+    """
+    from knowledge_index import RetrievalMemo, use_retrieval_memo
+
+    answers = [None] * len(queries)
+
+    def answer(question):
+        job.check_cancelled()
+        cached = app.state.result_cache.get(question, cache_context)
+        if cached is not None:
+            return {"result": cached, "route": "cache"}
+        result = answer_with_fast_path(knowledge_files, question)
+        if result is not None:
+            return {"result": result, "route": "fast_path"}
+        if large_file:
+            result = app.state.map_reduce.run(os.path.join("knowledge", large_file), question,
+                                              partition_by=config.get("map_reduce_partition_by"),
+                                              check_cancelled=job.check_cancelled)["report"]
+            route = "map_reduce"
+        else:
+            app.state.fast_path_stats.record_crew_route()
+            _, result, partial = run_crew(knowledge_files, question, job.check_cancelled,
+                                          budget=request_budget(deadline_seconds))
+            if partial is not None:
+                return {"result": result, "route": "crew", "partial": partial}
+            route = "crew"
+        app.state.result_cache.put(question, cache_context, result)
+        return {"result": result, "route": route}
+
+    def on_result(outcome):
+        answers[outcome["index"]] = batch_answer(outcome)
+        if channel is not None:
+            channel.publish("answer", answers[outcome["index"]])
+
+    started = time.perf_counter()
+    slots = threading.Semaphore(config.get("batch_llm_concurrency", 2))
+    with use_retrieval_memo(RetrievalMemo()) as memo, limit_llm_calls(slots):
+        run_batch(queries, answer, config.get("batch_concurrency", 4), on_result, job.check_cancelled)
+    return {"answers": answers, "files": list(knowledge_files), "questions": len(queries),
+            "distinct_questions": len(group_questions(queries)), "retrieval": memo.stats(),
+            "seconds": round(time.perf_counter() - started, 4)}
+
+
+async def submit_batch(input_data: BatchQueryInput, channel=None):
+    """Resolves the batch's files once and queues one job that answers all of its questions."""
+    workspace = session_workspace(input_data.session_id)
+    max_questions = config.get("batch_max_questions", 500)
+    if len(input_data.queries) > max_questions:
+        raise HTTPException(status_code=400, detail=f"A batch takes at most {max_questions} questions.")
+    await runtime_ready()
+    if input_data.files:
+        knowledge_dir = workspace.knowledge_dir if workspace else "knowledge"
+        invalid = [f for f in input_data.files if os.path.basename(f) != f]
+        if invalid:
+            raise HTTPException(status_code=400, detail=f"Invalid file names: {', '.join(invalid)}")
+        missing = [f for f in input_data.files if not os.path.isfile(os.path.join(knowledge_dir, f))]
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Files not found: {', '.join(missing)}")
+        knowledge_files = tuple(workspace.knowledge_file(f) if workspace else f for f in input_data.files)
+    else:
+        route_query = workspace.route if workspace else app.state.schema_index.route
+        knowledge_files = tuple(await asyncio.to_thread(route_query, " ".join(input_data.queries),
+                                                        config.get("max_routed_files", 3)))
+    if not knowledge_files:
+        raise HTTPException(status_code=404, detail="No data file (CSV, XLSX or PDF) found in the knowledge folder. Please upload one.")
+
+    large_file = await asyncio.to_thread(map_reduce_file, knowledge_files, input_data.mode)
+    cache_context = await asyncio.to_thread(analysis_context, knowledge_files, large_file)
+    try:
+        job = app.state.job_manager.submit(run_analysis_batch, knowledge_files, input_data.queries, large_file,
+                                           cache_context, channel, input_data.deadline_seconds,
+                                           timeout=config.get("batch_timeout_seconds", 7200),
+                                           on_finish=job_finished(channel, workspace))
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    job.route = "batch"
+    return job
+
+
+@app.post("/analyze_data/batch")
+async def analyze_data_batch(input_data: BatchQueryInput):
+    """Answers many questions about the same data in one job, streaming each answer as an SSE "answer" event.
+
+    The final "result" event carries all answers in question order. With "stream": false
+    the job is returned at once (202) instead.
+    """
+    channel = ProgressChannel(asyncio.get_running_loop()) if input_data.stream else None
+    job = await submit_batch(input_data, channel)
+    if channel is None:
+        return JSONResponse(job.to_dict(), status_code=202)
+    return StreamingResponse(job_event_stream(job, channel), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.get("/jobs")
+async def job_queue_stats():
+    """Reports worker and queue occupancy of the analysis job pool."""
+    return app.state.job_manager.stats()
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, wait: float = 0):
+    """Returns a job's status, waiting up to `wait` seconds for it to finish."""
+    job = app.state.job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found.")
+    if wait > 0:
+        job = await app.state.job_manager.wait(job, wait)
+    if job.status in (FAILED, TIMED_OUT):
+        raise job_error(job.error)
+    return job.to_dict()
+
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """Cancels a queued or running job."""
+    job = app.state.job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found.")
+    return job.to_dict()
+
+
+@app.get("/knowledge/schema")
+async def knowledge_schema(session_id: Optional[str] = None):
+    """Lists column names, types and sample values of every file in the knowledge folder (or session)."""
+    workspace = session_workspace(session_id)
+    schema_index = workspace.schema_index if workspace else app.state.schema_index
+    return {"files": await asyncio.to_thread(schema_index.schemas)}
+
+
+@app.post("/sessions", status_code=201)
+def create_session():
+    """Starts a session workspace; pass its id to /upload_files and /analyze_data."""
+    return app.state.workspaces.create().to_dict()
+
+
+@app.get("/sessions/stats")
+def session_stats():
+    """Reports session count, memory held by session workspaces against the budget, evictions and expirations."""
+    return app.state.workspaces.stats()
+
+
+@app.delete("/sessions/{session_id}")
+def delete_session(session_id: str):
+    """Deletes a session's workspace and its files."""
+    workspace = app.state.workspaces.delete(session_id)
+    if workspace is None:
+        raise HTTPException(status_code=404, detail=f"Session {session_id} not found.")
+    return workspace.to_dict()
+
+
+@app.get("/result_cache/stats")
+def result_cache_stats():
+    """Reports hit/miss counters of the analysis result cache."""
+    return app.state.result_cache.stats()
+
+
+@app.get("/fast_path/stats")
+def fast_path_stats():
+    """Reports how many questions the fast path answered versus the crew, and the time it saved."""
+    return app.state.fast_path_stats.stats()
+
+
+metrics.gauge("analysis_jobs", "Analysis jobs currently queued or running.")
+metrics.counter("analysis_routed_total", "Questions answered by each route.")
+metrics.counter("analysis_result_cache_total", "Result cache lookups by outcome.")
+
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """Exports stage latencies, LLM calls and tokens, delegations and queue state in Prometheus format."""
+    jobs = app.state.job_manager.stats()
+    for state in ("queued", "running"):
+        metrics.set("analysis_jobs", jobs[state], state=state)
+    routes = app.state.fast_path_stats.stats()
+    for route in ("fast_path", "crew"):
+        metrics.set("analysis_routed_total", routes[route], route=route)
+    cache = app.state.result_cache.stats()
+    for outcome in ("hits", "similar_hits", "misses"):
+        metrics.set("analysis_result_cache_total", cache[outcome], outcome=outcome)
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/crew_registry/stats")
+def crew_registry_stats():
+    """Reports crew template builds and the time spent building them, knowledge loading included."""
+    return app.state.crew_registry.stats()
+
+
+@app.get("/llm/stats")
+async def llm_stats():
+    """Reports model warm-up (cold start) times, residency and warm/cold LLM call latencies."""
+    return (await runtime_ready()).llm_pool.stats()
+
+
+@app.get("/knowledge_index/stats")
+async def knowledge_index_stats():
+    """Reports hit/miss counters and size of the on-disk knowledge index cache."""
+    return (await runtime_ready()).index_cache.stats()
+
 
 @app.get("/")
 def health_check():
@@ -55,6 +767,20 @@ def health_check():
     return {"status": "ok"}
 
 
+@app.get("/ready")
+async def readiness_check(wait: float = 0):
+    """Reports whether crewai and the LLM pool are loaded, waiting up to `wait` seconds; 503 until then."""
+    runtime = app.state.runtime
+    if wait > 0:
+        await asyncio.wait([runtime], timeout=wait)
+    if not runtime.done():
+        raise HTTPException(status_code=503, detail="The analysis runtime is still loading.",
+                            headers={"Retry-After": "1"})
+    if runtime.exception():
+        raise HTTPException(status_code=500, detail=f"The analysis runtime failed to load: {runtime.exception()}")
+    return {"status": "ready"}
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8090)
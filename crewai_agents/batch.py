@@ -0,0 +1,65 @@
+import contextvars
+import logging
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Optional
+
+from jobs import JobCancelled
+from result_cache import normalize_query
+
+logger = logging.getLogger(__name__)
+
+
+def group_questions(questions: list) -> OrderedDict:
+    """Groups the indices of questions that are the same once case and spacing are ignored."""
+    groups = OrderedDict()
+    for index, question in enumerate(questions):
+        groups.setdefault(normalize_query(question), []).append(index)
+    return groups
+
+
+def run_batch(questions: list, answer: Callable, concurrency: int = 4, on_result: Optional[Callable] = None,
+              check_cancelled: Optional[Callable] = None) -> list:
+    """Answers a batch of questions, each distinct question once, up to concurrency at a time.
+
+    answer(question) returns a dict (e.g. {"result": ..., "route": ...}) or raises;
+    it runs on a pool thread in a copy of the caller's context, so trace, memo and
+    call-limit context variables set around run_batch apply to it. As each
+    question finishes, on_result(outcome) is called for it and its duplicates, in
+    completion order. An outcome holds index, query, status ("succeeded" or
+    "failed"), seconds and duplicate_of (the index answered for it, if any), plus
+    the answer's keys or the exception as error. Returns the outcomes by index.
+    """
+    outcomes = [None] * len(questions)
+    groups = list(group_questions(questions).values())
+
+    def timed(question):
+        started = time.perf_counter()
+        return answer(question), time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="batch-question") as pool:
+        futures = {pool.submit(contextvars.copy_context().run, timed, questions[indices[0]]): indices
+                   for indices in groups}
+        try:
+            for future in as_completed(futures):
+                indices = futures[future]
+                try:
+                    answered, seconds = future.result()
+                    outcome = {"status": "succeeded", "seconds": round(seconds, 4), **answered}
+                except JobCancelled:
+                    raise
+                except Exception as e:
+                    logger.warning("Batch question %r failed: %s", questions[indices[0]], e)
+                    outcome = {"status": "failed", "error": e}
+                for index in indices:
+                    outcomes[index] = {"index": index, "query": questions[index],
+                                       "duplicate_of": indices[0] if index != indices[0] else None, **outcome}
+                    if on_result is not None:
+                        on_result(outcomes[index])
+                if check_cancelled is not None:
+                    check_cancelled()
+        finally:
+            for future in futures:
+                future.cancel()
+    return outcomes
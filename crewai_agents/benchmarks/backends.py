@@ -0,0 +1,90 @@
+"""Benchmark of LLM throughput against the number of model servers behind the pool.
+
+For each server count, starts that many fake Ollama servers that generate one
+reply at a time, as Ollama does by default, points an LLMPool at all of them and
+sends concurrent chat calls through crewai's LLM client. Throughput should grow
+with the number of servers. A last run adds a server that refuses connections
+to check that calls fail over to the live ones.
+
+    python -m benchmarks.backends --servers 1,2,4 --calls 32 --concurrency 8 --output backends.json
+
+Run from the crewai_agents folder.
+"""
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.fake_ollama import start_fake_ollama
+from benchmarks.run import free_port, parse_ints, percentile
+from llm_pool import LLMPool
+
+MODEL = "ollama/gemma3"
+
+
+def run_calls(backends: list, calls: int, concurrency: int) -> dict:
+    """Sends calls chat requests, concurrency at a time, through a pool over these backend URLs."""
+    pool = LLMPool(default_model=MODEL, base_url=backends[0], backends=backends, max_connections=concurrency)
+    llm = pool.get()
+    latencies, errors = [], 0
+
+    def call(index):
+        started = time.perf_counter()
+        llm.call(f"Question {index}: which supplier has the most defects?")
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(call, index) for index in range(calls)]:
+            try:
+                latencies.append(future.result())
+            except Exception:
+                errors += 1
+    elapsed = time.perf_counter() - started
+    pool.close()
+    return {"calls": calls, "errors": errors, "seconds": round(elapsed, 4),
+            "calls_per_second": round(len(latencies) / elapsed, 3), "p50_seconds": percentile(latencies, 50),
+            "p95_seconds": percentile(latencies, 95),
+            "calls_per_backend": {backend["url"]: backend["calls"] for backend in pool.router.stats()}}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark LLM throughput against the number of model servers.")
+    parser.add_argument("--servers", type=parse_ints, default=[1, 2, 4], help="Comma-separated server counts.")
+    parser.add_argument("--calls", type=int, default=32)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds before a fake server's first token.")
+    parser.add_argument("--output", help="Write the JSON report here.")
+    args = parser.parse_args(argv)
+
+    fakes = [start_fake_ollama(tokens_per_second=args.tokens_per_second, latency=args.latency, parallel=1)
+             for _ in range(max(args.servers))]
+    urls = [f"http://127.0.0.1:{fake.server_address[1]}" for fake in fakes]
+    report = {"settings": vars(args), "runs": []}
+    try:
+        for count in args.servers:
+            result = {"servers": count, **run_calls(urls[:count], args.calls, args.concurrency)}
+            report["runs"].append(result)
+            print(f"{count:>2} servers: {result['calls_per_second']} calls/s, p50 {result['p50_seconds']}s, "
+                  f"{result['errors']} errors")
+        # Nothing listens on a fresh free port, so that server refuses connections.
+        failover = run_calls([f"http://127.0.0.1:{free_port()}"] + urls[:2], args.calls, args.concurrency)
+        report["failover"] = failover
+        print(f"one of 3 servers down: {failover['calls_per_second']} calls/s, {failover['errors']} errors")
+    finally:
+        for fake in fakes:
+            fake.shutdown()
+
+    base = report["runs"][0]["calls_per_second"]
+    for result in report["runs"]:
+        result["speedup"] = round(result["calls_per_second"] / base, 2) if base else None
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,291 @@
+"""Local stand-in for an Ollama server, for benchmarks and tests that must not need a real model.
+
+Speaks the parts of the Ollama HTTP API the app uses: native /api/generate,
+/api/chat, /api/embed(dings) and /api/tags, plus the OpenAI-compatible
+/v1/chat/completions and /v1/embeddings that crewai's Ollama provider calls.
+Replies are canned text paced at a configurable token rate after a
+configurable time to first token, at most `parallel` at a time like Ollama's
+OLLAMA_NUM_PARALLEL; embeddings are deterministic hash vectors.
+
+    python benchmarks/fake_ollama.py --port 11434 --tokens-per-second 40 --latency 0.2
+"""
+import argparse
+import hashlib
+import json
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+ANSWER_WORDS = ("The data shows Delta_Logistics with the highest order volume while Gamma_Co has the "
+                "lowest defect count across the delivered purchase orders").split()
+
+
+class FakeOllama:
+    """Settings and counters of a fake Ollama server."""
+
+    def __init__(self, tokens_per_second: float = 50.0, latency: float = 0.05, load_seconds: float = 0.0,
+                 response_tokens: int = 40, embedding_dim: int = 64, embedding_latency: float = 0.0,
+                 parallel: int = 0):
+        self.tokens_per_second = tokens_per_second
+        self.latency = latency
+        self.load_seconds = load_seconds
+        self.response_tokens = response_tokens
+        self.embedding_dim = embedding_dim
+        self.embedding_latency = embedding_latency
+        # 0 generates any number of replies at once.
+        self.slots = threading.Semaphore(parallel) if parallel else None
+        self.loaded = set()
+        self.requests = {}
+        self.generated_tokens = 0
+        self.embedded_texts = 0
+        self._lock = threading.Lock()
+
+    def count(self, path: str, tokens: int = 0, embedded: int = 0) -> None:
+        with self._lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+            self.generated_tokens += tokens
+            self.embedded_texts += embedded
+
+    def load(self, model: str) -> float:
+        """Simulates loading a model on first use; returns the load time in seconds."""
+        with self._lock:
+            cold = model not in self.loaded
+            self.loaded.add(model)
+        if cold and self.load_seconds:
+            time.sleep(self.load_seconds)
+        return self.load_seconds if cold else 0.0
+
+    def unload(self, model: str) -> None:
+        with self._lock:
+            self.loaded.discard(model)
+
+    def tokens(self) -> list:
+        words = ["Thought:", "I", "now", "know", "the", "final", "answer\nFinal", "Answer:"]
+        while len(words) < self.response_tokens:
+            words.extend(ANSWER_WORDS)
+        return [word + " " for word in words[:self.response_tokens]]
+
+    def embed(self, text: str) -> list:
+        seed = int.from_bytes(hashlib.sha256(str(text).encode()).digest()[:8], "little")
+        vector = np.random.default_rng(seed).standard_normal(self.embedding_dim)
+        return (vector / np.linalg.norm(vector)).round(6).tolist()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"requests": dict(self.requests), "generated_tokens": self.generated_tokens,
+                    "embedded_texts": self.embedded_texts, "loaded": sorted(self.loaded)}
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "FakeOllama/1.0"
+
+    @property
+    def fake(self) -> FakeOllama:
+        return self.server.fake
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send_json(self, body: dict, status: int = 200) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _start_stream(self, content_type: str) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def _write_chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _end_stream(self) -> None:
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _generate(self, model: str, stream: bool, emit) -> tuple:
+        """Paces the canned reply; emit(token) is called per token when streaming."""
+        if self.fake.slots is None:
+            return self._paced_reply(model, stream, emit)
+        with self.fake.slots:
+            return self._paced_reply(model, stream, emit)
+
+    def _paced_reply(self, model: str, stream: bool, emit) -> tuple:
+        load = self.fake.load(model)
+        time.sleep(self.fake.latency)
+        tokens = self.fake.tokens()
+        delay = 1 / self.fake.tokens_per_second if self.fake.tokens_per_second else 0
+        if stream:
+            for token in tokens:
+                time.sleep(delay)
+                emit(token)
+        else:
+            time.sleep(delay * len(tokens))
+        return "".join(tokens).strip(), len(tokens), load
+
+    def do_GET(self):
+        if self.path in ("/", "/api/version"):
+            self._send_json({"version": "0.0.0-fake"})
+        elif self.path == "/api/tags":
+            self._send_json({"models": [{"name": model} for model in sorted(self.fake.loaded)]})
+        elif self.path == "/stats":
+            self._send_json(self.fake.stats())
+        else:
+            self._send_json({"error": f"not found: {self.path}"}, status=404)
+
+    def do_POST(self):
+        handlers = {
+            "/api/generate": self._api_generate,
+            "/api/chat": self._api_chat,
+            "/api/embed": self._api_embed,
+            "/api/embeddings": self._api_embeddings,
+            "/v1/chat/completions": self._openai_chat,
+            "/v1/embeddings": self._openai_embeddings,
+        }
+        handler = handlers.get(self.path.split("?", 1)[0])
+        if handler is None:
+            self._send_json({"error": f"not found: {self.path}"}, status=404)
+            return
+        handler(self._read_json())
+
+    def _api_generate(self, body: dict):
+        model = body.get("model", "")
+        if body.get("keep_alive") in (0, "0", "0s"):
+            self.fake.unload(model)
+            self.fake.count("/api/generate")
+            self._send_json({"model": model, "response": "", "done": True, "done_reason": "unload"})
+            return
+        if not body.get("prompt"):
+            # An empty prompt only loads the model, as Ollama does for warm-up requests.
+            load = self.fake.load(model)
+            self.fake.count("/api/generate")
+            self._send_json({"model": model, "response": "", "done": True, "load_duration": int(load * 1e9)})
+            return
+        self._native_reply(model, body.get("stream", True), lambda text: {"response": text}, "/api/generate")
+
+    def _api_chat(self, body: dict):
+        self._native_reply(body.get("model", ""), body.get("stream", True),
+                           lambda text: {"message": {"role": "assistant", "content": text}}, "/api/chat")
+
+    def _native_reply(self, model: str, stream: bool, wrap, path: str):
+        if stream:
+            self._start_stream("application/x-ndjson")
+            emit = lambda token: self._write_chunk(json.dumps({"model": model, "done": False, **wrap(token)}).encode()
+                                                   + b"\n")
+        else:
+            emit = None
+        text, count, load = self._generate(model, stream, emit)
+        final = {"model": model, "done": True, "eval_count": count, "load_duration": int(load * 1e9)}
+        self.fake.count(path, tokens=count)
+        if stream:
+            self._write_chunk(json.dumps({**final, **wrap("")}).encode() + b"\n")
+            self._end_stream()
+        else:
+            self._send_json({**final, **wrap(text)})
+
+    def _api_embed(self, body: dict):
+        texts = body.get("input", [])
+        texts = [texts] if isinstance(texts, str) else texts
+        time.sleep(self.fake.embedding_latency * len(texts))
+        self.fake.count("/api/embed", embedded=len(texts))
+        self._send_json({"model": body.get("model", ""), "embeddings": [self.fake.embed(t) for t in texts]})
+
+    def _api_embeddings(self, body: dict):
+        time.sleep(self.fake.embedding_latency)
+        self.fake.count("/api/embeddings", embedded=1)
+        self._send_json({"embedding": self.fake.embed(body.get("prompt", ""))})
+
+    def _openai_chat(self, body: dict):
+        model = body.get("model", "")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+
+        def chunk(delta: dict, finish_reason=None) -> bytes:
+            return b"data: " + json.dumps({
+                "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }).encode() + b"\n\n"
+
+        if body.get("stream"):
+            self._start_stream("text/event-stream")
+            self._write_chunk(chunk({"role": "assistant", "content": ""}))
+            text, count, _ = self._generate(model, True, lambda token: self._write_chunk(chunk({"content": token})))
+            self._write_chunk(chunk({}, "stop"))
+            self._write_chunk(b"data: [DONE]\n\n")
+            self._end_stream()
+        else:
+            text, count, _ = self._generate(model, False, None)
+            self._send_json({
+                "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": count, "total_tokens": count},
+            })
+        self.fake.count("/v1/chat/completions", tokens=count)
+
+    def _openai_embeddings(self, body: dict):
+        texts = body.get("input", [])
+        texts = [texts] if isinstance(texts, str) else texts
+        time.sleep(self.fake.embedding_latency * len(texts))
+        self.fake.count("/v1/embeddings", embedded=len(texts))
+        self._send_json({
+            "object": "list", "model": body.get("model", ""),
+            "data": [{"object": "embedding", "index": i, "embedding": self.fake.embed(t)} for i, t in enumerate(texts)],
+            "usage": {"prompt_tokens": 0, "total_tokens": 0},
+        })
+
+
+class FakeOllamaServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients dropping idle keep-alive connections is expected, not an error worth a traceback.
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def start_fake_ollama(port: int = 0, **settings) -> FakeOllamaServer:
+    """Starts the fake server on a daemon thread; server.fake holds its settings and counters.
+
+    Use port 0 for a free port and read it back from server.server_address.
+    """
+    server = FakeOllamaServer(("127.0.0.1", port), FakeOllamaHandler)
+    server.fake = FakeOllama(**settings)
+    threading.Thread(target=server.serve_forever, name="fake-ollama", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds before the first token.")
+    parser.add_argument("--load-seconds", type=float, default=0.0, help="Simulated model load time on first use.")
+    parser.add_argument("--response-tokens", type=int, default=40)
+    parser.add_argument("--parallel", type=int, default=0, help="Replies generated at once; 0 for no limit.")
+    args = parser.parse_args()
+    server = start_fake_ollama(args.port, tokens_per_second=args.tokens_per_second, latency=args.latency,
+                               load_seconds=args.load_seconds, response_tokens=args.response_tokens,
+                               parallel=args.parallel)
+    print(f"Fake Ollama listening on http://127.0.0.1:{server.server_address[1]}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
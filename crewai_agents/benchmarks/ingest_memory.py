@@ -0,0 +1,128 @@
+"""Benchmark of peak memory against CSV size when building the knowledge index.
+
+For each size, a synthetic procurement CSV is ingested in a fresh process twice:
+once by the streaming CachedCSVKnowledgeSource, and once the way crewai's
+CSVKnowledgeSource does it, reading the whole file before chunking and embedding
+it. Each process reports its peak RSS, so streaming should stay flat as the file
+grows while the whole-file path grows with it. The embedder is a stand-in that
+returns vectors as wide as a local embedding model's at no cost.
+
+    python -m benchmarks.ingest_memory --rows 100000,400000,1600000 --output ingest_memory.json
+
+Run from the crewai_agents folder.
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.run import APP_DIR, synthetic_procurement_csv
+
+MODES = ("streaming", "whole_file")
+
+
+class WideEmbedder:
+    """Embeds each document into a dims-wide vector derived from its length."""
+
+    def __init__(self, dims: int):
+        self.dims = dims
+
+    def __call__(self, documents):
+        return [np.full(self.dims, len(doc), dtype=np.float32) for doc in documents]
+
+
+def peak_rss_mb() -> float:
+    """Peak resident memory of this process in MB."""
+    # VmHWM starts afresh on exec; ru_maxrss can carry over the parent's peak.
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    # ru_maxrss is in kilobytes on Linux.
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def ingest(mode: str, path: str, dims: int, batch_rows: int, batch_mb: int) -> dict:
+    """Ingests one CSV in this process and returns its chunk count, time and peak RSS."""
+    from knowledge_index import CachedCSVKnowledgeSource, KnowledgeIndexCache, KnowledgeIndexStorage
+
+    baseline = peak_rss_mb()
+    started = time.perf_counter()
+    storage = KnowledgeIndexStorage(embedder=WideEmbedder(dims))
+    if mode == "streaming":
+        cache = KnowledgeIndexCache(os.path.join(os.path.dirname(path), "index"), max_bytes=1 << 40)
+        # A Path is used as is; crewai resolves plain strings relative to the knowledge folder.
+        source = CachedCSVKnowledgeSource(file_paths=[Path(path)], index_cache=cache, embedder_spec={"provider": "fake"},
+                                          batch_rows=batch_rows, batch_bytes=batch_mb << 20)
+        source.storage = storage
+        source.add()
+        chunks = len(source.chunks)
+    else:
+        from crewai.knowledge.source.csv_knowledge_source import CSVKnowledgeSource
+
+        source = CSVKnowledgeSource(file_paths=[Path(path)])
+        source.storage = storage
+        source.add()
+        chunks = len(source.chunks)
+    return {"chunks": chunks, "seconds": round(time.perf_counter() - started, 4),
+            "baseline_rss_mb": baseline, "peak_rss_mb": peak_rss_mb()}
+
+
+def run_worker(mode: str, path: str, args) -> dict:
+    command = [sys.executable, "-m", "benchmarks.ingest_memory", "--worker", mode, path, "--dims", str(args.dims),
+               "--batch-rows", str(args.batch_rows), "--batch-mb", str(args.batch_mb)]
+    output = subprocess.run(command, cwd=APP_DIR, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark peak memory of knowledge ingestion against CSV size.")
+    parser.add_argument("--rows", default="100000,400000,1600000", help="Comma-separated CSV sizes in rows.")
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--dims", type=int, default=768, help="Width of the fake embeddings.")
+    parser.add_argument("--batch-rows", type=int, default=10_000)
+    parser.add_argument("--batch-mb", type=int, default=4)
+    parser.add_argument("--output", help="Write the JSON report here.")
+    parser.add_argument("--worker", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        print(json.dumps(ingest(*args.worker, args.dims, args.batch_rows, args.batch_mb)))
+        return 0
+
+    results = []
+    for rows in (int(r) for r in args.rows.split(",")):
+        workdir = tempfile.mkdtemp(prefix="analysis-ingest-")
+        try:
+            path = synthetic_procurement_csv(os.path.join(workdir, "procurement.csv"), rows)
+            file_mb = round(os.path.getsize(path) / (1 << 20), 1)
+            for mode in args.modes.split(","):
+                shutil.rmtree(os.path.join(workdir, "index"), ignore_errors=True)
+                result = {"rows": rows, "file_mb": file_mb, "mode": mode, **run_worker(mode, path, args)}
+                result["growth_mb"] = round(result["peak_rss_mb"] - result["baseline_rss_mb"], 1)
+                results.append(result)
+                print(f"{rows:>9} rows {file_mb:>7} MB {mode:>10}: peak {result['peak_rss_mb']} MB "
+                      f"(+{result['growth_mb']} MB), {result['chunks']} chunks in {result['seconds']}s")
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"settings": {k: v for k, v in vars(args).items() if k != "worker"}, "results": results}, f,
+                      indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""Benchmark of the procurement KPI library on large in-memory datasets.
+
+For each size, a synthetic procurement dataset is typed as the app loads it and
+every KPI is computed per supplier and per item category three ways: with the
+vectorized library, again through its memo (the cost of a repeated tool call),
+and with a straightforward pandas groupby-apply for comparison. The two
+computations are checked to agree before their times are reported.
+
+    python -m benchmarks.kpis --rows 100000,1000000 --repeat 3 --output kpis.json
+
+Run from the crewai_agents folder.
+"""
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.run import synthetic_procurement_frame
+from dataset_profile import DatasetProfile, type_columns
+from procurement_kpis import KPIS, KpiMemo, compute_kpi
+
+GROUP_COLUMNS = ("Supplier", "Item_Category")
+
+
+def baseline_kpi(df: pd.DataFrame, kpi: str, group_by: str) -> pd.Series:
+    """The KPI's main column computed with groupby-apply, one Python call per group."""
+    groups = df.groupby(group_by, observed=True)
+    if kpi == "defect_rate":
+        return groups.apply(lambda g: 100 * g["Defective_Units"].sum() /
+                            g.loc[g["Defective_Units"].notna(), "Quantity"].sum(), include_groups=False)
+    if kpi == "price_savings":
+        return groups.apply(lambda g: ((g["Unit_Price"] - g["Negotiated_Price"]) * g["Quantity"]).sum(),
+                            include_groups=False)
+    if kpi == "lead_time":
+        return groups.apply(lambda g: (g["Delivery_Date"] - g["Order_Date"]).dt.days.mean(), include_groups=False)
+    if kpi == "compliance_rate":
+        return groups.apply(lambda g: 100 * (g["Compliance"] == "Yes").mean(), include_groups=False)
+    # The scorecard's main column is negotiated spend; the baseline computes the other KPIs as well.
+    for other in ("defect_rate", "lead_time", "compliance_rate"):
+        baseline_kpi(df, other, group_by)
+    return groups.apply(lambda g: (g["Negotiated_Price"] * g["Quantity"]).sum(), include_groups=False)
+
+
+def best_of(repeat: int, function) -> tuple:
+    """Runs function repeat times; returns its last result and the fastest time."""
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - started)
+    return result, min(times)
+
+
+def bench_size(rows: int, repeat: int) -> list:
+    df = type_columns(synthetic_procurement_frame(rows, np.random.default_rng(0)))
+    profile = DatasetProfile(df, name=f"procurement_{rows}.csv", file_hash=f"synthetic-{rows}")
+    results = []
+    for kpi, (_, rank_by) in KPIS.items():
+        for group_by in GROUP_COLUMNS:
+            table, vectorized = best_of(repeat, lambda: compute_kpi(profile, kpi, group_by))
+            memo = KpiMemo()
+            compute_kpi(profile, kpi, group_by, memo=memo)
+            _, memoized = best_of(repeat, lambda: compute_kpi(profile, kpi, group_by, memo=memo))
+            expected, baseline = best_of(repeat, lambda: baseline_kpi(df, kpi, group_by))
+            if not np.allclose(table[rank_by].to_numpy(), expected.reindex(table.index).to_numpy()):
+                raise AssertionError(f"{kpi} by {group_by} disagrees with the groupby-apply baseline")
+            results.append({"rows": rows, "kpi": kpi, "group_by": group_by, "vectorized_seconds": round(vectorized, 5),
+                            "memoized_seconds": round(memoized, 6), "baseline_seconds": round(baseline, 5),
+                            "speedup": round(baseline / vectorized, 1) if vectorized else None})
+            result = results[-1]
+            print(f"{rows:>9} rows {kpi:>15} by {group_by:<13}: {result['vectorized_seconds']:.4f}s "
+                  f"(memoized {result['memoized_seconds']:.6f}s) vs groupby-apply {result['baseline_seconds']:.4f}s, "
+                  f"{result['speedup']}x")
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the procurement KPI library on large datasets.")
+    parser.add_argument("--rows", default="100000,1000000", help="Comma-separated dataset sizes in rows.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement; the fastest is reported.")
+    parser.add_argument("--output", help="Write the JSON report here.")
+    args = parser.parse_args(argv)
+
+    results = []
+    for rows in (int(r) for r in args.rows.split(",")):
+        results.extend(bench_size(rows, args.repeat))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"settings": vars(args), "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""Benchmark of incremental knowledge re-indexing.
+
+Builds the knowledge index of a synthetic procurement CSV, then re-indexes it after
+appending rows, editing one row in the middle and deleting one, and reports how
+many chunks each step embedded and how long it took relative to the full build.
+The embedder is a stand-in that costs a fixed time per chunk, like a local model.
+
+    python -m benchmarks.reindex --rows 100000 --append-percent 1 --output reindex.json
+
+Run from the crewai_agents folder.
+"""
+import argparse
+import json
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.run import synthetic_procurement_csv
+from knowledge_index import CachedCSVKnowledgeSource, KnowledgeIndexCache, KnowledgeIndexStorage
+
+
+class FakeEmbedder:
+    """Embeds each document into a small vector, sleeping seconds_per_chunk per document."""
+
+    def __init__(self, seconds_per_chunk: float):
+        self.seconds_per_chunk = seconds_per_chunk
+        self.chunks = 0
+
+    def __call__(self, documents):
+        self.chunks += len(documents)
+        time.sleep(self.seconds_per_chunk * len(documents))
+        return [np.array([len(doc), doc.count(","), 1.0]) for doc in documents]
+
+
+def index_file(path: str, cache: KnowledgeIndexCache, seconds_per_chunk: float) -> dict:
+    embedder = FakeEmbedder(seconds_per_chunk)
+    started = time.perf_counter()
+    # A Path is used as is; crewai resolves plain strings relative to the knowledge folder.
+    source = CachedCSVKnowledgeSource(file_paths=[Path(path)], index_cache=cache, embedder_spec={"provider": "fake"})
+    source.storage = KnowledgeIndexStorage(embedder=embedder)
+    source.add()
+    return {"seconds": round(time.perf_counter() - started, 4), "chunks": len(source.chunks),
+            "embedded_chunks": embedder.chunks}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark incremental re-indexing of a growing CSV.")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--append-percent", type=float, default=1.0)
+    parser.add_argument("--seconds-per-chunk", type=float, default=0.002, help="Fake embedding cost per chunk.")
+    parser.add_argument("--output", help="Write the JSON report here.")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="analysis-reindex-")
+    try:
+        path = synthetic_procurement_csv(f"{workdir}/procurement.csv", args.rows)
+        cache = KnowledgeIndexCache(f"{workdir}/index", max_bytes=1 << 40)
+        report = {"settings": vars(args), "full_build": index_file(path, cache, args.seconds_per_chunk)}
+
+        df = pd.read_csv(path)
+        extra = synthetic_procurement_csv(f"{workdir}/extra.csv", int(args.rows * args.append_percent / 100), seed=1)
+        pd.read_csv(extra).to_csv(path, mode="a", header=False, index=False)
+        report["append"] = index_file(path, cache, args.seconds_per_chunk)
+
+        df = pd.read_csv(path)
+        df.loc[len(df) // 2, "Quantity"] += 1
+        df.to_csv(path, index=False)
+        report["edit_one_row"] = index_file(path, cache, args.seconds_per_chunk)
+
+        df.drop(index=len(df) // 3).to_csv(path, index=False)
+        report["delete_one_row"] = index_file(path, cache, args.seconds_per_chunk)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    full = report["full_build"]
+    for step in ("full_build", "append", "edit_one_row", "delete_one_row"):
+        result = report[step]
+        result["relative_cost"] = round(result["seconds"] / full["seconds"], 4)
+        print(f"{step:>15}: {result['seconds']}s, embedded {result['embedded_chunks']} of {result['chunks']} chunks "
+              f"({result['relative_cost']:.1%} of the full build)")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,337 @@
+"""End-to-end benchmark of the analysis API against a fake Ollama server.
+
+For each dataset size a fresh API server is started (uvicorn, in its own
+working directory and process), the dataset is uploaded through /upload_files,
+and questions are sent to /analyze_data at each concurrency level. The report
+gives latency percentiles, throughput, the server's peak RSS, and how much of
+the time went into building the crew (knowledge loading) versus running it.
+
+    python -m benchmarks.run --sizes 778,100000 --concurrency 1,4 --requests 8
+    python -m benchmarks.run --baseline benchmarks/baseline.json   # exit 1 on regression
+
+Run from the crewai_agents folder.
+"""
+import argparse
+import importlib.util
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import numpy as np
+import pandas as pd
+
+from benchmarks.fake_ollama import start_fake_ollama
+from llm_memo import MODES
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROCUREMENT_CSV = os.path.join(APP_DIR, "knowledge", "Procurement KPI Analysis Dataset.csv")
+SUPPLIERS = ["Alpha_Inc", "Beta_Supplies", "Gamma_Co", "Delta_Logistics", "Epsilon_Group"]
+CATEGORIES = ["Office Supplies", "MRO", "Electronics", "Raw Materials", "Packaging"]
+STATUSES = ["Delivered", "Pending", "Partially Delivered", "Cancelled"]
+# Open-ended questions so every request goes through the crew rather than the fast path.
+QUESTION = "Explain the supplier performance and delivery quality in this data (request {})."
+GENERATE_BATCH_ROWS = 500_000
+
+
+def synthetic_procurement_frame(rows: int, rng: np.random.Generator, start: int = 0) -> pd.DataFrame:
+    """Procurement orders with the same columns as the bundled CSV, numbered from start + 1."""
+    order_dates = np.datetime64("2022-01-01") + rng.integers(0, 730, rows).astype("timedelta64[D]")
+    unit_price = rng.uniform(10, 100, rows).round(2)
+    defective = rng.integers(0, 300, rows).astype(float)
+    defective[rng.random(rows) < 0.1] = np.nan
+    return pd.DataFrame({
+        "PO_ID": [f"PO-{i:08d}" for i in range(start + 1, start + rows + 1)],
+        "Supplier": rng.choice(SUPPLIERS, rows),
+        "Order_Date": order_dates,
+        "Delivery_Date": order_dates + rng.integers(1, 30, rows).astype("timedelta64[D]"),
+        "Item_Category": rng.choice(CATEGORIES, rows),
+        "Order_Status": rng.choice(STATUSES, rows, p=[0.72, 0.1, 0.1, 0.08]),
+        "Quantity": rng.integers(50, 5000, rows),
+        "Unit_Price": unit_price,
+        "Negotiated_Price": (unit_price * rng.uniform(0.8, 1.0, rows)).round(2),
+        "Defective_Units": defective,
+        "Compliance": rng.choice(["Yes", "No"], rows, p=[0.8, 0.2]),
+    })
+
+
+def synthetic_procurement_csv(path: str, rows: int, seed: int = 0) -> str:
+    """Writes a procurement dataset with the same columns as the bundled CSV."""
+    rng = np.random.default_rng(seed)
+    header = True
+    for start in range(0, rows, GENERATE_BATCH_ROWS):
+        n = min(GENERATE_BATCH_ROWS, rows - start)
+        synthetic_procurement_frame(n, rng, start).to_csv(path, mode="w" if header else "a", header=header,
+                                                          index=False)
+        header = False
+    return path
+
+
+def dataset_for(rows: int, directory: str) -> str:
+    """Uses the bundled procurement CSV for its own size, synthetic data otherwise."""
+    if os.path.exists(PROCUREMENT_CSV) and rows == sum(1 for _ in open(PROCUREMENT_CSV)) - 1:
+        return PROCUREMENT_CSV
+    return synthetic_procurement_csv(os.path.join(directory, f"procurement_{rows}.csv"), rows)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def peak_rss_mb(pid: int):
+    """Peak resident set size of a process (Linux /proc), or None where unavailable."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        return None
+    return None
+
+
+def percentile(values, q: float):
+    return round(float(np.percentile(values, q)), 4) if values else None
+
+
+class ApiServer:
+    """The FastAPI app in a separate process and working directory, configured to use the fake Ollama."""
+
+    def __init__(self, ollama_url: str, workers: int, queue_size: int, log_path: str, llm_memo: str = "off",
+                 llm_memo_path: str = None):
+        self.workdir = tempfile.mkdtemp(prefix="analysis-bench-")
+        self.port = free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        with open(os.path.join(APP_DIR, "config.json")) as f:
+            config = json.load(f)
+        config.update({
+            "ollama_base_url": ollama_url,
+            "embedder": self.embedder_spec(ollama_url),
+            "analysis_workers": workers,
+            "analysis_queue_size": queue_size,
+            "result_cache_path": None,
+            "fast_path_enabled": False,
+            # Off by default so every run measures real LLM calls; record/replay make runs repeatable offline.
+            "llm_memo_mode": llm_memo,
+            "llm_memo_path": os.path.abspath(llm_memo_path or os.path.join(self.workdir, ".llm_memo.db")),
+        })
+        for name in (config["agent_name"], config["task_name"]):
+            shutil.copy(os.path.join(APP_DIR, name), self.workdir)
+        os.makedirs(os.path.join(self.workdir, "knowledge"))
+        with open(os.path.join(self.workdir, "config.json"), "w") as f:
+            json.dump(config, f)
+        env = dict(os.environ, PYTHONPATH=APP_DIR + os.pathsep + os.environ.get("PYTHONPATH", ""))
+        self._log = open(log_path, "w")
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(self.port),
+             "--log-level", "warning"], cwd=self.workdir, env=env, stdout=self._log, stderr=subprocess.STDOUT)
+
+    @staticmethod
+    def embedder_spec(ollama_url: str) -> dict:
+        # crewai's Ollama embedder needs the ollama package; without it use the OpenAI-compatible endpoint.
+        if importlib.util.find_spec("ollama"):
+            return {"provider": "ollama", "config": {"model_name": "nomic-embed-text", "url": ollama_url + "/api/embed"}}
+        return {"provider": "openai", "config": {"model_name": "nomic-embed-text", "api_key": "fake",
+                                                 "api_base": ollama_url + "/v1"}}
+
+    def wait_ready(self, timeout: float = 120, path: str = "/ready") -> float:
+        """Seconds until path answers 200: "/" once the socket is bound, "/ready" once crewai has loaded."""
+        started = time.perf_counter()
+        while time.perf_counter() - started < timeout:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"API server exited with code {self.process.returncode}; see {self._log.name}")
+            try:
+                if httpx.get(self.url + path, timeout=1).status_code == 200:
+                    return time.perf_counter() - started
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.1)
+        raise TimeoutError("API server did not start in time")
+
+    def stop(self) -> None:
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=20)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        self._log.close()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+def ask(client: httpx.Client, question: str, timeout: float) -> dict:
+    """Submits one question and long-polls it to completion, retrying when the queue is full."""
+    started = time.perf_counter()
+    rejections = 0
+    while True:
+        response = client.post("/analyze_data", json={"query": question})
+        if response.status_code != 429:
+            break
+        rejections += 1
+        time.sleep(float(response.headers.get("Retry-After", 1)))
+    response.raise_for_status()
+    job = response.json()
+    while job["status"] in ("queued", "running") and time.perf_counter() - started < timeout:
+        response = client.get(f"/jobs/{job['job_id']}", params={"wait": 10})
+        if response.status_code != 200:
+            return {"seconds": time.perf_counter() - started, "ok": False, "rejections": rejections}
+        job = response.json()
+    return {"seconds": time.perf_counter() - started, "ok": job["status"] == "succeeded", "rejections": rejections}
+
+
+def run_level(url: str, concurrency: int, requests: int, offset: int, timeout: float) -> dict:
+    with httpx.Client(base_url=url, timeout=timeout,
+                      limits=httpx.Limits(max_connections=concurrency * 2)) as client:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(lambda i: ask(client, QUESTION.format(offset + i), timeout), range(requests)))
+        wall = time.perf_counter() - started
+    latencies = [r["seconds"] for r in results if r["ok"]]
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "succeeded": len(latencies),
+        "failed": requests - len(latencies),
+        "rejections": sum(r["rejections"] for r in results),
+        "p50_seconds": percentile(latencies, 50),
+        "p95_seconds": percentile(latencies, 95),
+        "p99_seconds": percentile(latencies, 99),
+        "throughput_rps": round(len(latencies) / wall, 4) if wall else None,
+    }
+
+
+def bench_dataset(rows: int, args, ollama_url: str, data_dir: str) -> dict:
+    path = dataset_for(rows, data_dir)
+    server = ApiServer(ollama_url, workers=args.workers, queue_size=args.queue_size,
+                       log_path=os.path.join(data_dir, f"server_{rows}.log"), llm_memo=args.llm_memo,
+                       llm_memo_path=args.llm_memo_path)
+    try:
+        startup = server.wait_ready()
+        with httpx.Client(base_url=server.url, timeout=args.timeout) as client:
+            started = time.perf_counter()
+            with open(path, "rb") as f:
+                response = client.post("/upload_files", files=[("files", (f"procurement_{rows}.csv", f, "text/csv"))])
+            response.raise_for_status()
+            upload = time.perf_counter() - started
+            levels = []
+            for concurrency in args.concurrency:
+                levels.append(run_level(server.url, concurrency, args.requests, len(levels) * args.requests,
+                                        args.timeout))
+            registry = client.get("/crew_registry/stats").json()
+            routing = client.get("/fast_path/stats").json()
+        crew_seconds = (routing["crew_avg_seconds"] or 0) * routing["crew_runs"]
+        return {
+            "rows": rows,
+            "file_mb": round(os.path.getsize(path) / 1e6, 2),
+            "startup_seconds": round(startup, 4),
+            "upload_seconds": round(upload, 4),
+            "knowledge_loading_seconds": registry["build_seconds"],
+            "crew_execution_seconds": round(crew_seconds, 4),
+            "peak_rss_mb": peak_rss_mb(server.process.pid),
+            "levels": levels,
+        }
+    finally:
+        server.stop()
+
+
+def compare_to_baseline(report: dict, baseline: dict, tolerance: float) -> list:
+    """Lists regressions beyond tolerance: slower p95, lower throughput or higher peak RSS."""
+    regressions = []
+    previous = {entry["rows"]: entry for entry in baseline.get("datasets", [])}
+    for entry in report["datasets"]:
+        before = previous.get(entry["rows"])
+        if before is None:
+            continue
+        if entry["peak_rss_mb"] and before.get("peak_rss_mb") \
+                and entry["peak_rss_mb"] > before["peak_rss_mb"] * (1 + tolerance):
+            regressions.append(f"{entry['rows']} rows: peak RSS {entry['peak_rss_mb']} MB > {before['peak_rss_mb']} MB")
+        levels = {level["concurrency"]: level for level in before.get("levels", [])}
+        for level in entry["levels"]:
+            old = levels.get(level["concurrency"])
+            if old is None:
+                continue
+            name = f"{entry['rows']} rows @ concurrency {level['concurrency']}"
+            if level["failed"] > old.get("failed", 0):
+                regressions.append(f"{name}: {level['failed']} failed requests (baseline {old.get('failed', 0)})")
+            if level["p95_seconds"] and old.get("p95_seconds") \
+                    and level["p95_seconds"] > old["p95_seconds"] * (1 + tolerance):
+                regressions.append(f"{name}: p95 {level['p95_seconds']}s > {old['p95_seconds']}s")
+            if level["throughput_rps"] is not None and old.get("throughput_rps") \
+                    and level["throughput_rps"] < old["throughput_rps"] * (1 - tolerance):
+                regressions.append(f"{name}: throughput {level['throughput_rps']} < {old['throughput_rps']} req/s")
+    return regressions
+
+
+def format_report(report: dict) -> str:
+    lines = []
+    for entry in report["datasets"]:
+        lines.append(f"{entry['rows']:>10} rows ({entry['file_mb']} MB): upload {entry['upload_seconds']}s, "
+                     f"knowledge loading {entry['knowledge_loading_seconds']}s, "
+                     f"crew execution {entry['crew_execution_seconds']}s, peak RSS {entry['peak_rss_mb']} MB")
+        for level in entry["levels"]:
+            lines.append(f"{'':>12}concurrency {level['concurrency']:>3}: p50 {level['p50_seconds']}s  "
+                         f"p95 {level['p95_seconds']}s  p99 {level['p99_seconds']}s  "
+                         f"{level['throughput_rps']} req/s  failed {level['failed']}  429s {level['rejections']}")
+    return "\n".join(lines)
+
+
+def parse_ints(value: str) -> list:
+    return [int(v) for v in value.split(",") if v]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the analysis API against a fake Ollama server.")
+    parser.add_argument("--sizes", type=parse_ints, default=[778, 100_000],
+                        help="Comma-separated dataset sizes in rows (e.g. 778,100000,1000000).")
+    parser.add_argument("--concurrency", type=parse_ints, default=[1, 4])
+    parser.add_argument("--requests", type=int, default=8, help="Questions per concurrency level.")
+    parser.add_argument("--workers", type=int, default=2, help="analysis_workers of the server under test.")
+    parser.add_argument("--queue-size", type=int, default=16)
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake LLM time to first token.")
+    parser.add_argument("--load-seconds", type=float, default=0.5, help="Fake model load time on first use.")
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--output", help="Write the JSON report here.")
+    parser.add_argument("--baseline", help="Compare against this JSON report and exit 1 on regression.")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression.")
+    parser.add_argument("--llm-memo", choices=MODES, default="off",
+                        help="LLM memo mode of the server: 'record' saves every LLM call, 'replay' serves only those.")
+    parser.add_argument("--llm-memo-path", help="LLM memo database shared by record and replay runs.")
+    args = parser.parse_args(argv)
+
+    fake = start_fake_ollama(tokens_per_second=args.tokens_per_second, latency=args.latency,
+                             load_seconds=args.load_seconds)
+    ollama_url = f"http://127.0.0.1:{fake.server_address[1]}"
+    data_dir = tempfile.mkdtemp(prefix="analysis-bench-data-")
+    try:
+        report = {
+            "settings": {k: v for k, v in vars(args).items() if k not in ("output", "baseline")},
+            "datasets": [bench_dataset(rows, args, ollama_url, data_dir) for rows in args.sizes],
+            "fake_ollama": fake.fake.stats(),
+        }
+    finally:
+        fake.shutdown()
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    print(format_report(report))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare_to_baseline(report, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+"""Cold-start benchmark of the analysis API.
+
+Measures, over several fresh processes, how long `import app` takes (and whether
+it pulls in crewai), how long a uvicorn server takes to answer its first health
+check on "/", and how long until "/ready" reports that crewai and the LLM pool
+are loaded. The server runs against a fake Ollama server, as in benchmarks.run.
+
+    python -m benchmarks.startup --runs 5 --output startup.json
+    python -m benchmarks.startup --baseline startup_baseline.json   # exit 1 on regression
+
+Run from the crewai_agents folder.
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+from benchmarks.fake_ollama import start_fake_ollama
+from benchmarks.run import APP_DIR, ApiServer, percentile
+
+IMPORT_SCRIPT = ("import json, sys, time; started = time.perf_counter(); import app; "
+                 "print(json.dumps({'seconds': time.perf_counter() - started, 'crewai': 'crewai' in sys.modules}))")
+METRICS = ("import_seconds", "first_health_seconds", "ready_seconds")
+
+
+def time_import() -> dict:
+    """Imports app in a fresh interpreter and returns its import time and whether crewai was loaded."""
+    env = dict(os.environ, PYTHONPATH=APP_DIR + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    output = subprocess.run([sys.executable, "-c", IMPORT_SCRIPT], cwd=APP_DIR, env=env, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def time_server(ollama_url: str, log_path: str) -> dict:
+    """Starts one server and times its first healthy response and its readiness."""
+    server = ApiServer(ollama_url, workers=1, queue_size=1, log_path=log_path)
+    try:
+        first_health = server.wait_ready(path="/")
+        ready = first_health + server.wait_ready(path="/ready")
+        return {"first_health_seconds": round(first_health, 4), "ready_seconds": round(ready, 4)}
+    finally:
+        server.stop()
+
+
+def summarize(runs: list) -> dict:
+    summary = {}
+    for metric in METRICS:
+        values = [run[metric] for run in runs]
+        summary[metric] = {"p50": percentile(values, 50), "max": round(float(np.max(values)), 4)}
+    summary["crewai_imported"] = any(run["crewai_imported"] for run in runs)
+    return summary
+
+
+def compare_to_baseline(report: dict, baseline: dict, tolerance: float) -> list:
+    """Lists median startup times that regressed beyond tolerance, and crewai being imported again."""
+    regressions = []
+    before = baseline.get("summary", {})
+    for metric in METRICS:
+        new, old = report["summary"][metric]["p50"], before.get(metric, {}).get("p50")
+        if old and new > old * (1 + tolerance):
+            regressions.append(f"{metric}: p50 {new}s > {old}s")
+    if report["summary"]["crewai_imported"] and before.get("crewai_imported") is False:
+        regressions.append("import app loads crewai again")
+    return regressions
+
+
+def format_report(report: dict) -> str:
+    summary = report["summary"]
+    lines = [f"{metric:>22}: p50 {summary[metric]['p50']}s  max {summary[metric]['max']}s" for metric in METRICS]
+    lines.append(f"{'crewai on import':>22}: {summary['crewai_imported']}")
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark import time and time to first healthy response.")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh processes per measurement.")
+    parser.add_argument("--output", help="Write the JSON report here.")
+    parser.add_argument("--baseline", help="Compare against this JSON report and exit 1 on regression.")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression.")
+    args = parser.parse_args(argv)
+
+    fake = start_fake_ollama(tokens_per_second=0, latency=0, load_seconds=0)
+    ollama_url = f"http://127.0.0.1:{fake.server_address[1]}"
+    log_dir = tempfile.mkdtemp(prefix="analysis-startup-")
+    try:
+        runs = []
+        for run in range(args.runs):
+            imported = time_import()
+            timings = time_server(ollama_url, os.path.join(log_dir, f"server_{run}.log"))
+            runs.append({"import_seconds": round(imported["seconds"], 4), "crewai_imported": imported["crewai"],
+                         **timings})
+    finally:
+        fake.shutdown()
+        shutil.rmtree(log_dir, ignore_errors=True)
+
+    report = {"runs": runs, "summary": summarize(runs)}
+    print(format_report(report))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare_to_baseline(report, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
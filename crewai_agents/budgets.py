@@ -0,0 +1,179 @@
+import contextvars
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+import yaml
+
+from tracing import DELEGATION_TOOL_MARKER, metrics
+
+logger = logging.getLogger(__name__)
+
+DEADLINE = "deadline"
+LLM_CALLS = "llm_calls"
+# Set by use_budget(); crewai hooks consult the budget of the request they run for.
+_current_budget = contextvars.ContextVar("request_budget", default=None)
+_hooks_registered = False
+_hooks_lock = threading.Lock()
+
+metrics.counter("analysis_budget_exhausted_total", "Analyses stopped early by their budget, by reason.")
+metrics.counter("analysis_delegations_blocked_total", "Delegations refused because the agent used up its rounds.")
+
+
+class AgentLimits:
+    """How many LLM calls and delegation rounds one agent may use per request; None means no limit."""
+
+    def __init__(self, max_llm_calls: Optional[int] = None, max_delegations: Optional[int] = None):
+        self.max_llm_calls = max_llm_calls
+        self.max_delegations = max_delegations
+
+    def to_dict(self) -> dict:
+        return {"max_llm_calls": self.max_llm_calls, "max_delegations": self.max_delegations}
+
+
+def load_agent_limits(agents_file: str, defaults: Optional[AgentLimits] = None) -> dict:
+    """Reads max_llm_calls and max_delegations of each agent in agents.yml, keyed by role.
+
+    Agents that leave a limit out get the one in defaults.
+    """
+    defaults = defaults or AgentLimits()
+    with open(agents_file, 'r') as f:
+        agent_configs = yaml.safe_load(f) or []
+    return {agent_config['role']: AgentLimits(agent_config.get("max_llm_calls", defaults.max_llm_calls),
+                                              agent_config.get("max_delegations", defaults.max_delegations))
+            for agent_config in agent_configs}
+
+
+class RequestBudget:
+    """Deadline, LLM calls and delegation rounds left to one analysis request.
+
+    Every task of the request draws on the same budget, since it travels in a
+    context variable (see use_budget). Once the deadline passes or an agent has
+    made its max_llm_calls, further LLM calls are refused and exhausted names
+    the reason, so the caller can return what the crew finished so far. An agent
+    past its max_delegations is refused further delegations but carries on with
+    what it has.
+    """
+
+    def __init__(self, deadline_seconds: Optional[float] = None, limits: Optional[dict] = None,
+                 defaults: Optional[AgentLimits] = None):
+        self.started = time.monotonic()
+        self.deadline_seconds = deadline_seconds
+        self.deadline = self.started + deadline_seconds if deadline_seconds else None
+        self.limits = limits or {}
+        self.defaults = defaults or AgentLimits()
+        self.llm_calls = {}
+        self.delegations = {}
+        self.delegations_blocked = 0
+        self.exhausted = None
+        self.exhausted_by = None
+        self._lock = threading.Lock()
+
+    def limits_for(self, role: Optional[str]) -> AgentLimits:
+        return self.limits.get(role, self.defaults)
+
+    def _exhaust(self, reason: str, role: Optional[str]) -> None:
+        # The first reason wins; callers already hold the lock.
+        if self.exhausted is None:
+            self.exhausted, self.exhausted_by = reason, role
+            metrics.inc("analysis_budget_exhausted_total", reason=reason)
+            logger.info("Analysis budget exhausted (%s) by %s after %.1fs", reason, role, self.elapsed())
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def allow_llm_call(self, role: Optional[str]) -> bool:
+        """Counts one LLM call by this agent, or refuses it if the budget has run out."""
+        with self._lock:
+            if self.exhausted is None and self.deadline is not None and time.monotonic() >= self.deadline:
+                self._exhaust(DEADLINE, role)
+            limit = self.limits_for(role).max_llm_calls
+            if self.exhausted is None and limit is not None and self.llm_calls.get(role, 0) >= limit:
+                self._exhaust(LLM_CALLS, role)
+            if self.exhausted is not None:
+                return False
+            self.llm_calls[role] = self.llm_calls.get(role, 0) + 1
+            return True
+
+    def allow_delegation(self, role: Optional[str]) -> bool:
+        """Counts one delegation round by this agent, or refuses it past the agent's max_delegations."""
+        with self._lock:
+            limit = self.limits_for(role).max_delegations
+            if self.exhausted is not None or (limit is not None and self.delegations.get(role, 0) >= limit):
+                self.delegations_blocked += 1
+                metrics.inc("analysis_delegations_blocked_total", agent=role or "")
+                return False
+            self.delegations[role] = self.delegations.get(role, 0) + 1
+            return True
+
+    def usage(self) -> dict:
+        with self._lock:
+            return {"reason": self.exhausted, "agent": self.exhausted_by, "elapsed_seconds": round(self.elapsed(), 3),
+                    "deadline_seconds": self.deadline_seconds, "llm_calls": dict(self.llm_calls),
+                    "delegations": dict(self.delegations), "delegations_blocked": self.delegations_blocked}
+
+
+@contextmanager
+def use_budget(budget: Optional[RequestBudget]):
+    """Applies the budget to crewai LLM calls and delegations made in this context and contexts copied from it."""
+    token = _current_budget.set(budget)
+    try:
+        yield budget
+    finally:
+        _current_budget.reset(token)
+
+
+def _agent_role(context) -> Optional[str]:
+    agent = getattr(context, "agent", None)
+    return getattr(agent, "role", None)
+
+
+def _before_llm_call(context):
+    budget = _current_budget.get()
+    if budget is not None and not budget.allow_llm_call(_agent_role(context)):
+        # Returning False makes crewai refuse the call, which ends the crew run.
+        return False
+    return None
+
+
+def _before_tool_call(context):
+    budget = _current_budget.get()
+    if budget is None or DELEGATION_TOOL_MARKER not in (context.tool_name or "").lower():
+        return None
+    if not budget.allow_delegation(_agent_role(context)):
+        # The agent gets a "blocked" tool result and has to answer without another round.
+        return False
+    return None
+
+
+def register_budget_hooks():
+    """Makes crewai check the request budget before each LLM call and delegation; call once crewai is loaded."""
+    global _hooks_registered
+    with _hooks_lock:
+        if _hooks_registered:
+            return
+        from crewai.hooks.llm_hooks import register_before_llm_call_hook
+        from crewai.hooks.tool_hooks import register_before_tool_call_hook
+        register_before_llm_call_hook(_before_llm_call)
+        register_before_tool_call_hook(_before_tool_call)
+        _hooks_registered = True
+
+
+def partial_report(budget: RequestBudget, tasks: list) -> tuple:
+    """Builds the best answer from the tasks a crew finished before its budget ran out.
+
+    Returns the report, headed by a notice that it is partial, and a summary of
+    what was and was not completed.
+    """
+    completed = [task for task in tasks if getattr(task, "output", None) is not None]
+    names = [task.name or task.description[:60] for task in tasks]
+    done = [name for task, name in zip(tasks, names) if task in completed]
+    pending = [name for task, name in zip(tasks, names) if task not in completed]
+    reason = ("the deadline of %gs passed" % budget.deadline_seconds if budget.exhausted == DEADLINE
+              else "%s reached its limit of LLM calls" % (budget.exhausted_by or "an agent"))
+    notice = (f"> **Partial result:** the analysis stopped early because {reason}. "
+              f"Completed: {', '.join(done) or 'nothing'}. Not completed: {', '.join(pending) or 'nothing'}.")
+    body = completed[-1].output.raw if completed else "No task finished before the budget ran out."
+    return f"{notice}\n\n{body}", {**budget.usage(), "completed_tasks": done, "pending_tasks": pending}
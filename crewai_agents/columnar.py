@@ -0,0 +1,45 @@
+import os
+import threading
+
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.feather as feather
+
+from file_hashes import content_hash
+
+
+def columnar_path(columnar_dir: str, file_hash: str) -> str:
+    """Location of the columnar copy of a file with the given content hash."""
+    return os.path.join(columnar_dir, f"{file_hash}.arrow")
+
+
+def convert_csv(csv_path, columnar_dir: str, file_hash: str = None) -> str:
+    """Converts a CSV once into an uncompressed Arrow IPC file named by its content hash.
+
+    Uncompressed Arrow files can be memory-mapped, so readers get column buffers
+    straight from the page cache instead of re-parsing the CSV. An existing copy for
+    the same content is reused.
+    """
+    file_hash = file_hash or content_hash(csv_path)
+    path = columnar_path(columnar_dir, file_hash)
+    if os.path.exists(path):
+        return path
+    os.makedirs(columnar_dir, exist_ok=True)
+    table = pa_csv.read_csv(csv_path)
+    # Threads of one process may convert the same CSV at once; each writes its own file.
+    tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    feather.write_feather(table, tmp_path, compression="uncompressed")
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_table(path) -> pa.Table:
+    """Memory-maps an Arrow IPC file without copying its buffers."""
+    with pa.memory_map(path, "r") as source:
+        return pa.ipc.open_file(source).read_all()
+
+
+def find_columnar(csv_path, columnar_dir: str):
+    """Returns the columnar copy of csv_path if one exists for its current content."""
+    path = columnar_path(columnar_dir, content_hash(csv_path))
+    return path if os.path.exists(path) else None
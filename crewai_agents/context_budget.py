@@ -0,0 +1,201 @@
+import logging
+import re
+from typing import Any, Optional
+
+from crewai import Task
+from pydantic import Field, PrivateAttr
+
+logger = logging.getLogger(__name__)
+
+# Longer tables are collapsed to their header, a few rows and per-column summaries.
+MAX_TABLE_ROWS = 10
+TABLE_PREVIEW_ROWS = 3
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+_WORD_PATTERN = re.compile(r"[a-z0-9]+")
+_SEPARATOR_PATTERN = re.compile(r"^\|?[\s:|-]+\|?$")
+
+
+def count_tokens(text: Optional[str]) -> int:
+    """Approximate LLM token count: one per punctuation mark, one per four characters of a word.
+
+    Close enough to BPE tokenizers (gemma, llama, gpt) to size budgets without loading one.
+    """
+    if not text:
+        return 0
+    return sum((len(piece) + 3) // 4 for piece in _TOKEN_PATTERN.findall(text))
+
+
+def dedupe_lines(text: str) -> str:
+    """Drops repeated non-blank lines (e.g. rows retrieved twice), keeping the first occurrence."""
+    seen = set()
+    lines = []
+    for line in text.splitlines():
+        key = " ".join(line.split())
+        if key and not _SEPARATOR_PATTERN.match(key):
+            if key in seen:
+                continue
+            seen.add(key)
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def _split_row(line: str) -> list:
+    line = line.strip()
+    if line.startswith("|"):
+        return [cell.strip() for cell in line.strip("|").split("|")]
+    return [cell.strip() for cell in line.split(",")]
+
+
+def _is_table_row(line: str) -> bool:
+    stripped = line.strip()
+    return stripped.count("|") >= 2 or (stripped.count(",") >= 2 and not stripped.endswith("."))
+
+
+def summarize_table(rows: list) -> list:
+    """Collapses a long table to its header, the first rows and min/mean/max of numeric columns."""
+    header = rows[0]
+    body = [row for row in rows[1:] if not _SEPARATOR_PATTERN.match(row.strip())]
+    columns = _split_row(header)
+    summaries = []
+    for i, column in enumerate(columns):
+        values = []
+        for row in body:
+            cells = _split_row(row)
+            try:
+                values.append(float(cells[i].replace(",", "")))
+            except (IndexError, ValueError):
+                pass
+        if values:
+            summaries.append(f"{column}: min={min(values):g}, mean={sum(values) / len(values):g}, "
+                             f"max={max(values):g}")
+    separator = [rows[1]] if _SEPARATOR_PATTERN.match(rows[1].strip()) else []
+    kept = [header] + separator + body[:TABLE_PREVIEW_ROWS]
+    note = f"... {len(body) - TABLE_PREVIEW_ROWS} more rows omitted"
+    if summaries:
+        note += "; column summary: " + "; ".join(summaries)
+    return kept + [note]
+
+
+def summarize_tables(text: str, max_rows: int = MAX_TABLE_ROWS) -> str:
+    """Replaces every table-like run of more than max_rows lines with a summary."""
+    lines = text.splitlines()
+    output = []
+    i = 0
+    while i < len(lines):
+        j = i
+        while j < len(lines) and _is_table_row(lines[j]):
+            j += 1
+        if j - i > max_rows + 1:
+            output.extend(summarize_table(lines[i:j]))
+            i = j
+        else:
+            output.extend(lines[i:max(j, i + 1)])
+            i = max(j, i + 1)
+    return "\n".join(output)
+
+
+def truncate_by_relevance(text: str, budget: int, query: str) -> str:
+    """Keeps the paragraphs sharing most words with the query, in their original order, within budget."""
+    paragraphs = [p for p in re.split(r"\n\s*\n", text) if p.strip()]
+    query_words = set(_WORD_PATTERN.findall(query.lower()))
+    ranked = sorted(range(len(paragraphs)), key=lambda i: (
+        -len(query_words & set(_WORD_PATTERN.findall(paragraphs[i].lower()))), i))
+    keep = set()
+    used = 0
+    for i in ranked:
+        tokens = count_tokens(paragraphs[i])
+        if used + tokens <= budget:
+            keep.add(i)
+            used += tokens
+    if not keep and paragraphs:
+        # Not even the most relevant paragraph fits: cut it down to the budget.
+        best = paragraphs[ranked[0]]
+        pieces = _TOKEN_PATTERN.finditer(best)
+        end = 0
+        for piece in pieces:
+            used += (len(piece.group()) + 3) // 4
+            if used > budget:
+                break
+            end = piece.end()
+        return best[:end] + "\n[... truncated to fit the context budget]"
+    kept = [paragraphs[i] for i in sorted(keep)]
+    omitted = len(paragraphs) - len(kept)
+    if omitted:
+        kept.append(f"[... {omitted} less relevant sections omitted to fit the context budget]")
+    return "\n\n".join(kept)
+
+
+def compact_context(text: str, budget: int, query: str = "") -> str:
+    """Shrinks upstream task output to about budget tokens.
+
+    Stages run only while the text is still over budget: drop duplicate rows,
+    collapse long tables into summaries, then keep the paragraphs most relevant
+    to the query.
+    """
+    if count_tokens(text) <= budget:
+        return text
+    text = dedupe_lines(text)
+    if count_tokens(text) <= budget:
+        return text
+    text = summarize_tables(text)
+    if count_tokens(text) <= budget:
+        return text
+    return truncate_by_relevance(text, budget, query)
+
+
+class BudgetedTask(Task):
+    """Task whose upstream context is compacted to a token budget before its agent sees it.
+
+    After execution, token_report holds the context size before and after
+    compaction and an estimate of the prompt size, for tuning the budgets.
+    If llm is set, this task runs on a copy of its agent that uses it instead
+    of the agent's own LLM, e.g. a small model for formatting.
+    """
+
+    context_token_budget: Optional[int] = Field(
+        default=None, description="Maximum tokens of upstream task output passed to this task.")
+    llm: Optional[Any] = Field(default=None, exclude=True, description="LLM the agent uses for this task.")
+    _token_report: Optional[dict] = PrivateAttr(default=None)
+
+    def copy(self, agents, task_mapping):
+        copied = super().copy(agents, task_mapping)
+        copied.llm = self.llm
+        return copied
+
+    @property
+    def token_report(self) -> Optional[dict]:
+        return self._token_report
+
+    def _budget_context(self, context: Optional[str], agent) -> Optional[str]:
+        context_tokens = count_tokens(context)
+        if context and self.context_token_budget and context_tokens > self.context_token_budget:
+            context = compact_context(context, self.context_token_budget, self.description)
+        agent = agent or self.agent
+        persona = f"{agent.role} {agent.goal} {agent.backstory}" if agent else ""
+        self._token_report = {
+            "task": self.name or self.description,
+            "context_token_budget": self.context_token_budget,
+            "context_tokens": context_tokens,
+            "compacted_context_tokens": count_tokens(context),
+            "prompt_tokens": count_tokens(f"{persona}\n{self.description}\n{self.expected_output}\n{context or ''}"),
+        }
+        logger.info("Task %r prompt tokens: %s", self._token_report["task"], self._token_report)
+        return context
+
+    def _task_agent(self, agent):
+        # ParallelCrew may run other tasks of the same agent at once, so the agent itself is left alone.
+        agent = agent or self.agent
+        if self.llm is None or agent is None:
+            return agent
+        copied = agent.copy()
+        copied.llm = self.llm
+        copied.crew = agent.crew
+        copied.step_callback = agent.step_callback
+        copied.function_calling_llm = agent.function_calling_llm
+        return copied
+
+    def _execute_core(self, agent, context, tools):
+        return super()._execute_core(self._task_agent(agent), self._budget_context(context, agent), tools)
+
+    async def _aexecute_core(self, agent, context, tools):
+        return await super()._aexecute_core(self._task_agent(agent), self._budget_context(context, agent), tools)
@@ -0,0 +1,102 @@
+import logging
+import os
+import threading
+import time
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def files_signature(paths: list) -> tuple:
+    """Returns a cheap change-detection signature (mtime and size) for a list of files."""
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            signature.append((path, stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            signature.append((path, None, None))
+    return tuple(signature)
+
+
+class CrewRegistry:
+    """Long-lived cache of built crews, one template per knowledge file.
+
+    A template is rebuilt only when one of the files it was built from (agents/tasks
+    YAML or the knowledge file) changes on disk. Requests receive a copy of the
+    template so concurrent kickoffs never share task or agent state. With a measure
+    callable, each template's in-memory size is recorded when it is built.
+    """
+
+    def __init__(self, build_crew: Callable, source_files: Callable, measure: Optional[Callable] = None):
+        self._build_crew = build_crew
+        self._source_files = source_files
+        self._measure = measure
+        self._templates = {}
+        self._sizes = {}
+        self._lock = threading.Lock()
+        self._build_locks = {}
+        self.builds = 0
+        self.build_seconds = 0.0
+
+    def _template(self, knowledge_file: str):
+        signature = files_signature(self._source_files(knowledge_file))
+        with self._lock:
+            cached = self._templates.get(knowledge_file)
+            if cached and cached[0] == signature:
+                return cached[1]
+            build_lock = self._build_locks.setdefault(knowledge_file, threading.Lock())
+
+        # Build outside the registry lock so other knowledge files stay available,
+        # but only once per knowledge file when several requests miss together.
+        with build_lock:
+            with self._lock:
+                cached = self._templates.get(knowledge_file)
+                if cached and cached[0] == signature:
+                    return cached[1]
+            logger.info("Building crew for %s", knowledge_file)
+            started = time.perf_counter()
+            crew = self._build_crew(knowledge_file)
+            size = self._measure(crew) if self._measure else 0
+            with self._lock:
+                self._templates[knowledge_file] = (signature, crew)
+                self._sizes[knowledge_file] = size
+                self.builds += 1
+                self.build_seconds += time.perf_counter() - started
+            return crew
+
+    def get_crew(self, knowledge_file: str):
+        """Returns a ready-to-run crew for the knowledge file, rebuilding it if its sources changed."""
+        return self._template(knowledge_file).copy()
+
+    def warm(self, knowledge_file: str) -> None:
+        """Builds the template ahead of the first request, logging instead of raising on failure."""
+        try:
+            self._template(knowledge_file)
+        except Exception:
+            logger.exception("Failed to preload crew for %s", knowledge_file)
+
+    def stats(self) -> dict:
+        """Reports how many templates were built and the time spent building them (knowledge loading included)."""
+        with self._lock:
+            return {"templates": len(self._templates), "builds": self.builds,
+                    "build_seconds": round(self.build_seconds, 4)}
+
+    def memory_bytes(self, matches: Callable) -> int:
+        """In-memory size of the templates whose knowledge file key satisfies matches(key)."""
+        with self._lock:
+            return sum(size for key, size in self._sizes.items() if matches(key))
+
+    def evict(self, matches: Callable) -> int:
+        """Drops the templates whose knowledge file key satisfies matches(key); returns how many."""
+        with self._lock:
+            keys = [key for key in self._templates if matches(key)]
+            for key in keys:
+                del self._templates[key]
+                self._sizes.pop(key, None)
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._templates.clear()
+            self._sizes.clear()
@@ -0,0 +1,178 @@
+import threading
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from columnar import convert_csv, read_table
+from file_hashes import content_hash
+
+# String columns with at most this many distinct values are treated as categories.
+MAX_CATEGORIES = 50
+AGGREGATIONS = ("mean", "sum", "count", "min", "max", "median")
+# Aggregations that only make sense over numbers; count, min and max also work on text and dates.
+NUMERIC_AGGREGATIONS = ("mean", "sum", "median")
+
+
+def load_dataset(path, columnar_file: Optional[str] = None) -> pd.DataFrame:
+    """Loads a CSV into typed columns: dates parsed, low-cardinality strings as categoricals.
+
+    When a columnar (Arrow) copy of the file is given it is memory-mapped instead of parsing the CSV.
+    """
+    if columnar_file:
+        df = read_table(columnar_file).to_pandas(date_as_object=False)
+    elif str(path).lower().endswith(".xlsx"):
+        df = pd.read_excel(path)
+    else:
+        df = pd.read_csv(path)
+    return type_columns(df)
+
+
+def type_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Parses date-named string columns and turns low-cardinality string columns into categoricals."""
+    for column in df.columns:
+        if df[column].dtype != object and not pd.api.types.is_string_dtype(df[column]):
+            continue
+        if "date" in column.lower():
+            parsed = pd.to_datetime(df[column], errors="coerce")
+            if parsed.notna().any():
+                df[column] = parsed
+                continue
+        if df[column].nunique(dropna=True) <= MAX_CATEGORIES:
+            df[column] = df[column].astype("category")
+    return df
+
+
+def column_stats(series: pd.Series) -> dict:
+    """Summary statistics for one column."""
+    stats = {"dtype": str(series.dtype), "count": int(series.count()), "nulls": int(series.isna().sum())}
+    if pd.api.types.is_numeric_dtype(series):
+        values = series.to_numpy(dtype=float, na_value=np.nan)
+        if stats["count"]:
+            p25, median, p75 = np.nanpercentile(values, [25, 50, 75])
+            stats.update({name: round(float(value), 4) for name, value in (
+                ("mean", np.nanmean(values)), ("std", np.nanstd(values)), ("min", np.nanmin(values)),
+                ("p25", p25), ("median", median), ("p75", p75), ("max", np.nanmax(values)))})
+    elif pd.api.types.is_datetime64_any_dtype(series):
+        stats.update(min=str(series.min().date()), max=str(series.max().date()))
+    else:
+        stats["unique"] = int(series.nunique())
+        # Identifier-like columns (every value distinct) have no meaningful top values.
+        if stats["unique"] < stats["count"]:
+            counts = series.value_counts().head(10)
+            stats["top_values"] = {str(k): int(v) for k, v in counts.items()}
+    return stats
+
+
+class DatasetProfile:
+    """A dataset held as typed pandas columns with precomputed statistics.
+
+    Per-column stats and group-by summaries (every numeric column aggregated over
+    every categorical column) are computed once, so agents get exact numbers from
+    compact tables instead of reasoning over raw rows.
+    """
+
+    def __init__(self, df: pd.DataFrame, name: str = "", file_hash: Optional[str] = None):
+        self.df = df
+        self.name = name
+        # Content hash of the file the dataset came from, when known; keys memoized KPI tables.
+        self.file_hash = file_hash
+        self.columns = {column: column_stats(df[column]) for column in df.columns}
+        self.categorical_columns = [c for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)]
+        self.numeric_columns = [c for c in df.columns if pd.api.types.is_numeric_dtype(df[c])]
+        self.group_summaries = {
+            column: df.groupby(column, observed=True)[self.numeric_columns].agg(["mean", "sum", "count"])
+            for column in self.categorical_columns
+        } if self.numeric_columns else {}
+
+    @classmethod
+    def from_path(cls, path, name: str = "", columnar_file: Optional[str] = None,
+                  file_hash: Optional[str] = None) -> "DatasetProfile":
+        return cls(load_dataset(path, columnar_file), name=name, file_hash=file_hash)
+
+    def describe(self) -> str:
+        """Compact text overview of the dataset suitable for an LLM prompt."""
+        lines = [f"Dataset {self.name}: {len(self.df)} rows, {len(self.df.columns)} columns."]
+        for column, stats in self.columns.items():
+            details = ", ".join(f"{k}={v}" for k, v in stats.items() if k not in ("dtype",))
+            lines.append(f"- {column} ({stats['dtype']}): {details}")
+        return "\n".join(lines)
+
+    def apply_filters(self, filters: Optional[Dict[str, Any]]) -> pd.DataFrame:
+        """Returns the rows matching every column == value filter."""
+        df = self.df
+        if not filters:
+            return df
+        mask = np.ones(len(df), dtype=bool)
+        for column, value in filters.items():
+            if column not in df.columns:
+                raise ValueError(f"Unknown column '{column}'. Available columns: {', '.join(df.columns)}")
+            values = value if isinstance(value, list) else [value]
+            mask &= df[column].astype(str).isin([str(v) for v in values]).to_numpy()
+        return df[mask]
+
+    def aggregate(self, metric: str, agg: str = "mean", group_by: Optional[str] = None,
+                  filters: Optional[Dict[str, Any]] = None, top_k: Optional[int] = None,
+                  ascending: bool = False) -> pd.DataFrame:
+        """Aggregates a metric column, optionally per group, after filtering."""
+        if agg not in AGGREGATIONS:
+            raise ValueError(f"Unsupported aggregation '{agg}'. Use one of: {', '.join(AGGREGATIONS)}")
+        for column in (metric, group_by):
+            if column is not None and column not in self.df.columns:
+                raise ValueError(f"Unknown column '{column}'. Available columns: {', '.join(self.df.columns)}")
+        if agg in NUMERIC_AGGREGATIONS and metric not in self.numeric_columns:
+            raise ValueError(f"Cannot compute the {agg} of '{metric}', which holds {self.df[metric].dtype} values. "
+                             f"Numeric columns: {', '.join(self.numeric_columns) or 'none'}")
+        if group_by is None:
+            df = self.apply_filters(filters)
+            return pd.DataFrame({metric: [getattr(df[metric], agg)()]}, index=[agg])
+        if not filters and agg in ("mean", "sum", "count") and group_by in self.group_summaries \
+                and metric in self.numeric_columns:
+            result = self.group_summaries[group_by][metric][[agg]]
+        else:
+            df = self.apply_filters(filters)
+            result = df.groupby(group_by, observed=True)[metric].agg([agg])
+        result = result.rename(columns={agg: f"{agg}_{metric}"}).sort_values(f"{agg}_{metric}", ascending=ascending)
+        return result.head(top_k) if top_k else result
+
+
+class DatasetProfileStore:
+    """Profiles keyed by file path, recomputed only when the file's content changes.
+
+    With a columnar_dir, each file content is converted to Arrow once and later
+    loads memory-map that copy instead of re-parsing the CSV.
+    """
+
+    def __init__(self, columnar_dir: Optional[str] = None):
+        self.columnar_dir = columnar_dir
+        self._profiles = {}
+        self._lock = threading.Lock()
+
+    def get(self, path) -> DatasetProfile:
+        path = str(path)
+        file_hash = content_hash(path)
+        with self._lock:
+            cached = self._profiles.get(path)
+        if cached and cached[0] == file_hash:
+            return cached[1]
+        is_csv = path.lower().endswith(".csv")
+        columnar_file = convert_csv(path, self.columnar_dir, file_hash) if self.columnar_dir and is_csv else None
+        profile = DatasetProfile.from_path(path, name=path.rsplit("/", 1)[-1], columnar_file=columnar_file,
+                                           file_hash=file_hash)
+        size = int(profile.df.memory_usage(deep=True).sum())
+        with self._lock:
+            self._profiles[path] = (file_hash, profile, size)
+        return profile
+
+    def memory_bytes(self, matches: Callable) -> int:
+        """In-memory size of the loaded datasets whose path satisfies matches(path)."""
+        with self._lock:
+            return sum(entry[2] for path, entry in self._profiles.items() if matches(path))
+
+    def evict(self, matches: Callable) -> int:
+        """Drops the profiles whose path satisfies matches(path); returns how many."""
+        with self._lock:
+            paths = [path for path in self._profiles if matches(path)]
+            for path in paths:
+                del self._profiles[path]
+            return len(paths)
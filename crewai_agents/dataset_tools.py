@@ -0,0 +1,84 @@
+from typing import Any, Dict, Optional, Type
+
+from crewai.tools import BaseTool
+from pydantic import BaseModel, Field
+
+from procurement_kpis import compute_kpi
+
+
+class DatasetQueryInput(BaseModel):
+    """Input schema for DatasetQueryTool."""
+
+    dataset: Optional[str] = Field(None, description="File name of the dataset to query; defaults to the first one.")
+    operation: str = Field("aggregate", description="'describe' for column statistics, 'aggregate' for a computed metric.")
+    metric: Optional[str] = Field(None, description="Column to aggregate, e.g. 'Negotiated_Price'.")
+    agg: str = Field("mean", description="One of mean, sum, count, min, max, median.")
+    group_by: Optional[str] = Field(None, description="Categorical column to group by, e.g. 'Item_Category'.")
+    filters: Optional[Dict[str, Any]] = Field(None, description="Exact-match filters, e.g. {'Order_Status': 'Delivered'}.")
+    top_k: Optional[int] = Field(None, description="Return only the first k groups after sorting.")
+    ascending: bool = Field(False, description="Sort groups ascending instead of descending.")
+
+
+class DatasetQueryTool(BaseTool):
+    name: str = "Dataset Query"
+    description: str = (
+        "Computes exact statistics over the loaded datasets. Use operation='describe' to list datasets, columns "
+        "and their statistics, or operation='aggregate' with a metric column, an aggregation, an optional "
+        "group_by column and optional filters to get exact aggregated numbers."
+    )
+    args_schema: Type[BaseModel] = DatasetQueryInput
+    profiles: Dict[str, Any] = Field(default_factory=dict, exclude=True)
+
+    def _run(self, dataset: Optional[str] = None, operation: str = "aggregate", metric: Optional[str] = None,
+             agg: str = "mean", group_by: Optional[str] = None, filters: Optional[Dict[str, Any]] = None,
+             top_k: Optional[int] = None, ascending: bool = False) -> str:
+        try:
+            if dataset is None and (operation == "describe" or metric is None):
+                return "\n\n".join(profile.describe() for profile in self.profiles.values())
+            name = dataset or next(iter(self.profiles))
+            if name not in self.profiles:
+                raise ValueError(f"Unknown dataset '{name}'. Available datasets: {', '.join(self.profiles)}")
+            profile = self.profiles[name]
+            if operation == "describe" or metric is None:
+                return profile.describe()
+            result = profile.aggregate(metric, agg, group_by, filters, top_k, ascending)
+            return result.to_string(float_format="{:.4f}".format)
+        except ValueError as e:
+            return f"Error: {e}"
+
+
+class ProcurementKPIInput(BaseModel):
+    """Input schema for ProcurementKPITool."""
+
+    kpi: str = Field(..., description="One of defect_rate, price_savings, lead_time, compliance_rate, scorecard.")
+    dataset: Optional[str] = Field(None, description="File name of the dataset; defaults to the first one.")
+    group_by: Optional[str] = Field(None, description="Column to compute the KPI per value of, e.g. 'Supplier' "
+                                                      "or 'Item_Category'. scorecard defaults to 'Supplier'.")
+    filters: Optional[Dict[str, Any]] = Field(None, description="Exact-match filters, e.g. {'Order_Status': 'Delivered'}.")
+    top_k: Optional[int] = Field(None, description="Return only the first k groups after ranking.")
+    ascending: bool = Field(False, description="Rank groups from the lowest value instead of the highest.")
+
+
+class ProcurementKPITool(BaseTool):
+    name: str = "Procurement KPIs"
+    description: str = (
+        "Computes exact procurement KPIs over the whole dataset, optionally per group and after filters: "
+        "defect_rate (defective units per unit received), price_savings (list vs negotiated spend), lead_time "
+        "(days from order to delivery: mean, spread, percentiles), compliance_rate, and scorecard (all of them "
+        "per supplier or another column). Use it instead of calculating these by hand."
+    )
+    args_schema: Type[BaseModel] = ProcurementKPIInput
+    profiles: Dict[str, Any] = Field(default_factory=dict, exclude=True)
+    memo: Optional[Any] = Field(None, exclude=True)
+
+    def _run(self, kpi: str, dataset: Optional[str] = None, group_by: Optional[str] = None,
+             filters: Optional[Dict[str, Any]] = None, top_k: Optional[int] = None, ascending: bool = False) -> str:
+        try:
+            name = dataset or next(iter(self.profiles))
+            if name not in self.profiles:
+                raise ValueError(f"Unknown dataset '{name}'. Available datasets: {', '.join(self.profiles)}")
+            result = compute_kpi(self.profiles[name], kpi, group_by, filters, self.memo, ascending)
+            result = result.head(top_k) if top_k else result
+            return result.to_string(float_format="{:.4f}".format)
+        except ValueError as e:
+            return f"Error: {e}"
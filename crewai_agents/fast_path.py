@@ -0,0 +1,287 @@
+import logging
+import re
+import threading
+from typing import Callable, Optional
+
+import pandas as pd
+
+from dataset_profile import DatasetProfile
+from schema_index import STOPWORDS
+
+logger = logging.getLogger(__name__)
+
+AGG_WORDS = {
+    "average": "mean", "avg": "mean", "mean": "mean", "total": "sum", "sum": "sum", "count": "count",
+    "number": "count", "many": "count", "median": "median", "maximum": "max", "max": "max",
+    "minimum": "min", "min": "min",
+}
+HIGH_WORDS = {"highest", "most", "top", "largest", "biggest", "best", "greatest"}
+LOW_WORDS = {"lowest", "least", "bottom", "smallest", "fewest", "worst"}
+# Questions asking for reasoning, time series or numeric comparisons need the full crew.
+COMPLEX_WORDS = {
+    "why", "explain", "trend", "trends", "compare", "comparison", "correlation", "correlate", "predict",
+    "forecast", "recommend", "recommendation", "insight", "insights", "summarize", "summary", "improve",
+    "over", "month", "monthly", "year", "yearly", "quarter", "week", "weekly", "daily", "than", "above",
+    "below", "between", "ratio", "percentage", "rate", "versus", "vs",
+}
+# Negations and exclusions invert a filter, which the plan cannot express.
+NEGATION_WORDS = {
+    "not", "no", "non", "none", "nor", "never", "excluding", "exclude", "excluded", "except", "without", "other",
+    "besides", "beside", "isn", "aren", "don", "doesn", "didn", "wasn", "weren",
+}
+# Question phrasing that needs no column, value or aggregation of its own.
+FILLER_WORDS = {
+    "do", "does", "did", "be", "was", "were", "there", "much", "value", "record", "row", "entry", "amount",
+    "overall", "dataset", "table", "file", "list", "find", "get", "tell", "can", "you", "please", "that", "these",
+    "those", "we", "our", "my", "its", "at", "as", "first", "last", "bottom", "whole", "across", "along",
+}
+# Metrics described by these words are averaged rather than summed when no aggregation is named.
+INTENSIVE_WORDS = {"price", "rate", "ratio", "percent", "pct", "score", "margin", "days", "duration", "age"}
+# Category values made only of these words are too common to be read as filters.
+COMMON_VALUES = STOPWORDS | {"yes", "no", "none", "other", "unknown", "true", "false"}
+AGG_LABELS = {"mean": "Average", "sum": "Total", "count": "Count", "median": "Median", "min": "Minimum",
+              "max": "Maximum"}
+MAX_QUERY_WORDS = 30
+DEFAULT_TOP_K = 5
+
+
+def singular(word: str) -> str:
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    return word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word
+
+
+# In the form words() gives them, so "this" or "besides" match however they were reduced.
+_NEGATIONS = {singular(word) for word in NEGATION_WORDS}
+_KNOWN_WORDS = {singular(word) for word in STOPWORDS | FILLER_WORDS | set(AGG_WORDS) | HIGH_WORDS | LOW_WORDS}
+
+
+def words(text: str) -> list:
+    """Lowercase word tokens with identifiers split into parts; plurals reduced to the singular."""
+    text = re.sub(r"([a-z])([A-Z])", r"\1 \2", str(text))
+    return [singular(word) for word in re.findall(r"[a-z0-9]+", text.lower())]
+
+
+class AggregatePlan:
+    """A question resolved into a single aggregate over one dataset."""
+
+    def __init__(self, metric: str, agg: str, group_by: Optional[str] = None, filters: Optional[dict] = None,
+                 top_k: Optional[int] = None, directions: tuple = ("desc",)):
+        self.metric = metric
+        self.agg = agg
+        self.group_by = group_by
+        self.filters = filters or {}
+        self.top_k = top_k
+        self.directions = directions
+
+    def to_dict(self) -> dict:
+        return {"metric": self.metric, "agg": self.agg, "group_by": self.group_by, "filters": self.filters,
+                "top_k": self.top_k, "directions": list(self.directions)}
+
+
+def _matching_columns(columns, query_words: set) -> list:
+    """Columns whose every name part appears in the question."""
+    return [column for column in columns if set(words(column)) <= query_words]
+
+
+def _match_filters(profile: DatasetProfile, query_words: set, exclude: tuple) -> dict:
+    filters = {}
+    for column in profile.categorical_columns:
+        if column in exclude:
+            continue
+        matched = []
+        for value in profile.df[column].cat.categories:
+            value_words = set(words(value))
+            if value_words and not value_words <= COMMON_VALUES and value_words <= query_words:
+                matched.append((value, value_words))
+        # "Partially Delivered" mentioned means "Delivered" was not meant on its own.
+        values = [value for value, value_words in matched
+                  if not any(value_words < other for _, other in matched)]
+        if values:
+            filters[column] = values[0] if len(values) == 1 else values
+    return filters
+
+
+def classify(query: str, profile: DatasetProfile) -> Optional[AggregatePlan]:
+    """Resolves a question into an AggregatePlan over the dataset, or None if it needs the crew.
+
+    Only unambiguous questions are accepted: a single named metric column (or a
+    row count), at most one categorical group-by column, exact category values
+    as filters, and an aggregation or highest/lowest wording. Questions with a
+    negation or exclusion, or with any word that is none of these, go to the
+    crew rather than being answered without it.
+    """
+    query_words_list = words(query)
+    query_words = set(query_words_list)
+    if len(query_words_list) > MAX_QUERY_WORDS or query_words & (COMPLEX_WORDS | _NEGATIONS):
+        return None
+    aggs = {AGG_WORDS[word] for word in query_words if word in AGG_WORDS}
+    if aggs == {"sum", "count"} and "number" in query_words:
+        aggs = {"count"}  # "total number of ..."
+    directions = tuple(d for d, vocabulary in (("desc", HIGH_WORDS), ("asc", LOW_WORDS)) if query_words & vocabulary)
+    if len(aggs) > 1 or not (aggs or directions):
+        return None
+
+    metrics = _matching_columns(profile.numeric_columns, query_words)
+    groups = _matching_columns(profile.categorical_columns, query_words)
+    if len(metrics) > 1 or len(groups) > 1:
+        return None
+    metric = metrics[0] if metrics else None
+    group_by = groups[0] if groups else None
+    if metric is None and group_by is None:
+        return None
+
+    if aggs:
+        agg = aggs.pop()
+    elif metric is None:
+        agg = "count"
+    elif group_by is None:
+        agg = "max" if directions[0] == "desc" else "min"
+        directions = ()
+    else:
+        agg = "mean" if set(words(metric)) & INTENSIVE_WORDS else "sum"
+    if metric is None:
+        if agg != "count" or group_by is None:
+            return None
+        metric = group_by
+    if group_by is None:
+        directions = ()
+
+    top_k = None
+    number = re.search(r"\b(?:top|bottom|first|last)\s+(\d+)\b", query.lower())
+    if number:
+        top_k = int(number.group(1))
+    elif directions:
+        top_k = DEFAULT_TOP_K
+    filters = _match_filters(profile, query_words, exclude=(group_by,))
+    explained = _KNOWN_WORDS.union(*(words(column) for column in profile.df.columns),
+                                   *(words(value) for values in filters.values()
+                                     for value in (values if isinstance(values, list) else [values])))
+    unexplained = {word for word in query_words - explained if not word.isdigit()}
+    if unexplained:
+        logger.debug("Fast path declined %r: no column, value or aggregation for %s", query, sorted(unexplained))
+        return None
+    return AggregatePlan(metric, agg, group_by, filters, top_k, directions or ("desc",))
+
+
+def markdown_table(df: pd.DataFrame) -> str:
+    """Renders a small DataFrame (index included) as a Markdown table."""
+    index_name = df.index.name or ""
+    header = [index_name] + [str(column) for column in df.columns]
+    lines = ["| " + " | ".join(header) + " |", "|" + "---|" * len(header)]
+    for label, row in df.iterrows():
+        cells = [f"{value:,.4f}".rstrip("0").rstrip(".") if isinstance(value, float) else str(value)
+                 for value in row]
+        lines.append("| " + " | ".join([str(label)] + cells) + " |")
+    return "\n".join(lines)
+
+
+def describe_plan(plan: AggregatePlan, profile: DatasetProfile) -> str:
+    counts_rows = plan.agg == "count" and plan.metric == plan.group_by
+    title = "Number of records" if counts_rows else f"{AGG_LABELS[plan.agg]} {plan.metric}"
+    if plan.group_by:
+        title += f" by {plan.group_by}"
+    details = [f"computed directly from {profile.name}"]
+    if plan.filters:
+        details.append("where " + " and ".join(
+            f"{column} = {', '.join(value) if isinstance(value, list) else value}"
+            for column, value in plan.filters.items()))
+    return f"**{title}** ({', '.join(details)})"
+
+
+def answer(plan: AggregatePlan, profile: DatasetProfile) -> str:
+    """Computes the plan with the dataset's vectorized aggregate and formats the result."""
+    sections = [describe_plan(plan, profile)]
+    if plan.group_by is None:
+        value = profile.aggregate(plan.metric, plan.agg, filters=plan.filters).iloc[0, 0]
+        sections.append(f"{AGG_LABELS[plan.agg]} {plan.metric}: {value:,.4f}".rstrip("0").rstrip("."))
+        return "\n\n".join(sections)
+    for direction in plan.directions:
+        ascending = direction == "asc"
+        result = profile.aggregate(plan.metric, plan.agg, plan.group_by, plan.filters, plan.top_k, ascending)
+        if plan.metric == plan.group_by:
+            result.columns = ["records"]
+        if result.empty:
+            sections.append("No rows match the question's filters.")
+            break
+        if len(plan.directions) > 1 or plan.top_k:
+            label = "Lowest" if ascending else "Highest"
+            sections.append(f"{label}: {result.index[0]}")
+        sections.append(markdown_table(result))
+    return "\n\n".join(sections)
+
+
+def phrase_answer(llm, question: str, computed: str) -> str:
+    """Asks the LLM once to turn the computed figures into a short answer to the question."""
+    prompt = (f"Question: {question}\n\nExact figures computed from the dataset:\n{computed}\n\n"
+              "Answer the question in a few sentences using only these figures, then include the table.")
+    return llm.call([{"role": "user", "content": prompt}])
+
+
+class FastPathStats:
+    """Counts how questions were routed and estimates the time the fast path saved.
+
+    The saving is the mean crew run time minus the mean fast-path time, times the
+    number of fast-path answers; it is only reported once a crew run has been timed.
+    """
+
+    def __init__(self):
+        self.fast_path = 0
+        self.crew = 0
+        self.fast_path_seconds = 0.0
+        self.crew_runs = 0
+        self.crew_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record_fast_path(self, seconds: float) -> None:
+        with self._lock:
+            self.fast_path += 1
+            self.fast_path_seconds += seconds
+
+    def record_crew_route(self) -> None:
+        with self._lock:
+            self.crew += 1
+
+    def record_crew_run(self, seconds: float) -> None:
+        with self._lock:
+            self.crew_runs += 1
+            self.crew_seconds += seconds
+
+    def stats(self) -> dict:
+        with self._lock:
+            fast_avg = self.fast_path_seconds / self.fast_path if self.fast_path else None
+            crew_avg = self.crew_seconds / self.crew_runs if self.crew_runs else None
+            saved = None
+            if fast_avg is not None and crew_avg is not None:
+                saved = round(self.fast_path * max(0.0, crew_avg - fast_avg), 3)
+            return {
+                "fast_path": self.fast_path,
+                "crew": self.crew,
+                "crew_runs": self.crew_runs,
+                "fast_path_avg_seconds": round(fast_avg, 4) if fast_avg is not None else None,
+                "crew_avg_seconds": round(crew_avg, 4) if crew_avg is not None else None,
+                "estimated_seconds_saved": saved,
+            }
+
+
+def try_fast_path(query: str, profiles: dict, phrase: Optional[Callable] = None) -> Optional[tuple]:
+    """Answers the question from the first dataset it resolves against.
+
+    Returns (answer, plan, file name) or None when the question needs the full crew.
+    """
+    for file_name, profile in profiles.items():
+        plan = classify(query, profile)
+        if plan is None:
+            continue
+        try:
+            computed = answer(plan, profile)
+        except (ValueError, TypeError) as e:
+            logger.info("Fast path could not compute %s on %s: %s", plan.to_dict(), file_name, e)
+            continue
+        if phrase is not None:
+            try:
+                return phrase(query, computed), plan, file_name
+            except Exception:
+                logger.exception("Phrasing the fast-path answer failed; returning the computed figures")
+        return computed, plan, file_name
+    return None
@@ -0,0 +1,37 @@
+import hashlib
+import os
+import threading
+
+
+def file_sha256(path, block_size: int = 1 << 20) -> str:
+    """Returns the SHA-256 hex digest of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+_content_hashes = {}
+_content_hashes_lock = threading.Lock()
+
+
+def content_hash(path) -> str:
+    """Returns file_sha256(path), re-hashing only when the file's mtime or size changes."""
+    stat = os.stat(path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    with _content_hashes_lock:
+        cached = _content_hashes.get(str(path))
+    if cached and cached[0] == signature:
+        return cached[1]
+    digest = file_sha256(path)
+    with _content_hashes_lock:
+        _content_hashes[str(path)] = (signature, digest)
+    return digest
+
+
+def remember_content_hash(path, digest: str) -> None:
+    """Records a hash computed elsewhere (e.g. while writing the file) so it is not recomputed."""
+    stat = os.stat(path)
+    with _content_hashes_lock:
+        _content_hashes[str(path)] = ((stat.st_mtime_ns, stat.st_size), digest)
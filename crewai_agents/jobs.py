@@ -0,0 +1,226 @@
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+TIMED_OUT = "timed_out"
+FINISHED_STATES = {SUCCEEDED, FAILED, CANCELLED, TIMED_OUT}
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue has no room for another job."""
+
+
+class JobCancelled(Exception):
+    """Raised inside a running job once it has been cancelled or has timed out."""
+
+
+class Job:
+    """A single analysis run and its outcome."""
+
+    def __init__(self, timeout: Optional[float]):
+        self.id = uuid.uuid4().hex
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.timeout = timeout
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.future = None
+        self.cancel_event = threading.Event()
+        self.on_finish = None
+        self.cached = False
+        self.route = None
+        self.token_usage = None
+        self.timings = None
+        # Set when the analysis ran out of its budget and the result is what it finished (see budgets.py).
+        self.partial = None
+
+    def check_cancelled(self, *_):
+        """Raises JobCancelled if the job was cancelled or ran past its deadline.
+
+        Long-running work calls this at safe points (e.g. as a crew step callback),
+        since a worker thread cannot be interrupted from the outside.
+        """
+        if self.cancel_event.is_set():
+            raise JobCancelled(self.id)
+        if self.timeout and self.started_at and time.time() - self.started_at > self.timeout:
+            raise JobCancelled(self.id)
+
+    def to_dict(self) -> dict:
+        data = {"job_id": self.id, "status": self.status}
+        if self.status == SUCCEEDED:
+            data["result"] = self.result
+            if self.cached:
+                data["cached"] = True
+            if self.partial is not None:
+                data["partial"] = self.partial
+        elif self.error is not None:
+            data["error"] = str(self.error)
+        if self.route is not None:
+            data["route"] = self.route
+        if self.token_usage:
+            data["token_usage"] = self.token_usage
+        if self.timings is not None:
+            data["timings"] = self.timings
+        return data
+
+
+class JobManager:
+    """Runs blocking jobs on a bounded thread pool with a bounded backlog.
+
+    At most max_workers jobs run at once (size this to what the LLM backend can
+    serve concurrently) and at most max_queued more wait for a worker; submit()
+    raises QueueFullError beyond that so the API can shed load instead of piling up.
+    """
+
+    def __init__(self, max_workers: int = 1, max_queued: int = 8, timeout: Optional[float] = None,
+                 max_finished: int = 256):
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.timeout = timeout
+        self.max_finished = max_finished
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="analysis-job")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._closed = False
+        # Jobs whose future has not finished. A cancelled or timed-out job keeps its worker
+        # until it reaches its next check, so it holds its slot until then.
+        self._occupied = 0
+
+    def _release(self, _future) -> None:
+        with self._lock:
+            self._occupied -= 1
+
+    def submit(self, fn: Callable, *args, timeout: Optional[float] = None,
+               on_finish: Optional[Callable] = None) -> Job:
+        """Queues fn(job, *args) and returns its Job without waiting for it.
+
+        on_finish(job) is called once the job reaches a final state, whatever the outcome.
+        """
+        job = Job(timeout if timeout is not None else self.timeout)
+        job.on_finish = on_finish
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Job manager is shut down.")
+            if self._occupied >= self.max_workers + self.max_queued:
+                raise QueueFullError("Analysis queue is full, please retry later.")
+            self._jobs[job.id] = job
+            self._prune()
+            job.future = self._executor.submit(self._run, job, fn, args)
+            self._occupied += 1
+        # Outside the lock: the callback runs here at once if the future is already done.
+        job.future.add_done_callback(self._release)
+        return job
+
+    def add_completed(self, result, on_finish: Optional[Callable] = None, cached: bool = True,
+                      route: Optional[str] = None) -> Job:
+        """Records a job that already has its result (e.g. served from a cache or computed inline)."""
+        job = Job(None)
+        job.cached = cached
+        job.route = route
+        job.on_finish = on_finish
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        self._finish(job, SUCCEEDED, result=result)
+        return job
+
+    def _run(self, job: Job, fn: Callable, args: tuple):
+        with self._lock:
+            if job.status != QUEUED:
+                return
+            job.status = RUNNING
+            job.started_at = time.time()
+        timer = None
+        if job.timeout:
+            timer = threading.Timer(job.timeout, self._expire, args=(job,))
+            timer.daemon = True
+            timer.start()
+        try:
+            result = fn(job, *args)
+            self._finish(job, SUCCEEDED, result=result)
+        except JobCancelled:
+            self._finish(job, CANCELLED)
+        except Exception as e:
+            logger.exception("Job %s failed", job.id)
+            self._finish(job, FAILED, error=e)
+        finally:
+            if timer:
+                timer.cancel()
+
+    def _finish(self, job: Job, status: str, result=None, error: Optional[Exception] = None):
+        with self._lock:
+            # A job that already timed out or was cancelled keeps that outcome.
+            if job.status in FINISHED_STATES:
+                return
+            job.status = status
+            job.result = result
+            job.error = error
+            job.finished_at = time.time()
+        if job.on_finish is not None:
+            job.on_finish(job)
+
+    def _expire(self, job: Job):
+        job.cancel_event.set()
+        self._finish(job, TIMED_OUT, error=TimeoutError(f"Job exceeded its {job.timeout}s timeout."))
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in FINISHED_STATES]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancels a queued job outright, or asks a running job to stop at its next step."""
+        job = self.get(job_id)
+        if job is None:
+            return None
+        job.cancel_event.set()
+        if job.future is not None:
+            job.future.cancel()
+        self._finish(job, CANCELLED)
+        return job
+
+    async def wait(self, job: Job, timeout: Optional[float]) -> Job:
+        """Waits up to timeout seconds for a job to finish without blocking the event loop."""
+        deadline = time.monotonic() + (timeout or 0)
+        while job.status not in FINISHED_STATES and time.monotonic() < deadline:
+            await asyncio.sleep(min(0.05, max(0.0, deadline - time.monotonic())))
+        return job
+
+    def stats(self) -> dict:
+        with self._lock:
+            statuses = [job.status for job in self._jobs.values()]
+            occupied = self._occupied
+        return {
+            "max_workers": self.max_workers,
+            "max_queued": self.max_queued,
+            "queued": statuses.count(QUEUED),
+            "running": statuses.count(RUNNING),
+            "occupied": occupied,
+        }
+
+    def shutdown(self):
+        with self._lock:
+            self._closed = True
+            jobs = list(self._jobs.values())
+        for job in jobs:
+            if job.status in (QUEUED, RUNNING):
+                job.cancel_event.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,606 @@
+import contextvars
+import csv
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+from array import array
+from collections.abc import Sequence
+from concurrent.futures import Future
+from contextlib import contextmanager
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+import numpy as np
+from crewai.knowledge.source.base_file_knowledge_source import BaseFileKnowledgeSource
+from crewai.knowledge.source.csv_knowledge_source import CSVKnowledgeSource
+from crewai.knowledge.source.excel_knowledge_source import ExcelKnowledgeSource
+from crewai.knowledge.source.pdf_knowledge_source import PDFKnowledgeSource
+from crewai.knowledge.storage.base_knowledge_storage import BaseKnowledgeStorage
+from pydantic import Field, PrivateAttr
+
+from file_hashes import content_hash
+
+# Bumped whenever chunking or the entry layout changes, so older entries are not reused.
+INDEX_FORMAT = 3
+# Chunks embedded per call at most; the text of a batch is also capped by batch_bytes.
+EMBED_BATCH_CHUNKS = 256
+DEFAULT_BATCH_BYTES = 4 * 1024 * 1024
+NORM_BLOCK_ROWS = 65536
+_WORD_PATTERN = re.compile(r"\w+")
+# Set by use_retrieval_memo(); searches made while it is set are shared through it.
+_retrieval_memo = contextvars.ContextVar("retrieval_memo", default=None)
+
+
+def chunk_digest(chunk: str) -> bytes:
+    """16-byte content hash used to match chunks between index versions."""
+    return hashlib.blake2b(chunk.encode("utf-8"), digest_size=16).digest()
+
+
+def iter_row_chunks(lines: Iterable[str], chunk_size: int, header: str = "") -> Iterator[str]:
+    """Groups rows into chunks whose boundaries depend only on the rows around them.
+
+    A chunk ends after a row with probability len(row) / (chunk_size / 2), decided by
+    the row's hash, or earlier if the next row would push it past chunk_size. An
+    edited, inserted or deleted row therefore changes only the chunk it falls in
+    (plus at most the next few size-capped ones), and appended rows only add chunks
+    at the end. Every chunk starts with header, so it can be read on its own.
+    """
+    budget = max(1, chunk_size - len(header))
+    target = max(1, budget // 2)
+    current, size = [], 0
+    for line in lines:
+        if current and size + len(line) > budget:
+            yield header + "".join(current)
+            current, size = [], 0
+        current.append(line)
+        size += len(line)
+        digest = int.from_bytes(hashlib.blake2b(line.encode("utf-8"), digest_size=8).digest(), "big")
+        if digest < len(line) / target * 2 ** 64:
+            yield header + "".join(current)
+            current, size = [], 0
+    if current:
+        yield header + "".join(current)
+
+
+def chunk_rows(lines: list, chunk_size: int) -> list:
+    return list(iter_row_chunks(lines, chunk_size))
+
+
+def stream_csv_chunks(path, chunk_size: int, batch_rows: int = 10_000) -> Iterator[str]:
+    """Yields row-aligned chunks of a CSV, each starting with the header row, reading batch_rows rows at a time.
+
+    Rows are formatted like crewai's CSV source (fields joined by spaces). Only one
+    batch of rows and the chunk being filled are held in memory, whatever the file size.
+    """
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+
+        def lines():
+            while batch := list(islice(reader, batch_rows)):
+                yield from (" ".join(row) + "\n" for row in batch)
+
+        yield from iter_row_chunks(lines(), chunk_size, " ".join(header) + "\n")
+
+
+def batch_by_size(chunks: Iterable[str], max_bytes: int, max_chunks: int = EMBED_BATCH_CHUNKS) -> Iterator[list]:
+    """Groups chunks into lists of at most max_chunks chunks and (about) max_bytes of text."""
+    batch, size = [], 0
+    for chunk in chunks:
+        batch.append(chunk)
+        size += len(chunk)
+        if size >= max_bytes or len(batch) >= max_chunks:
+            yield batch
+            batch, size = [], 0
+    if batch:
+        yield batch
+
+
+class ChunkStore(Sequence):
+    """Chunk texts of an index entry, read from its chunks.jsonl on demand.
+
+    Only the line offsets and the embeddings' row norms are held in memory. The
+    file stays open, so the chunks remain readable even if the cache evicts the
+    entry while an index still uses it.
+    """
+
+    def __init__(self, entry_dir: str):
+        self._offsets = np.load(os.path.join(entry_dir, "offsets.npy"))
+        self.norms = np.load(os.path.join(entry_dir, "norms.npy"))
+        self._fd = os.open(os.path.join(entry_dir, "chunks.jsonl"), os.O_RDONLY)
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        start, end = int(self._offsets[index]), int(self._offsets[index + 1])
+        return json.loads(os.pread(self._fd, end - start, start))
+
+    def __iter__(self):
+        with open(os.dup(self._fd), "r", encoding="utf-8") as f:
+            f.seek(0)
+            for line in f:
+                yield json.loads(line)
+
+    @property
+    def nbytes(self) -> int:
+        return self._offsets.nbytes + self.norms.nbytes
+
+    def __del__(self):
+        if getattr(self, "_fd", None) is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class _EntryWriter:
+    """Writes an entry's chunks, chunk hashes and embeddings to a directory batch by batch.
+
+    Everything is written with plain file I/O rather than memory maps, whose dirty
+    pages would count against the process's memory.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._chunks = open(os.path.join(directory, "chunks.jsonl"), "w", encoding="utf-8")
+        self._vectors = open(os.path.join(directory, "embeddings.f32"), "wb")
+        self._offsets = array("q", [0])
+        self._hashes = bytearray()
+        self._norms = array("f")
+        self._dim = 0
+
+    def write(self, chunks: list, hashes: list, vectors: np.ndarray) -> None:
+        for chunk in chunks:
+            # ASCII-only JSON, so character and byte offsets agree.
+            line = json.dumps(chunk) + "\n"
+            self._chunks.write(line)
+            self._offsets.append(self._offsets[-1] + len(line))
+        self._hashes.extend(b"".join(hashes))
+        if len(chunks):
+            vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+            self._dim = vectors.shape[1]
+            self._vectors.write(vectors.tobytes())
+            norms = np.linalg.norm(vectors, axis=1)
+            self._norms.extend(np.where(norms == 0, 1, norms).astype(np.float32))
+
+    def close(self) -> None:
+        """Finishes the entry: offsets, hashes, norms and an embeddings.npy streamed from the raw vectors."""
+        self._chunks.close()
+        self._vectors.close()
+        count = len(self._offsets) - 1
+        np.save(os.path.join(self.directory, "offsets.npy"), np.frombuffer(self._offsets, dtype=np.int64))
+        np.save(os.path.join(self.directory, "hashes.npy"), np.frombuffer(bytes(self._hashes), dtype="S16"))
+        np.save(os.path.join(self.directory, "norms.npy"), np.frombuffer(self._norms, dtype=np.float32))
+        raw_path = os.path.join(self.directory, "embeddings.f32")
+        with open(os.path.join(self.directory, "embeddings.npy"), "wb") as out, open(raw_path, "rb") as raw:
+            np.lib.format.write_array_header_1_0(out, {"descr": np.lib.format.dtype_to_descr(np.dtype(np.float32)),
+                                                       "fortran_order": False, "shape": (count, self._dim)})
+            shutil.copyfileobj(raw, out, 1 << 20)
+        os.remove(raw_path)
+
+    def abort(self) -> None:
+        self._chunks.close()
+        self._vectors.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class _PreviousEntry:
+    """Looks chunks up by hash in an earlier entry, to reuse their embeddings."""
+
+    def __init__(self, hashes: np.ndarray, embeddings: np.ndarray):
+        self._order = np.argsort(hashes, kind="stable")
+        self._sorted = hashes[self._order]
+        self.embeddings = embeddings
+
+    def find(self, hashes: list):
+        """Returns (positions in hashes that were found, their rows in the earlier embeddings)."""
+        if not len(self._sorted):
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        wanted = np.frombuffer(b"".join(hashes), dtype="S16")
+        positions = np.minimum(np.searchsorted(self._sorted, wanted), len(self._sorted) - 1)
+        found = np.nonzero(self._sorted[positions] == wanted)[0]
+        return found, self._order[positions[found]]
+
+
+class KnowledgeIndexCache:
+    """On-disk store of chunked and embedded knowledge files.
+
+    Entries are keyed by the SHA-256 of the file contents plus the chunking and
+    embedder settings, so an unchanged file is never chunked or embedded twice.
+    When a file changes, only chunks missing from its previous entry are embedded
+    (see index). The least recently used entries are evicted once the store grows past max_bytes.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.embedded_chunks = 0
+        self.reused_chunks = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def make_key(self, file_paths, chunk_size: int, chunk_overlap: int, embedder: Any) -> str:
+        """Builds the cache key for a set of files and index settings."""
+        digest = hashlib.sha256()
+        for file_hash in sorted(content_hash(path) for path in file_paths):
+            digest.update(file_hash.encode())
+        digest.update(self._settings(chunk_size, chunk_overlap, embedder))
+        return digest.hexdigest()
+
+    def source_key(self, file_paths, chunk_size: int, chunk_overlap: int, embedder: Any) -> str:
+        """Identifies a set of files by path rather than content, to find the index of their previous version."""
+        digest = hashlib.sha256()
+        for path in sorted(os.path.abspath(str(path)) for path in file_paths):
+            digest.update(path.encode())
+        digest.update(self._settings(chunk_size, chunk_overlap, embedder))
+        return digest.hexdigest()
+
+    @staticmethod
+    def _settings(chunk_size: int, chunk_overlap: int, embedder: Any) -> bytes:
+        settings = {"chunk_size": chunk_size, "chunk_overlap": chunk_overlap, "embedder": embedder,
+                    "format": INDEX_FORMAT}
+        return json.dumps(settings, sort_keys=True, default=str).encode()
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    def _load(self, key: str):
+        entry_dir = self._entry_dir(key)
+        try:
+            chunks = ChunkStore(entry_dir)
+            embeddings = np.load(os.path.join(entry_dir, "embeddings.npy"), mmap_mode="r" if len(chunks) else None)
+        except (FileNotFoundError, ValueError):
+            return None
+        # The directory mtime doubles as the last-access time for LRU eviction.
+        os.utime(entry_dir)
+        return chunks, embeddings
+
+    def get(self, key: str):
+        """Returns (chunks, embeddings) for a key, or None on a miss.
+
+        Chunks are a ChunkStore and embeddings a read-only memory map, so an entry
+        costs a few bytes per chunk of RAM however large the file it indexes.
+        """
+        with self._lock:
+            entry = self._load(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return entry
+
+    def _previous(self, source_key: str) -> Optional[_PreviousEntry]:
+        try:
+            with open(os.path.join(self.cache_dir, f"{source_key}.latest"), encoding="utf-8") as f:
+                entry_dir = self._entry_dir(f.read().strip())
+            return _PreviousEntry(np.load(os.path.join(entry_dir, "hashes.npy")),
+                                  np.load(os.path.join(entry_dir, "embeddings.npy"), mmap_mode="r"))
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _tmp_dir(self, key: str) -> str:
+        return f"{self._entry_dir(key)}.tmp-{os.getpid()}-{threading.get_ident()}"
+
+    def _commit(self, key: str, tmp_dir: str):
+        with self._lock:
+            entry_dir = self._entry_dir(key)
+            if os.path.isdir(entry_dir):
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+            else:
+                os.rename(tmp_dir, entry_dir)
+            self._evict(keep=key)
+            return self._load(key)
+
+    def index(self, key: str, source_key: str, chunks: Iterable[str], embed: Callable,
+              batch_bytes: int = DEFAULT_BATCH_BYTES):
+        """Builds the entry for (a new version of) some files from a stream of chunks.
+
+        Chunks are embedded and written to disk batch by batch, so memory use is
+        bounded by batch_bytes rather than by the size of the files. Each chunk is
+        looked up by hash in the previous entry for the same files first: after an
+        append only the new chunks are embedded, and chunks that are gone are simply
+        not carried over.
+        """
+        previous = self._previous(source_key)
+        writer = _EntryWriter(self._tmp_dir(key))
+        embedded = total = 0
+        try:
+            for batch in batch_by_size(chunks, batch_bytes):
+                hashes = [chunk_digest(chunk) for chunk in batch]
+                vectors = [None] * len(batch)
+                if previous is not None:
+                    found, rows = previous.find(hashes)
+                    for position, vector in zip(found, previous.embeddings[rows]):
+                        vectors[position] = vector
+                missing = {}
+                for position, digest in enumerate(hashes):
+                    if vectors[position] is None:
+                        missing.setdefault(digest, []).append(position)
+                if missing:
+                    new_vectors = embed([batch[positions[0]] for positions in missing.values()])
+                    for positions, vector in zip(missing.values(), np.asarray(new_vectors, dtype=np.float32)):
+                        for position in positions:
+                            vectors[position] = vector
+                writer.write(batch, hashes, np.stack(vectors))
+                embedded += len(missing)
+                total += len(batch)
+            writer.close()
+        except BaseException:
+            writer.abort()
+            raise
+        entry = self._commit(key, writer.directory)
+        latest_path = os.path.join(self.cache_dir, f"{source_key}.latest")
+        with self._lock:
+            self.embedded_chunks += embedded
+            self.reused_chunks += total - embedded
+            tmp_path = f"{latest_path}.tmp-{os.getpid()}-{threading.get_ident()}"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(key)
+            os.replace(tmp_path, latest_path)
+        return entry
+
+    def put(self, key: str, chunks: list, embeddings):
+        """Stores an index entry and evicts old entries if over budget."""
+        writer = _EntryWriter(self._tmp_dir(key))
+        writer.write(chunks, [chunk_digest(chunk) for chunk in chunks], np.asarray(embeddings, dtype=np.float32))
+        writer.close()
+        return self._commit(key, writer.directory)
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if not os.path.isdir(path) or ".tmp-" in name:
+                continue
+            size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+            entries.append((os.path.getmtime(path), size, name))
+        return entries
+
+    def _evict(self, keep: Optional[str] = None):
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in entries:
+            if total <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+            shutil.rmtree(self._entry_dir(name), ignore_errors=True)
+            total -= size
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        """Returns hit/miss counters and the current size of the store."""
+        with self._lock:
+            entries = self._entries()
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "embedded_chunks": self.embedded_chunks,
+                "reused_chunks": self.reused_chunks,
+                "entries": len(entries),
+                "bytes": sum(size for _, size, _ in entries),
+                "max_bytes": self.max_bytes,
+            }
+
+
+def row_norms(matrix: np.ndarray) -> np.ndarray:
+    """L2 norm of each row, computed in blocks so a memory-mapped matrix is never copied whole."""
+    norms = np.empty(len(matrix), dtype=np.float32)
+    for start in range(0, len(matrix), NORM_BLOCK_ROWS):
+        norms[start:start + NORM_BLOCK_ROWS] = np.linalg.norm(matrix[start:start + NORM_BLOCK_ROWS], axis=1)
+    norms[norms == 0] = 1
+    return norms
+
+
+class RetrievalMemo:
+    """Knowledge search results shared by related questions, e.g. those of one batch.
+
+    Searches of the same index whose queries have the same words, in any order
+    or case, run once; concurrent duplicates wait for the first one's results.
+    """
+
+    def __init__(self):
+        self._results = {}
+        self._lock = threading.Lock()
+        self.searches = 0
+        self.reused = 0
+
+    def search(self, storage, query: list, limit: int, score_threshold: float, run: Callable) -> list:
+        words = frozenset(_WORD_PATTERN.findall(" ".join(query).casefold()))
+        key = (id(storage), words, limit, score_threshold)
+        with self._lock:
+            future = self._results.get(key)
+            owner = future is None
+            if owner:
+                future = self._results[key] = Future()
+                self.searches += 1
+            else:
+                self.reused += 1
+        if owner:
+            try:
+                future.set_result(run())
+            except BaseException as e:
+                with self._lock:
+                    del self._results[key]
+                future.set_exception(e)
+        return list(future.result())
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"searches": self.searches, "reused_searches": self.reused}
+
+
+@contextmanager
+def use_retrieval_memo(memo: Optional[RetrievalMemo]):
+    """Shares the knowledge searches of this context, and contexts copied from it, through memo."""
+    token = _retrieval_memo.set(memo)
+    try:
+        yield memo
+    finally:
+        _retrieval_memo.reset(token)
+
+
+class KnowledgeIndexStorage(BaseKnowledgeStorage):
+    """Cosine-similarity index over precomputed chunk embeddings.
+
+    Entries from the KnowledgeIndexCache stay on disk: their embeddings are
+    memory-mapped and their chunk texts read only for search results.
+    """
+
+    embedder: Optional[Callable] = Field(default=None, exclude=True)
+    # (chunks, embeddings, row norms) per loaded source.
+    _blocks: list = PrivateAttr(default_factory=list)
+
+    def embed(self, documents: list) -> np.ndarray:
+        """Embeds a list of documents with the configured embedding function."""
+        if self.embedder is None:
+            raise ValueError("No embedder configured for the knowledge index.")
+        return np.asarray(self.embedder(documents), dtype=np.float32)
+
+    def load(self, chunks, embeddings) -> None:
+        """Adds already-embedded chunks (a list or ChunkStore) to the index."""
+        if not len(chunks):
+            return
+        matrix = embeddings if isinstance(embeddings, np.memmap) else np.asarray(embeddings, dtype=np.float32)
+        norms = chunks.norms if isinstance(chunks, ChunkStore) else row_norms(matrix)
+        self._blocks.append((chunks, matrix, norms))
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the index: in-memory embeddings, row norms and chunk text or offsets."""
+        total = 0
+        for chunks, matrix, norms in self._blocks:
+            if isinstance(chunks, ChunkStore):
+                total += chunks.nbytes
+            else:
+                total += norms.nbytes + matrix.nbytes + sum(len(chunk) for chunk in chunks)
+        return total
+
+    def search(self, query: list, limit: int = 5, metadata_filter: Optional[dict] = None,
+               score_threshold: float = 0.6) -> list:
+        if not self._blocks or not query:
+            return []
+        memo = _retrieval_memo.get()
+        if memo is not None:
+            return memo.search(self, query, limit, score_threshold, lambda: self._search(query, limit, score_threshold))
+        return self._search(query, limit, score_threshold)
+
+    def _search(self, query: list, limit: int, score_threshold: float) -> list:
+        vector = self.embed([" ".join(query)])[0]
+        vector = vector / (np.linalg.norm(vector) or 1)
+        scores = np.concatenate([(matrix @ vector) / norms for _, matrix, norms in self._blocks])
+        starts = np.cumsum([0] + [len(norms) for _, _, norms in self._blocks])
+        top = np.argsort(-scores)[:limit]
+        results = []
+        for i in top:
+            if scores[i] < score_threshold:
+                continue
+            block = int(np.searchsorted(starts, i, side="right")) - 1
+            results.append({"id": str(i), "content": self._blocks[block][0][int(i - starts[block])],
+                            "metadata": {}, "score": float(scores[i])})
+        return results
+
+    async def asearch(self, query: list, limit: int = 5, metadata_filter: Optional[dict] = None,
+                      score_threshold: float = 0.6) -> list:
+        return self.search(query, limit, metadata_filter, score_threshold)
+
+    def save(self, documents: list) -> None:
+        self.load(documents, self.embed(documents))
+
+    async def asave(self, documents: list) -> None:
+        self.save(documents)
+
+    def reset(self) -> None:
+        self._blocks = []
+
+    async def areset(self) -> None:
+        self.reset()
+
+
+class CachedFileKnowledgeSource(BaseFileKnowledgeSource):
+    """File knowledge source whose chunk embeddings are reused from a KnowledgeIndexCache.
+
+    The concrete source chunks its content as usual (see iter_chunks); only the
+    embedding step, the expensive part, is skipped when the cache already holds
+    this file's index. After loading, chunks is the entry's on-disk ChunkStore.
+    """
+
+    index_cache: Any = Field(default=None, exclude=True)
+    embedder_spec: Any = Field(default=None)
+    # Caps the chunk text embedded and written per batch while building an index.
+    batch_bytes: int = Field(default=DEFAULT_BATCH_BYTES)
+    # Rows read per batch by sources that stream their files (CSV).
+    batch_rows: int = Field(default=10_000)
+
+    def iter_chunks(self) -> Iterable[str]:
+        return self.chunks
+
+    def _save_documents(self) -> None:
+        key = self.index_cache.make_key(self.safe_file_paths, self.chunk_size,
+                                        self.chunk_overlap, self.embedder_spec)
+        entry = self.index_cache.get(key)
+        if entry is None:
+            source_key = self.index_cache.source_key(self.safe_file_paths, self.chunk_size,
+                                                      self.chunk_overlap, self.embedder_spec)
+            entry = self.index_cache.index(key, source_key, self.iter_chunks(), self.storage.embed,
+                                           self.batch_bytes)
+        chunks, embeddings = entry
+        self.chunks = chunks
+        self.storage.load(chunks, embeddings)
+
+    async def _asave_documents(self) -> None:
+        self._save_documents()
+
+
+class CachedCSVKnowledgeSource(CachedFileKnowledgeSource, CSVKnowledgeSource):
+    """CSV knowledge source backed by the index cache that streams the file instead of reading it whole.
+
+    Chunks are built by stream_csv_chunks, batch_rows rows at a time, and only when
+    the cache has no index for the file's current content.
+    """
+
+    def load_content(self) -> dict:
+        # Nothing is read up front; iter_chunks streams the files.
+        return {}
+
+    def iter_chunks(self) -> Iterator[str]:
+        for path in self.safe_file_paths:
+            yield from stream_csv_chunks(path, self.chunk_size, self.batch_rows)
+
+    def add(self) -> None:
+        self._save_documents()
+
+    async def aadd(self) -> None:
+        self.add()
+
+
+class CachedExcelKnowledgeSource(CachedFileKnowledgeSource, ExcelKnowledgeSource):
+    """Excel knowledge source backed by the index cache, chunked on row boundaries of each sheet."""
+
+    def add(self) -> None:
+        for sheets in self.content.values():
+            for text in sheets.values() if isinstance(sheets, dict) else [sheets]:
+                lines = str(text).splitlines(keepends=True)
+                self.chunks.extend(iter_row_chunks(lines[1:], self.chunk_size, "".join(lines[:1])))
+        self._save_documents()
+
+    async def aadd(self) -> None:
+        self.add()
+
+
+class CachedPDFKnowledgeSource(CachedFileKnowledgeSource, PDFKnowledgeSource):
+    """PDF knowledge source backed by the index cache."""
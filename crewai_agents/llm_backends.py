@@ -0,0 +1,262 @@
+import contextvars
+import json
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Weight of the newest call in a backend's moving average latency.
+LATENCY_ALPHA = 0.3
+# Assumed call latency of a backend that has not completed a call yet.
+DEFAULT_LATENCY = 1.0
+# Responses that mean the server is overloaded or down, so the call goes to another backend.
+FAILOVER_STATUSES = (502, 503)
+FAILOVER_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError)
+# Set by limit_llm_calls(); routed calls made while it is set each hold one of its slots.
+_call_slots = contextvars.ContextVar("llm_call_slots", default=None)
+
+
+def ollama_model_name(model: str) -> str:
+    """Strips the crewai provider prefix: 'ollama/gemma3' -> 'gemma3'."""
+    return model.split("/", 1)[1] if model.startswith(("ollama/", "ollama_chat/")) else model
+
+
+@contextmanager
+def limit_llm_calls(slots: Optional[threading.Semaphore]):
+    """Caps the LLM calls of this context, and contexts copied from it, at the semaphore's slots.
+
+    A call holds its slot until its response has been read, streamed replies included.
+    """
+    token = _call_slots.set(slots)
+    try:
+        yield slots
+    finally:
+        _call_slots.reset(token)
+
+
+def origin(url: str) -> tuple:
+    parts = urlsplit(url)
+    return parts.scheme, parts.hostname, parts.port or (443 if parts.scheme == "https" else 80)
+
+
+class Backend:
+    """One Ollama server: the models it serves, how many calls it runs at once, and its live state."""
+
+    def __init__(self, url: str, models: Optional[list] = None, parallel: int = 1):
+        self.url = url.rstrip("/").removesuffix("/v1")
+        self.models = {ollama_model_name(m) for m in models} if models else None
+        self.parallel = max(1, parallel)
+        self.in_flight = 0
+        self.latency = None
+        self.healthy = True
+        self.calls = 0
+        self.failures = 0
+        self.last_error = None
+        self.last_chosen = 0.0
+
+    def serves(self, model: Optional[str]) -> bool:
+        return self.models is None or not model or ollama_model_name(model) in self.models
+
+    def expected_wait(self) -> float:
+        """Seconds a new call should take here: the calls ahead of it in batches of parallel, times the latency."""
+        return math.ceil((self.in_flight + 1) / self.parallel) * (self.latency or DEFAULT_LATENCY)
+
+    def to_dict(self) -> dict:
+        return {"url": self.url, "models": sorted(self.models) if self.models else None, "parallel": self.parallel,
+                "in_flight": self.in_flight, "latency_seconds": round(self.latency, 4) if self.latency else None,
+                "healthy": self.healthy, "calls": self.calls, "failures": self.failures,
+                "last_error": self.last_error}
+
+
+class BackendRouter:
+    """Picks the backend for each LLM call by queue depth and observed latency.
+
+    A call goes to the healthy backend serving its model with the lowest
+    expected wait; ties go to the one chosen least recently, so idle servers
+    share the load. A backend whose call fails to connect or answers 502/503 is
+    marked unhealthy and skipped until a health check finds it up again; if no
+    healthy backend serves the model, unhealthy ones are tried as a last resort.
+    """
+
+    def __init__(self, backends: list, health_timeout: float = 2.0):
+        if not backends:
+            raise ValueError("At least one LLM backend is required.")
+        self.backends = backends
+        self.health_timeout = health_timeout
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._health_thread = None
+
+    @classmethod
+    def from_config(cls, backends: Optional[list], default_url: str) -> "BackendRouter":
+        """Builds the router from the llm_backends setting: a list of URLs or of {url, models, parallel}."""
+        specs = backends or [default_url]
+        return cls([Backend(spec) if isinstance(spec, str) else Backend(**spec) for spec in specs])
+
+    def serving(self, model: Optional[str]) -> list:
+        return [backend for backend in self.backends if backend.serves(model)]
+
+    def acquire(self, model: Optional[str], exclude=()) -> Optional[Backend]:
+        """Chooses a backend for one call and counts the call as in flight on it."""
+        with self._lock:
+            candidates = [b for b in self.serving(model) if b not in exclude]
+            healthy = [b for b in candidates if b.healthy]
+            if not (healthy or candidates):
+                return None
+            backend = min(healthy or candidates, key=lambda b: (b.expected_wait(), b.last_chosen))
+            backend.in_flight += 1
+            backend.last_chosen = time.monotonic()
+            return backend
+
+    def release(self, backend: Backend, seconds: Optional[float] = None, error: Optional[str] = None) -> None:
+        """Ends a call: records its latency, or marks the backend unhealthy if it failed."""
+        with self._lock:
+            backend.in_flight -= 1
+            if error is not None:
+                backend.failures += 1
+                backend.last_error = error
+                if backend.healthy:
+                    logger.warning("LLM backend %s failed, routing around it: %s", backend.url, error)
+                backend.healthy = False
+            elif seconds is not None:
+                backend.calls += 1
+                backend.latency = seconds if backend.latency is None else \
+                    LATENCY_ALPHA * seconds + (1 - LATENCY_ALPHA) * backend.latency
+
+    def check_health(self, client: httpx.Client) -> list:
+        """Asks every backend for its version and updates which ones are healthy."""
+        for backend in self.backends:
+            try:
+                client.get(backend.url + "/api/version", timeout=self.health_timeout,
+                           extensions={"llm_route": False}).raise_for_status()
+                error = None
+            except httpx.HTTPError as e:
+                error = str(e) or type(e).__name__
+            with self._lock:
+                if error is None and not backend.healthy:
+                    logger.info("LLM backend %s is healthy again", backend.url)
+                backend.healthy = error is None
+                backend.last_error = error or backend.last_error
+        return self.stats()
+
+    def start_health_checks(self, client: httpx.Client, interval: float) -> None:
+        """Checks the backends every interval seconds on a daemon thread until close()."""
+        if interval <= 0 or self._health_thread is not None:
+            return
+        stop = self._stop = threading.Event()
+
+        def loop():
+            while not stop.wait(interval):
+                self.check_health(client)
+
+        self._health_thread = threading.Thread(target=loop, name="llm-health-check", daemon=True)
+        self._health_thread.start()
+
+    def close(self) -> None:
+        self._stop.set()
+        self._health_thread = None
+
+    def stats(self) -> list:
+        with self._lock:
+            return [backend.to_dict() for backend in self.backends]
+
+
+class _TrackedStream(httpx.SyncByteStream):
+    """Response body that ends the backend call when the client closes it, after streaming finished."""
+
+    def __init__(self, stream, on_close):
+        self._stream = stream
+        self._on_close = on_close
+
+    def __iter__(self):
+        yield from self._stream
+
+    def close(self) -> None:
+        on_close, self._on_close = self._on_close, None
+        try:
+            self._stream.close()
+        finally:
+            if on_close is not None:
+                on_close()
+
+
+class RoutingTransport(httpx.BaseTransport):
+    """httpx transport that spreads requests for the pool's base URL over the router's backends.
+
+    Requests to any other address, or sent with extensions={"llm_route": False},
+    go out unchanged.
+    """
+
+    def __init__(self, router: BackendRouter, base_url: str, transport: Optional[httpx.BaseTransport] = None):
+        self.router = router
+        self.origin = origin(base_url)
+        self.transport = transport or httpx.HTTPTransport()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        if request.extensions.get("llm_route") is False or origin(str(request.url)) != self.origin:
+            return self.transport.handle_request(request)
+        slots = _call_slots.get()
+        if slots is None:
+            return self._route(request, None)
+        slots.acquire()
+        try:
+            return self._route(request, slots.release)
+        except BaseException:
+            slots.release()
+            raise
+
+    def _route(self, request: httpx.Request, on_done) -> httpx.Response:
+        model = _request_model(request)
+        tried = []
+        while True:
+            backend = self.router.acquire(model, exclude=tried)
+            if backend is None:
+                raise httpx.ConnectError(f"No LLM backend serves model '{model}'.", request=request)
+            tried.append(backend)
+            started = time.perf_counter()
+            try:
+                response = self.transport.handle_request(_retarget(request, backend.url))
+            except FAILOVER_ERRORS as e:
+                self.router.release(backend, error=str(e) or type(e).__name__)
+                if len(tried) >= len(self.router.serving(model)):
+                    raise
+                continue
+            except BaseException:
+                self.router.release(backend)
+                raise
+            if response.status_code in FAILOVER_STATUSES and len(tried) < len(self.router.serving(model)):
+                response.close()
+                self.router.release(backend, error=f"HTTP {response.status_code}")
+                continue
+            failed = response.status_code in FAILOVER_STATUSES
+
+            def on_close(backend=backend, started=started, status=response.status_code):
+                self.router.release(backend, time.perf_counter() - started, error=f"HTTP {status}" if failed else None)
+                if on_done is not None:
+                    on_done()
+            return httpx.Response(response.status_code, headers=response.headers,
+                                  stream=_TrackedStream(response.stream, on_close), extensions=response.extensions)
+
+    def close(self) -> None:
+        self.transport.close()
+
+
+def _request_model(request: httpx.Request) -> Optional[str]:
+    try:
+        return json.loads(request.read() or b"{}").get("model")
+    except (ValueError, AttributeError):
+        return None
+
+
+def _retarget(request: httpx.Request, backend_url: str) -> httpx.Request:
+    target = httpx.URL(backend_url)
+    url = request.url.copy_with(scheme=target.scheme, host=target.host, port=target.port)
+    headers = [(k, v) for k, v in request.headers.raw if k.lower() != b"host"]
+    return httpx.Request(request.method, url, headers=headers, content=request.read(), extensions=request.extensions)
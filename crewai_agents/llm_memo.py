@@ -0,0 +1,267 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+import httpx
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# "memo" serves and stores deterministic calls; "record" sends every call and stores it;
+# "replay" only serves stored calls and never reaches a backend.
+MODES = ("off", "memo", "record", "replay")
+CHAT_PATHS = ("/chat/completions", "/api/chat")
+# Response headers kept with a recording; the body is stored as it came off the wire.
+KEPT_HEADERS = ("content-type", "content-encoding")
+EMBEDDING_TYPE = "application/x-float32"
+
+
+class ReplayMissError(LookupError):
+    """Raised in replay mode for an embedding that was never recorded."""
+
+
+def _temperature(body: dict):
+    options = body.get("options") or {}
+    return body.get("temperature", options.get("temperature"))
+
+
+def call_key(request: httpx.Request) -> Optional[tuple]:
+    """(key, parsed body) of a chat call, or None for any other request.
+
+    The key hashes the endpoint and the whole request body (model, temperature,
+    messages, tools, stream), so only byte-for-byte identical calls share it.
+    """
+    if request.method != "POST" or not request.url.path.endswith(CHAT_PATHS):
+        return None
+    try:
+        body = json.loads(request.read() or b"{}")
+    except ValueError:
+        return None
+    if not isinstance(body, dict):
+        return None
+    canonical = json.dumps(body, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(f"{request.url.path}\n{canonical}".encode()).hexdigest(), body
+
+
+def finished_reply(content: bytes) -> Optional[bytes]:
+    """A streamed reply that reached its end marker, closed with its delimiter; None if it stops short.
+
+    The marker is "data: [DONE]" for SSE and a "done": true line for Ollama's JSON lines.
+    """
+    content = content.rstrip()
+    last = content.rsplit(b"\n", 1)[-1].strip()
+    if last == b"data: [DONE]":
+        return content + b"\n\n"
+    try:
+        return content + b"\n" if json.loads(last).get("done") is True else None
+    except (ValueError, AttributeError):
+        return None
+
+
+def is_deterministic(body: dict) -> bool:
+    """Whether a call always gets the same reply: one completion with greedy decoding (temperature 0)."""
+    return _temperature(body) == 0 and body.get("n") in (None, 1)
+
+
+def embedding_key(model: str, text: str) -> str:
+    return hashlib.sha256(f"embed\n{model}\n{text}".encode()).hexdigest()
+
+
+def embedder_model(embedder_spec: dict) -> str:
+    """Names the embedding model of a crewai embedder spec, e.g. "ollama/nomic-embed-text".
+
+    Server URLs and keys are left out, so recordings replay against any server.
+    """
+    options = embedder_spec.get("config") or {}
+    return f"{embedder_spec.get('provider')}/{options.get('model_name') or options.get('model')}"
+
+
+class LLMCallStore:
+    """On-disk store of LLM responses keyed by call_key, in SQLite.
+
+    The least recently used responses are evicted once the stored bodies exceed max_bytes.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS calls (key TEXT PRIMARY KEY, model TEXT, temperature REAL, "
+                         "status INTEGER, headers TEXT, body BLOB, size INTEGER, created REAL, last_used REAL)")
+        self._db.commit()
+        self._bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM calls").fetchone()[0]
+
+    def get(self, key: str) -> Optional[tuple]:
+        """Returns (status, headers, body) of a stored response and marks it used, or None."""
+        with self._lock:
+            row = self._db.execute("SELECT status, headers, body FROM calls WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE calls SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+            self.hits += 1
+        return row[0], json.loads(row[1]), bytes(row[2])
+
+    def put(self, key: str, model: Optional[str], temperature, status: int, headers: dict, body: bytes) -> None:
+        now = time.time()
+        with self._lock:
+            previous = self._db.execute("SELECT size FROM calls WHERE key = ?", (key,)).fetchone()
+            self._db.execute("INSERT OR REPLACE INTO calls VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                             (key, model, temperature, status, json.dumps(headers), body, len(body), now, now))
+            self._bytes += len(body) - (previous[0] if previous else 0)
+            self.stored += 1
+            self._evict()
+            self._db.commit()
+
+    def _evict(self) -> None:
+        while self._bytes > self.max_bytes:
+            row = self._db.execute("SELECT key, size FROM calls ORDER BY last_used LIMIT 1").fetchone()
+            if row is None:
+                break
+            self._db.execute("DELETE FROM calls WHERE key = ?", (row[0],))
+            self._bytes -= row[1]
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM calls").fetchone()[0]
+            return {"path": self.path, "entries": entries, "bytes": self._bytes, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses, "stored": self.stored, "evictions": self.evictions}
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+class _RecordingStream(httpx.SyncByteStream):
+    """Response body that hands its bytes to on_complete when closed, if the whole reply was read.
+
+    Clients stop reading at the stream's end marker, so a body that reached it
+    counts as read even if its last bytes were not pulled.
+    """
+
+    def __init__(self, stream, on_complete):
+        self._stream = stream
+        self._on_complete = on_complete
+        self._chunks = []
+        self._complete = False
+
+    def __iter__(self):
+        for chunk in self._stream:
+            self._chunks.append(chunk)
+            yield chunk
+        self._complete = True
+
+    def close(self) -> None:
+        on_complete, self._on_complete = self._on_complete, None
+        self._stream.close()
+        content = b"".join(self._chunks)
+        if not self._complete:
+            # A reply the client stopped reading halfway is not worth replaying.
+            content = finished_reply(content)
+        if on_complete is not None and content is not None:
+            on_complete(content)
+
+
+class MemoEmbedder:
+    """Embedding function that records each text's vector in an LLMCallStore, or replays it from there.
+
+    "record" embeds every text and saves its vector; "replay" answers only from
+    saved vectors and raises ReplayMissError for any other text, so knowledge
+    indexing and searches need no embedding server.
+    """
+
+    def __init__(self, embedder, store: LLMCallStore, model: str, mode: str):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Embeddings are only recorded or replayed, not '{mode}'.")
+        self.embedder = embedder
+        self.store = store
+        self.model = model
+        self.mode = mode
+
+    def __call__(self, documents: list) -> list:
+        keys = [embedding_key(self.model, text) for text in documents]
+        if self.mode == "record":
+            vectors = [np.asarray(vector, dtype=np.float32) for vector in self.embedder(documents)]
+            for key, vector in zip(keys, vectors):
+                self.store.put(key, self.model, None, 200, {"content-type": EMBEDDING_TYPE}, vector.tobytes())
+            return vectors
+        vectors = []
+        for key in keys:
+            recorded = self.store.get(key)
+            if recorded is None:
+                raise ReplayMissError(f"No recorded {self.model} embedding (replay mode, key {key[:12]}).")
+            vectors.append(np.frombuffer(recorded[2], dtype=np.float32))
+        return vectors
+
+
+def memo_embedder(embedder, store: Optional[LLMCallStore], model: str, mode: str):
+    """Wraps an embedding function for record or replay; other modes leave it as is.
+
+    The knowledge index already keeps chunk embeddings, so "memo" adds nothing for them.
+    """
+    if store is None or mode not in ("record", "replay"):
+        return embedder
+    return MemoEmbedder(embedder, store, model, mode)
+
+
+class MemoTransport(httpx.BaseTransport):
+    """httpx transport below every LLM client that serves repeated chat calls from an LLMCallStore.
+
+    In "memo" mode only deterministic calls (temperature 0) are served from and
+    saved to the store; others go to the backend as usual. "record" sends every
+    chat call to the backend and saves it, and "replay" answers chat calls only
+    from the store: a call that was never recorded gets a 400 error reply instead
+    of reaching a backend, so replayed runs are deterministic and work offline.
+    """
+
+    def __init__(self, store: LLMCallStore, transport: httpx.BaseTransport, mode: str = "memo"):
+        if mode not in MODES:
+            raise ValueError(f"Unknown LLM memo mode '{mode}'. Use one of: {', '.join(MODES)}")
+        self.store = store
+        self.transport = transport
+        self.mode = mode
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        call = None if self.mode == "off" or request.extensions.get("llm_route") is False else call_key(request)
+        if call is None:
+            return self.transport.handle_request(request)
+        key, body = call
+        model, temperature = body.get("model"), _temperature(body)
+        if self.mode == "memo" and not is_deterministic(body):
+            return self.transport.handle_request(request)
+        if self.mode in ("memo", "replay"):
+            recorded = self.store.get(key)
+            if recorded is not None:
+                status, headers, content = recorded
+                return httpx.Response(status, headers=headers, content=content)
+            if self.mode == "replay":
+                logger.warning("No recorded response for %s call %s to %s", model, key[:12], request.url.path)
+                return httpx.Response(400, json={"error": {
+                    "message": f"No recorded response for this {model} call (replay mode, key {key[:12]}).",
+                    "type": "replay_miss"}})
+        response = self.transport.handle_request(request)
+        if response.status_code != 200:
+            return response
+        headers = {name: response.headers[name] for name in KEPT_HEADERS if name in response.headers}
+
+        def save(body: bytes):
+            self.store.put(key, model, temperature, response.status_code, headers, body)
+        return httpx.Response(response.status_code, headers=response.headers,
+                              stream=_RecordingStream(response.stream, save), extensions=response.extensions)
+
+    def close(self) -> None:
+        self.transport.close()
@@ -0,0 +1,257 @@
+import logging
+import re
+import threading
+import time
+from typing import Optional
+
+import httpx
+import numpy as np
+from crewai import LLM
+from crewai.events import crewai_event_bus
+from crewai.events.types.llm_events import LLMCallCompletedEvent, LLMCallFailedEvent, LLMCallStartedEvent
+
+from llm_backends import BackendRouter, RoutingTransport, ollama_model_name
+from llm_memo import LLMCallStore, MemoTransport
+
+logger = logging.getLogger(__name__)
+
+# Latency samples kept per model for the percentile metrics.
+MAX_SAMPLES = 1000
+_DURATION_UNITS = {"s": 1, "m": 60, "h": 3600}
+
+
+def parse_keep_alive(value) -> float:
+    """Converts an Ollama keep_alive value ("30m", "1h", 300, -1) to seconds; negative means forever."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = re.fullmatch(r"\s*(-?\d+(?:\.\d+)?)\s*([smh]?)\s*", str(value))
+    if not match:
+        raise ValueError(f"Invalid keep_alive value '{value}'. Use e.g. 300, '30m' or '1h'.")
+    return float(match.group(1)) * _DURATION_UNITS[match.group(2) or "s"]
+
+
+def _percentile(samples, q: float) -> Optional[float]:
+    return round(float(np.percentile(samples, q)), 4) if samples else None
+
+
+class LLMPool:
+    """Single factory for the LLM clients used by every agent.
+
+    Clients with the same settings are one shared instance, and all of them send
+    requests through one pooled HTTP client, so agents reuse open connections to
+    Ollama. warm() loads models ahead of the first question and start_keep_alive()
+    re-applies keep_alive periodically, because Ollama's OpenAI-compatible
+    endpoint resets a model's idle timer to the server default on every call.
+
+    backends lists the Ollama servers behind base_url (default: base_url alone).
+    Every call the clients send to base_url is routed to one of them by the
+    BackendRouter, and max_connections applies per server.
+
+    With a memo store, chat calls pass through a MemoTransport in memo_mode
+    before routing, so an identical deterministic call from any agent is
+    answered from disk instead of a server. In "replay" mode the pool is
+    offline: warm-up, keep-alive refreshes, health checks and unloading are skipped.
+    """
+
+    def __init__(self, default_model: str, base_url: str, keep_alive="30m", max_connections: int = 8,
+                 timeout: float = 600, backends: Optional[list] = None, small_model: Optional[str] = None,
+                 memo: Optional[LLMCallStore] = None, memo_mode: str = "memo"):
+        self.default_model = default_model
+        self.small_model = small_model or default_model
+        self.base_url = base_url
+        self.keep_alive = keep_alive
+        self.keep_alive_seconds = parse_keep_alive(keep_alive)
+        self.router = BackendRouter.from_config(backends, base_url)
+        connections = max_connections * len(self.router.backends)
+        transport = httpx.HTTPTransport(
+            limits=httpx.Limits(max_connections=connections, max_keepalive_connections=connections))
+        transport = RoutingTransport(self.router, base_url, transport)
+        self.memo = memo
+        self.offline = memo is not None and memo_mode == "replay"
+        if memo is not None:
+            transport = MemoTransport(memo, transport, memo_mode)
+        self.http_client = httpx.Client(transport=transport, timeout=timeout)
+        self._llms = {}
+        self._models = {}
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._keep_alive_thread = None
+        _register_handlers(self)
+
+    def get(self, model: Optional[str] = None, base_url: Optional[str] = None, temperature: float = 0,
+            stream: bool = False) -> LLM:
+        """Returns the shared LLM client for these settings, creating it on first use.
+
+        The model "small" stands for small_model, the model for lightweight tasks.
+        """
+        key = (self.resolve_model(model), base_url or self.base_url, temperature, stream)
+        with self._lock:
+            llm = self._llms.get(key)
+            if llm is None:
+                llm = LLM(model=key[0], base_url=key[1], temperature=temperature, stream=stream)
+                self._share_connections(llm)
+                self._llms[key] = llm
+                self._model_stats(ollama_model_name(key[0]))
+        return llm
+
+    def resolve_model(self, model: Optional[str]) -> str:
+        return self.small_model if model == "small" else model or self.default_model
+
+    def _share_connections(self, llm: LLM) -> None:
+        # OpenAI-compatible providers (Ollama included) build their own HTTP client; rebuild the
+        # synchronous one on top of the shared connection pool.
+        if hasattr(llm, "_get_client_params"):
+            from openai import OpenAI
+            llm._client = OpenAI(**llm._get_client_params(), http_client=self.http_client)
+
+    def _model_stats(self, model: str) -> dict:
+        return self._models.setdefault(model, {
+            "warm_up_seconds": None, "load_seconds": None, "warmed_at": None, "last_used": None, "error": None})
+
+    def models(self) -> list:
+        with self._lock:
+            return list(self._models)
+
+    def _load(self, model: str, keep_alive) -> dict:
+        """Loads a model with an empty prompt on every server serving it, which makes Ollama set its keep_alive
+        without generating. Returns the reply of the slowest server."""
+        backends = self.router.serving(model)
+        if not backends:
+            raise ValueError(f"No LLM backend serves model '{model}'.")
+        bodies = []
+        for backend in backends:
+            response = self.http_client.post(backend.url + "/api/generate", extensions={"llm_route": False},
+                                             json={"model": model, "prompt": "", "keep_alive": keep_alive})
+            response.raise_for_status()
+            bodies.append(response.json())
+        return max(bodies, key=lambda body: body.get("load_duration", 0))
+
+    def warm(self, models: Optional[list] = None) -> dict:
+        """Loads each model into Ollama's memory and records how long the cold start took."""
+        if self.offline:
+            return self.stats()
+        for model in models or self.models():
+            model = ollama_model_name(self.resolve_model(model))
+            started = time.perf_counter()
+            try:
+                body = self._load(model, self.keep_alive)
+                error = None
+            except (httpx.HTTPError, ValueError) as e:
+                body, error = {}, str(e)
+                logger.warning("Could not warm up model %s: %s", model, e)
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                stats = self._model_stats(model)
+                stats["error"] = error
+                if error is None:
+                    stats["warm_up_seconds"] = round(elapsed, 4)
+                    # Ollama reports the model load time in nanoseconds.
+                    stats["load_seconds"] = round(body.get("load_duration", 0) / 1e9, 4)
+                    stats["warmed_at"] = stats["last_used"] = time.time()
+        return self.stats()
+
+    def refresh(self) -> None:
+        """Re-applies keep_alive to models used within the keep-alive window.
+
+        Refreshing does not count as use, so a model left idle for longer than
+        keep_alive is still unloaded by Ollama.
+        """
+        for model in self.models():
+            with self._lock:
+                active = self.is_resident(model)
+            if not active:
+                continue
+            try:
+                self._load(model, self.keep_alive)
+            except (httpx.HTTPError, ValueError) as e:
+                logger.warning("Keep-alive refresh of %s failed: %s", model, e)
+
+    def start_keep_alive(self, interval: float) -> None:
+        """Refreshes keep_alive every interval seconds on a daemon thread until close()."""
+        if interval <= 0 or self.offline or self._keep_alive_thread is not None:
+            return
+        stop = self._stop = threading.Event()
+
+        def loop():
+            while not stop.wait(interval):
+                self.refresh()
+
+        self._keep_alive_thread = threading.Thread(target=loop, name="llm-keep-alive", daemon=True)
+        self._keep_alive_thread.start()
+
+    def is_resident(self, model: str, now: Optional[float] = None) -> bool:
+        """Whether the model should still be loaded, judging by when it was last used."""
+        stats = self._models.get(model)
+        if not stats or stats["last_used"] is None:
+            return False
+        return self.keep_alive_seconds < 0 or (now or time.time()) - stats["last_used"] < self.keep_alive_seconds
+
+    def record_call(self, model: str, seconds: float, started_at: float) -> None:
+        """Records one LLM call's latency as warm or cold depending on whether the model was resident."""
+        model = ollama_model_name(model or self.default_model)
+        with self._lock:
+            path = "warm" if self.is_resident(model, started_at) else "cold"
+            samples = self._calls.setdefault(model, {"warm": [], "cold": []})[path]
+            samples.append(seconds)
+            del samples[:-MAX_SAMPLES]
+            self._model_stats(model)["last_used"] = started_at + seconds
+
+    def stats(self) -> dict:
+        with self._lock:
+            models = {}
+            for model, stats in self._models.items():
+                calls = self._calls.get(model, {"warm": [], "cold": []})
+                models[model] = dict(
+                    stats, resident=self.is_resident(model), warm_calls=len(calls["warm"]),
+                    cold_calls=len(calls["cold"]),
+                    warm_p50_seconds=_percentile(calls["warm"], 50), warm_p95_seconds=_percentile(calls["warm"], 95),
+                    cold_p50_seconds=_percentile(calls["cold"], 50))
+        return {"keep_alive": self.keep_alive, "clients": len(self._llms), "models": models,
+                "backends": self.router.stats(), "memo": self.memo.stats() if self.memo else None}
+
+    def start_health_checks(self, interval: float) -> None:
+        """Checks every interval seconds which servers are up, so failed ones get traffic again once back."""
+        if self.offline:
+            return
+        self.router.start_health_checks(self.http_client, interval)
+
+    def close(self, unload: bool = False) -> None:
+        """Stops the keep-alive and health check threads and optionally asks Ollama to unload the models."""
+        self._stop.set()
+        self._keep_alive_thread = None
+        self.router.close()
+        if unload and not self.offline:
+            for model in self.models():
+                try:
+                    self._load(model, 0)
+                except (httpx.HTTPError, ValueError) as e:
+                    logger.warning("Could not unload model %s: %s", model, e)
+
+
+_pools = []
+_call_starts = {}
+_handlers_lock = threading.Lock()
+
+
+def _on_call_started(source, event):
+    with _handlers_lock:
+        _call_starts[event.call_id] = time.time()
+
+
+def _on_call_finished(source, event):
+    with _handlers_lock:
+        started_at = _call_starts.pop(event.call_id, None)
+        pools = list(_pools)
+    if started_at is not None:
+        for pool in pools:
+            pool.record_call(event.model, time.time() - started_at, started_at)
+
+
+def _register_handlers(pool: LLMPool):
+    with _handlers_lock:
+        if not _pools:
+            crewai_event_bus.on(LLMCallStartedEvent)(_on_call_started)
+            crewai_event_bus.on(LLMCallCompletedEvent)(_on_call_finished)
+            crewai_event_bus.on(LLMCallFailedEvent)(_on_call_finished)
+        _pools.append(pool)
@@ -0,0 +1,285 @@
+import contextvars
+import heapq
+import logging
+import math
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from columnar import convert_csv, read_table
+from context_budget import compact_context
+from dataset_profile import MAX_CATEGORIES, DatasetProfile, type_columns
+from fast_path import markdown_table
+from tracing import record_span, span
+
+logger = logging.getLogger(__name__)
+
+MAP_PROMPT = (
+    "Question: {question}\n\n"
+    "Statistics for one partition ({label}, {rows} rows) of the dataset {name}:\n{summary}\n\n"
+    "List briefly the findings from this partition that help answer the question: notable values, "
+    "highs and lows, and anything unusual. Use only these statistics."
+)
+REDUCE_PROMPT = (
+    "Question: {question}\n\n"
+    "Exact figures for the whole dataset {name}, merged from all {partitions} partitions:\n{figures}\n\n"
+    "Findings from each partition:\n{findings}\n\n"
+    "Write the final report in Markdown answering the question. Use the whole-dataset figures for totals, "
+    "averages and rankings, and the partition findings for patterns and for where partitions differ."
+)
+
+
+def row_partitions(num_rows: int, partitions: int) -> list:
+    """Splits num_rows into contiguous row ranges of near-equal size."""
+    bounds = [round(i * num_rows / partitions) for i in range(partitions + 1)]
+    return [{"label": f"rows {start + 1}-{stop}", "start": start, "stop": stop}
+            for start, stop in zip(bounds, bounds[1:]) if stop > start]
+
+
+def _key_label(column: str, values: list) -> str:
+    shown = ", ".join(values[:3])
+    return f"{column}: {shown}" + (f" (+{len(values) - 3} more)" if len(values) > 3 else "")
+
+
+def key_partitions(column: str, counts: dict, partitions: int) -> list:
+    """Groups the values of a key column into at most `partitions` sets of similar row count.
+
+    Every row with a given key lands in the same partition, largest keys placed first
+    into the currently smallest partition.
+    """
+    bins = [(0, i, []) for i in range(min(partitions, len(counts)))]
+    heapq.heapify(bins)
+    for value, count in sorted(counts.items(), key=lambda item: (-item[1], item[0])):
+        rows, i, values = heapq.heappop(bins)
+        values.append(value)
+        heapq.heappush(bins, (rows + count, i, values))
+    return [{"label": _key_label(column, values), "column": column, "values": values, "rows": rows}
+            for rows, _, values in sorted(bins, key=lambda b: b[1]) if values]
+
+
+def table_columns(table: pa.Table) -> tuple:
+    """Numeric columns and low-cardinality string columns (the ones figures are grouped by) of a table."""
+    numeric, groups = [], []
+    for field in table.schema:
+        if pa.types.is_integer(field.type) or pa.types.is_floating(field.type):
+            numeric.append(field.name)
+        elif pa.types.is_string(field.type) or pa.types.is_large_string(field.type) or \
+                pa.types.is_dictionary(field.type):
+            if pc.count_distinct(table[field.name]).as_py() <= MAX_CATEGORIES:
+                groups.append(field.name)
+    return numeric, groups
+
+
+def partition_stats(df: pd.DataFrame, numeric_columns: list, group_columns: list) -> dict:
+    """Mergeable figures for one partition: count/sum/min/max per numeric column, and sum/count per group."""
+    numeric = {}
+    for column in numeric_columns:
+        series = df[column]
+        count = int(series.count())
+        numeric[column] = {"count": count, "sum": float(series.sum()),
+                           "min": float(series.min()) if count else None,
+                           "max": float(series.max()) if count else None}
+    groups = {}
+    for column in group_columns:
+        grouped = df.groupby(df[column].astype(str), observed=True)[numeric_columns].agg(["sum", "count"])
+        groups[column] = {str(key): {metric: [float(row[(metric, "sum")]), int(row[(metric, "count")])]
+                                     for metric in numeric_columns}
+                          for key, row in grouped.iterrows()}
+    return {"rows": len(df), "numeric": numeric, "groups": groups}
+
+
+def merge_stats(parts: list) -> dict:
+    """Combines partition_stats results into the same figures for their union."""
+    merged = {"rows": 0, "numeric": {}, "groups": {}}
+    for part in parts:
+        merged["rows"] += part["rows"]
+        for column, stats in part["numeric"].items():
+            total = merged["numeric"].setdefault(column, {"count": 0, "sum": 0.0, "min": None, "max": None})
+            total["count"] += stats["count"]
+            total["sum"] += stats["sum"]
+            if stats["min"] is not None:
+                total["min"] = stats["min"] if total["min"] is None else min(total["min"], stats["min"])
+                total["max"] = stats["max"] if total["max"] is None else max(total["max"], stats["max"])
+        for column, keys in part["groups"].items():
+            merged_keys = merged["groups"].setdefault(column, {})
+            for key, metrics in keys.items():
+                merged_metrics = merged_keys.setdefault(key, {})
+                for metric, (value, count) in metrics.items():
+                    previous = merged_metrics.get(metric, [0.0, 0])
+                    merged_metrics[metric] = [previous[0] + value, previous[1] + count]
+    return merged
+
+
+def describe_stats(stats: dict) -> str:
+    """Renders merged figures as text and Markdown tables for the reduce prompt."""
+    lines = [f"{stats['rows']} rows."]
+    for column, figures in stats["numeric"].items():
+        mean = figures["sum"] / figures["count"] if figures["count"] else None
+        lines.append(f"- {column}: count={figures['count']}, sum={figures['sum']:.4g}, "
+                     f"mean={mean if mean is None else round(mean, 4)}, min={figures['min']}, max={figures['max']}")
+    sections = ["\n".join(lines)]
+    for column, keys in stats["groups"].items():
+        if not keys:
+            continue
+        rows = {key: {**{f"sum_{m}": v for m, (v, _) in metrics.items()},
+                      **{f"mean_{m}": v / n if n else None for m, (v, n) in metrics.items()}}
+                for key, metrics in keys.items()}
+        df = pd.DataFrame.from_dict(rows, orient="index")
+        df.index.name = column
+        sections.append(f"By {column}:\n" + markdown_table(df))
+    return "\n\n".join(sections)
+
+
+def map_partition(columnar_file: str, spec: dict, numeric_columns: list, group_columns: list,
+                  question: str, token_budget: int) -> dict:
+    """Summarises one partition; runs in a worker process and reads its rows from the memory-mapped Arrow copy."""
+    started_at = datetime.now(timezone.utc)
+    started = time.perf_counter()
+    table = read_table(columnar_file)
+    if "start" in spec:
+        table = table.slice(spec["start"], spec["stop"] - spec["start"])
+    else:
+        keys = pc.cast(table[spec["column"]], pa.string())
+        table = table.filter(pc.is_in(keys, value_set=pa.array(spec["values"], pa.string())))
+    df = type_columns(table.to_pandas(date_as_object=False))
+    stats = partition_stats(df, numeric_columns, group_columns)
+    profile = DatasetProfile(df, name="partition")
+    sections = [profile.describe()]
+    for column in group_columns:
+        grouped = df.groupby(df[column].astype(str), observed=True)[numeric_columns].sum()
+        if len(grouped):
+            sections.append(f"Sums by {column}:\n" + markdown_table(grouped))
+    summary = compact_context("\n\n".join(sections), token_budget, question)
+    return {"label": spec["label"], "rows": len(df), "stats": stats, "summary": summary,
+            "started_at": started_at, "map_seconds": time.perf_counter() - started}
+
+
+class MapReduceAnalyzer:
+    """Answers a question about a large CSV by partition, then merges the partial findings into one report.
+
+    Partitions (row ranges or groups of a key column) are summarised on a process
+    pool, so the pandas work scales with cores. Each summary is analysed by the LLM
+    on a thread pool capped at llm_concurrency, as a local model only serves a few
+    requests at once. A final LLM call merges the findings, together with exact
+    whole-dataset figures combined from the partitions, into the report.
+    """
+
+    def __init__(self, llm, columnar_dir: str, processes: Optional[int] = None, llm_concurrency: int = 2,
+                 partition_rows: int = 50_000, max_partitions: int = 32, partition_tokens: int = 1200,
+                 reduce_tokens: int = 3000):
+        self.llm = llm
+        self.columnar_dir = columnar_dir
+        # 0 summarises partitions in-process instead of in a process pool.
+        self.processes = os.cpu_count() if processes is None else processes
+        self.llm_concurrency = llm_concurrency
+        self.partition_rows = partition_rows
+        self.max_partitions = max_partitions
+        self.partition_tokens = partition_tokens
+        self.reduce_tokens = reduce_tokens
+        self._map_pool = None
+        self._llm_pool = ThreadPoolExecutor(max_workers=llm_concurrency, thread_name_prefix="map-reduce-llm")
+        self._lock = threading.Lock()
+
+    def _map_executor(self):
+        with self._lock:
+            if self._map_pool is None:
+                self._map_pool = ProcessPoolExecutor(max_workers=self.processes) if self.processes \
+                    else ThreadPoolExecutor(max_workers=1, thread_name_prefix="map-reduce-map")
+            return self._map_pool
+
+    def plan(self, table: pa.Table, partition_by: Optional[str] = None) -> list:
+        """Partition specs for a table: row ranges, or key groups when partition_by names a column."""
+        partitions = max(1, min(self.max_partitions, math.ceil(table.num_rows / self.partition_rows)))
+        if not partition_by:
+            return row_partitions(table.num_rows, partitions)
+        if partition_by not in table.column_names:
+            raise ValueError(f"Unknown partition column '{partition_by}'. "
+                             f"Available columns: {', '.join(table.column_names)}")
+        counts = pc.value_counts(pc.cast(table[partition_by], pa.string())).to_pylist()
+        return key_partitions(partition_by, {item["values"]: item["counts"] for item in counts}, partitions)
+
+    def _analyse(self, question: str, name: str, part: dict) -> str:
+        prompt = MAP_PROMPT.format(question=question, label=part["label"], rows=part["rows"], name=name,
+                                   summary=part["summary"])
+        started_at = datetime.now(timezone.utc)
+        started = time.perf_counter()
+        finding = self.llm.call([{"role": "user", "content": prompt}])
+        part["llm_seconds"] = time.perf_counter() - started
+        record_span("map_llm", started_at, part["llm_seconds"], partition=part["label"])
+        return finding
+
+    def run(self, path: str, question: str, partition_by: Optional[str] = None,
+            check_cancelled: Optional[Callable] = None, on_partition: Optional[Callable] = None) -> dict:
+        """Runs map, per-partition analysis and reduce for a CSV; returns the report and per-stage timings.
+
+        check_cancelled is called between partitions; on_partition(part, done, total) after each is analysed.
+        """
+        if not str(path).lower().endswith(".csv"):
+            raise ValueError(f"Map-reduce analysis needs a CSV file, got {os.path.basename(path)}")
+        check = check_cancelled or (lambda: None)
+        started = time.perf_counter()
+        name = os.path.basename(path)
+        columnar_file = convert_csv(path, self.columnar_dir)
+        table = read_table(columnar_file)
+        numeric_columns, group_columns = table_columns(table)
+        specs = self.plan(table, partition_by)
+        logger.info("Map-reduce over %s: %d rows in %d partitions", name, table.num_rows, len(specs))
+
+        map_futures = [self._map_executor().submit(map_partition, columnar_file, spec, numeric_columns,
+                                                   group_columns, question, self.partition_tokens)
+                       for spec in specs]
+        llm_futures = {}
+        parts = []
+        try:
+            # Partitions go to the LLM as soon as they are summarised, while others are still being mapped.
+            for future in as_completed(map_futures):
+                check()
+                part = future.result()
+                record_span("map_partition", part.pop("started_at"), part["map_seconds"], partition=part["label"])
+                context = contextvars.copy_context()
+                llm_futures[self._llm_pool.submit(context.run, self._analyse, question, name, part)] = part
+            for future in as_completed(llm_futures):
+                check()
+                part = llm_futures[future]
+                part["finding"] = future.result()
+                parts.append(part)
+                if on_partition:
+                    on_partition(part, len(parts), len(specs))
+        except BaseException:
+            for future in map_futures + list(llm_futures):
+                future.cancel()
+            raise
+
+        order = {spec["label"]: i for i, spec in enumerate(specs)}
+        parts.sort(key=lambda part: order[part["label"]])
+        with span("reduce"):
+            figures = compact_context(describe_stats(merge_stats([part["stats"] for part in parts])),
+                                      self.reduce_tokens // 2, question)
+            findings = compact_context("\n\n".join(f"### {part['label']}\n{part['finding']}" for part in parts),
+                                       self.reduce_tokens // 2, question)
+            reduce_started = time.perf_counter()
+            report = self.llm.call([{"role": "user", "content": REDUCE_PROMPT.format(
+                question=question, name=name, partitions=len(parts), figures=figures, findings=findings)}])
+            reduce_seconds = time.perf_counter() - reduce_started
+        return {
+            "report": report,
+            "rows": table.num_rows,
+            "partitions": [{"label": part["label"], "rows": part["rows"], "map_seconds": round(part["map_seconds"], 4),
+                            "llm_seconds": round(part["llm_seconds"], 4)} for part in parts],
+            "reduce_seconds": round(reduce_seconds, 4),
+            "total_seconds": round(time.perf_counter() - started, 4),
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._map_pool is not None:
+                self._map_pool.shutdown(cancel_futures=True)
+                self._map_pool = None
+        self._llm_pool.shutdown(cancel_futures=True)
@@ -0,0 +1,239 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+QUANTITY = "Quantity"
+UNIT_PRICE = "Unit_Price"
+NEGOTIATED_PRICE = "Negotiated_Price"
+DEFECTIVE_UNITS = "Defective_Units"
+ORDER_DATE = "Order_Date"
+DELIVERY_DATE = "Delivery_Date"
+COMPLIANCE = "Compliance"
+COMPLIANT_VALUES = {"yes", "y", "true", "1", "compliant"}
+LEAD_TIME_PERCENTILES = (0.5, 0.9, 0.95)
+
+
+def group_codes(df: pd.DataFrame, group_by: Optional[str]) -> tuple:
+    """Integer group code per row (-1 for a missing key) and the group labels; one group "all" without group_by.
+
+    The KPI functions take this pair as groups, so several KPIs over one grouping factorize it once.
+    """
+    if group_by is None:
+        return np.zeros(len(df), dtype=np.intp), pd.Index(["all"])
+    if group_by not in df.columns:
+        raise ValueError(f"Unknown column '{group_by}'. Available columns: {', '.join(df.columns)}")
+    codes, labels = pd.factorize(df[group_by], sort=True)
+    return codes, pd.Index(labels, name=group_by)
+
+
+def group_sum(codes: np.ndarray, values: np.ndarray, groups: int, valid: Optional[np.ndarray] = None) -> np.ndarray:
+    """Per-group sum of values over rows with a group and a value (and valid, if given)."""
+    mask = (codes >= 0) & ~np.isnan(values)
+    if valid is not None:
+        mask &= valid
+    return np.bincount(codes[mask], weights=values[mask], minlength=groups)
+
+
+def group_count(codes: np.ndarray, groups: int, valid: Optional[np.ndarray] = None) -> np.ndarray:
+    mask = codes >= 0 if valid is None else (codes >= 0) & valid
+    return np.bincount(codes[mask], minlength=groups)
+
+
+def group_percentiles(codes: np.ndarray, values: np.ndarray, groups: int, percentiles) -> np.ndarray:
+    """Per-group percentiles (fractions in [0, 1]) of values, interpolated linearly like np.percentile.
+
+    One sort of (group, value) pairs serves every group and percentile; the result
+    has a row per percentile and NaN for groups without values.
+    """
+    mask = (codes >= 0) & ~np.isnan(values)
+    codes, values = codes[mask], values[mask]
+    low = values.min() if len(values) else 0.0
+    span = values.max() - low + 1 if len(values) else 1.0
+    if np.array_equal(values, np.floor(values)) and span * groups < 2 ** 62:
+        # Whole numbers (e.g. days) pack with their group into one int64 key, which sorts far faster than lexsort.
+        keys = np.sort(codes.astype(np.int64) * np.int64(span) + (values - low).astype(np.int64))
+        values = (keys % np.int64(span)).astype(float) + low
+    else:
+        values = values[np.lexsort((values, codes))]
+    counts = np.bincount(codes, minlength=groups)
+    starts = np.cumsum(counts) - counts
+    has = counts > 0
+    result = np.full((len(percentiles), groups), np.nan)
+    for row, fraction in enumerate(percentiles):
+        position = starts[has] + fraction * (counts[has] - 1)
+        low = np.floor(position).astype(np.intp)
+        high = np.ceil(position).astype(np.intp)
+        result[row, has] = values[low] + (values[high] - values[low]) * (position - low)
+    return result
+
+
+def _numeric(df: pd.DataFrame, column: str) -> np.ndarray:
+    return df[column].to_numpy(dtype=float, na_value=np.nan)
+
+
+def _require(df: pd.DataFrame, kpi: str, *columns) -> None:
+    missing = [column for column in columns if column not in df.columns]
+    if missing:
+        raise ValueError(f"The {kpi} KPI needs the column(s) {', '.join(missing)}, which this dataset lacks.")
+
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(denominator > 0, numerator / denominator, np.nan)
+
+
+def lead_time_days(df: pd.DataFrame) -> np.ndarray:
+    """Days from order to delivery per row; NaN where either date is missing."""
+    order, delivery = (df[column] if pd.api.types.is_datetime64_any_dtype(df[column])
+                       else pd.to_datetime(df[column], errors="coerce") for column in (ORDER_DATE, DELIVERY_DATE))
+    return (delivery.to_numpy(dtype="datetime64[ns]") - order.to_numpy(dtype="datetime64[ns]")) / np.timedelta64(1, "D")
+
+
+def compliant_rows(df: pd.DataFrame) -> tuple:
+    """Boolean arrays: whether each row is compliant, and whether its compliance is known."""
+    codes, values = pd.factorize(df[COMPLIANCE])
+    # Deciding per distinct value keeps this one lookup per row however the column is typed;
+    # the trailing False is what missing values (code -1) look up.
+    compliant_values = np.array([str(value).strip().lower() in COMPLIANT_VALUES for value in values] + [False])
+    return compliant_values[codes], codes >= 0
+
+
+def defect_rate(df: pd.DataFrame, group_by: Optional[str] = None, groups: Optional[tuple] = None) -> pd.DataFrame:
+    """Defective units as a share of the units of orders with a defect count."""
+    _require(df, "defect_rate", QUANTITY, DEFECTIVE_UNITS)
+    codes, labels = groups or group_codes(df, group_by)
+    defects = _numeric(df, DEFECTIVE_UNITS)
+    inspected = ~np.isnan(defects)
+    units = group_sum(codes, _numeric(df, QUANTITY), len(labels), inspected)
+    defective = group_sum(codes, defects, len(labels))
+    return pd.DataFrame({"orders": group_count(codes, len(labels), inspected), "units": units,
+                         "defective_units": defective, "defect_rate_pct": 100 * _ratio(defective, units)},
+                        index=labels)
+
+
+def price_savings(df: pd.DataFrame, group_by: Optional[str] = None, groups: Optional[tuple] = None) -> pd.DataFrame:
+    """Spend at list and negotiated prices, and what negotiation saved."""
+    _require(df, "price_savings", QUANTITY, UNIT_PRICE, NEGOTIATED_PRICE)
+    codes, labels = groups or group_codes(df, group_by)
+    quantity = _numeric(df, QUANTITY)
+    list_price, negotiated_price = _numeric(df, UNIT_PRICE), _numeric(df, NEGOTIATED_PRICE)
+    priced = ~(np.isnan(quantity) | np.isnan(list_price) | np.isnan(negotiated_price))
+    list_spend = group_sum(codes, quantity * list_price, len(labels), priced)
+    spend = group_sum(codes, quantity * negotiated_price, len(labels), priced)
+    return pd.DataFrame({"orders": group_count(codes, len(labels), priced), "list_spend": list_spend,
+                         "spend": spend, "savings": list_spend - spend,
+                         "savings_pct": 100 * _ratio(list_spend - spend, list_spend)}, index=labels)
+
+
+def lead_time(df: pd.DataFrame, group_by: Optional[str] = None, groups: Optional[tuple] = None) -> pd.DataFrame:
+    """Distribution of days from order to delivery: mean, spread and percentiles."""
+    _require(df, "lead_time", ORDER_DATE, DELIVERY_DATE)
+    codes, labels = groups or group_codes(df, group_by)
+    days = lead_time_days(df)
+    delivered = ~np.isnan(days)
+    count = group_count(codes, len(labels), delivered)
+    mean = _ratio(group_sum(codes, days, len(labels)), count)
+    variance = _ratio(group_sum(codes, days * days, len(labels)), count) - mean * mean
+    quantiles = group_percentiles(codes, days, len(labels), (0.0, *LEAD_TIME_PERCENTILES, 1.0))
+    return pd.DataFrame({"orders": count, "mean_days": mean, "std_days": np.sqrt(np.maximum(variance, 0)),
+                         "min_days": quantiles[0],
+                         **{f"p{round(q * 100)}_days": quantiles[i + 1] for i, q in enumerate(LEAD_TIME_PERCENTILES)},
+                         "max_days": quantiles[-1]}, index=labels)
+
+
+def compliance_rate(df: pd.DataFrame, group_by: Optional[str] = None, groups: Optional[tuple] = None) -> pd.DataFrame:
+    """Share of orders with a known compliance status that are compliant."""
+    _require(df, "compliance_rate", COMPLIANCE)
+    codes, labels = groups or group_codes(df, group_by)
+    compliant, known = compliant_rows(df)
+    orders = group_count(codes, len(labels), known)
+    compliant_orders = group_count(codes, len(labels), compliant)
+    return pd.DataFrame({"orders": orders, "compliant_orders": compliant_orders,
+                         "compliance_rate_pct": 100 * _ratio(compliant_orders, orders)}, index=labels)
+
+
+def scorecard(df: pd.DataFrame, group_by: Optional[str] = "Supplier") -> pd.DataFrame:
+    """One row per group with its spend, savings, defect rate, lead times and compliance."""
+    codes, labels = groups = group_codes(df, group_by)
+    savings, defects = price_savings(df, groups=groups), defect_rate(df, groups=groups)
+    lead_times, compliance = lead_time(df, groups=groups), compliance_rate(df, groups=groups)
+    return pd.DataFrame({"orders": group_count(codes, len(labels)), "spend": savings["spend"],
+                         "savings_pct": savings["savings_pct"], "defect_rate_pct": defects["defect_rate_pct"],
+                         "mean_lead_days": lead_times["mean_days"], "p90_lead_days": lead_times["p90_days"],
+                         "compliance_rate_pct": compliance["compliance_rate_pct"]}, index=labels)
+
+
+# Each KPI and the column its groups are ranked by.
+KPIS = {
+    "defect_rate": (defect_rate, "defect_rate_pct"),
+    "price_savings": (price_savings, "savings"),
+    "lead_time": (lead_time, "mean_days"),
+    "compliance_rate": (compliance_rate, "compliance_rate_pct"),
+    "scorecard": (scorecard, "spend"),
+}
+
+
+def filters_key(filters: Optional[Dict[str, Any]]) -> tuple:
+    """Canonical form of column == value filters, matching DatasetProfile.apply_filters' string comparison."""
+    return tuple(sorted((column, tuple(sorted(str(v) for v in (value if isinstance(value, list) else [value]))))
+                        for column, value in (filters or {}).items()))
+
+
+class KpiMemo:
+    """KPI tables keyed by dataset content hash, KPI, grouping column and filters.
+
+    A bounded LRU shared by every crew, so a KPI asked again, by another agent or
+    another request on the same data, is not recomputed. Datasets are keyed by
+    content, so a changed file never gets a stale table.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._tables = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key: tuple, compute: Callable) -> pd.DataFrame:
+        with self._lock:
+            table = self._tables.get(key)
+            if table is not None:
+                self._tables.move_to_end(key)
+                self.hits += 1
+                return table
+            self.misses += 1
+        table = compute()
+        with self._lock:
+            self._tables[key] = table
+            self._tables.move_to_end(key)
+            while len(self._tables) > self.max_entries:
+                self._tables.popitem(last=False)
+        return table
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._tables), "max_entries": self.max_entries, "hits": self.hits,
+                    "misses": self.misses}
+
+
+def compute_kpi(profile, kpi: str, group_by: Optional[str] = None, filters: Optional[Dict[str, Any]] = None,
+                memo: Optional[KpiMemo] = None, ascending: bool = False) -> pd.DataFrame:
+    """Computes a KPI table over a DatasetProfile's rows matching filters, ranked by the KPI's main column.
+
+    The table is memoized when a memo is given and the profile knows its file hash.
+    """
+    if kpi not in KPIS:
+        raise ValueError(f"Unknown KPI '{kpi}'. Use one of: {', '.join(KPIS)}")
+    function, rank_by = KPIS[kpi]
+    if kpi == "scorecard":
+        group_by = group_by or "Supplier"
+    file_hash = getattr(profile, "file_hash", None)
+    if memo is None or file_hash is None:
+        table = function(profile.apply_filters(filters), group_by)
+    else:
+        table = memo.get_or_compute((file_hash, kpi, group_by, filters_key(filters)),
+                                    lambda: function(profile.apply_filters(filters), group_by))
+    return table.sort_values(rank_by, ascending=ascending, na_position="last")
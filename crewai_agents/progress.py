@@ -0,0 +1,110 @@
+import asyncio
+import json
+import threading
+from contextlib import contextmanager
+
+
+class ProgressChannel:
+    """Thread-safe hand-off of progress events from a crew run to an async consumer."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self._queue = asyncio.Queue()
+
+    def publish(self, event: str, data: dict) -> None:
+        """Queues an event; safe to call from worker and event-bus threads."""
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, (event, data))
+
+    async def get(self, timeout: float):
+        """Returns the next (event, data) pair, or None if nothing arrived within timeout."""
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def drain(self) -> list:
+        events = []
+        while not self._queue.empty():
+            events.append(self._queue.get_nowait())
+        return events
+
+
+def format_sse(event: str, data: dict) -> str:
+    """Formats one Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+_subscribers = {}
+_subscribers_lock = threading.Lock()
+_handlers_registered = False
+
+
+def _publish(task_id, event: str, data: dict) -> None:
+    with _subscribers_lock:
+        channel = _subscribers.get(str(task_id))
+    if channel is not None:
+        channel.publish(event, data)
+
+
+def _task_name(task) -> str:
+    return task.name or task.description
+
+
+def _on_task_started(source, event):
+    task = event.task
+    if task is not None:
+        _publish(task.id, "task_started", {"task": _task_name(task), "agent": task.agent.role if task.agent else None})
+
+
+def _on_task_completed(source, event):
+    task = event.task
+    if task is not None:
+        _publish(task.id, "task_completed", {"task": _task_name(task), "agent": event.output.agent,
+                                             "output": event.output.raw})
+
+
+def _on_task_failed(source, event):
+    task = getattr(event, "task", None)
+    if task is not None:
+        _publish(task.id, "task_failed", {"task": _task_name(task), "error": event.error})
+
+
+def _on_stream_chunk(source, event):
+    if event.task_id and event.chunk:
+        _publish(event.task_id, "token", {"task": event.task_name, "chunk": event.chunk})
+
+
+def _register_handlers():
+    global _handlers_registered
+    with _subscribers_lock:
+        if _handlers_registered:
+            return
+        # Only needed once a crew runs, so importing this module does not load crewai.
+        from crewai.events import crewai_event_bus
+        from crewai.events.types.llm_events import LLMStreamChunkEvent
+        from crewai.events.types.task_events import TaskStartedEvent, TaskCompletedEvent, TaskFailedEvent
+        crewai_event_bus.on(TaskStartedEvent)(_on_task_started)
+        crewai_event_bus.on(TaskCompletedEvent)(_on_task_completed)
+        crewai_event_bus.on(TaskFailedEvent)(_on_task_failed)
+        crewai_event_bus.on(LLMStreamChunkEvent)(_on_stream_chunk)
+        _handlers_registered = True
+
+
+@contextmanager
+def crew_progress(crew, channel: ProgressChannel):
+    """Routes task and token events of one crew's tasks to a channel while it runs.
+
+    The crewai event bus is process-wide, so events are matched to the crew by the
+    ids of its (per-request copied) tasks.
+    """
+    _register_handlers()
+    task_ids = [str(task.id) for task in crew.tasks]
+    with _subscribers_lock:
+        for task_id in task_ids:
+            _subscribers[task_id] = channel
+    try:
+        yield
+    finally:
+        with _subscribers_lock:
+            for task_id in task_ids:
+                _subscribers.pop(task_id, None)
@@ -0,0 +1,154 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+import numpy as np
+
+
+def normalize_query(query: str) -> str:
+    """Normalizes a question so trivially different phrasings share a cache entry."""
+    query = re.sub(r"\s+", " ", query.strip().lower())
+    return query.rstrip(" ?.!")
+
+
+def context_hash(*parts) -> str:
+    """Hashes everything besides the question that an answer depends on."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _vector(blob: Optional[bytes]):
+    return None if blob is None else np.frombuffer(blob, dtype=np.float32)
+
+
+class ResultCache:
+    """LRU cache of crew results with a TTL and an optional persistent SQLite tier.
+
+    Entries are keyed by the normalized query and a context hash (dataset content,
+    crew YAML and model settings), so changing any of those naturally misses. With an
+    embedder and similarity_threshold set, a question whose embedding is close enough
+    to a cached question in the same context is also served from the cache. The
+    SQLite tier keeps each question's embedding, so similar questions still hit
+    after a restart.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: Optional[float] = 3600,
+                 persist_path: Optional[str] = None, embedder: Optional[Callable] = None,
+                 similarity_threshold: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.persist_path = persist_path
+        self.embedder = embedder
+        self.similarity_threshold = similarity_threshold
+        self.hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if persist_path:
+            with sqlite3.connect(persist_path) as db:
+                db.execute("CREATE TABLE IF NOT EXISTS results "
+                           "(key TEXT PRIMARY KEY, context TEXT, query TEXT, result TEXT, created REAL, vector BLOB)")
+                # Files written before embeddings were persisted lack the column.
+                if "vector" not in [column[1] for column in db.execute("PRAGMA table_info(results)")]:
+                    db.execute("ALTER TABLE results ADD COLUMN vector BLOB")
+
+    @staticmethod
+    def make_key(query: str, context: str) -> str:
+        return hashlib.sha256(f"{context}\n{normalize_query(query)}".encode()).hexdigest()
+
+    def _expired(self, created: float) -> bool:
+        return bool(self.ttl_seconds) and time.time() - created > self.ttl_seconds
+
+    def _embed(self, query: str):
+        vector = np.asarray(self.embedder([normalize_query(query)])[0], dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1)
+
+    def _remember(self, key: str, context: str, query: str, result: str, created: float, vector=None):
+        with self._lock:
+            self._entries[key] = {"context": context, "query": query, "result": result,
+                                  "created": created, "vector": vector}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _get_exact(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if not self._expired(entry["created"]):
+                    self._entries.move_to_end(key)
+                    return entry["result"]
+                del self._entries[key]
+        if not self.persist_path:
+            return None
+        with sqlite3.connect(self.persist_path) as db:
+            row = db.execute("SELECT context, query, result, created, vector FROM results WHERE key = ?",
+                             (key,)).fetchone()
+        if row is None or self._expired(row[3]):
+            return None
+        self._remember(key, *row[:4], _vector(row[4]))
+        return row[2]
+
+    def _candidates(self, context: str) -> list:
+        """(key, query, result, created, vector) of the entries in this context that have an embedding."""
+        if self.persist_path:
+            # Every entry is persisted, including those loaded before this process started.
+            with sqlite3.connect(self.persist_path) as db:
+                rows = db.execute("SELECT key, query, result, created, vector FROM results "
+                                  "WHERE context = ? AND vector IS NOT NULL", (context,)).fetchall()
+            return [(key, query, result, created, _vector(vector)) for key, query, result, created, vector in rows]
+        with self._lock:
+            return [(key, entry["query"], entry["result"], entry["created"], entry["vector"])
+                    for key, entry in self._entries.items()
+                    if entry["context"] == context and entry["vector"] is not None]
+
+    def _get_similar(self, query: str, context: str):
+        vector = self._embed(query)
+        best, best_score = None, self.similarity_threshold
+        for candidate in self._candidates(context):
+            if self._expired(candidate[3]) or candidate[4].shape != vector.shape:
+                continue
+            score = float(candidate[4] @ vector)
+            if score >= best_score:
+                best, best_score = candidate, score
+        if best is None:
+            return None
+        key, cached_query, result, created, cached_vector = best
+        self._remember(key, context, cached_query, result, created, cached_vector)
+        return result
+
+    def get(self, query: str, context: str) -> Optional[str]:
+        """Returns a cached result for the query in this context, or None."""
+        result = self._get_exact(self.make_key(query, context))
+        if result is None and self.embedder is not None and self.similarity_threshold:
+            result = self._get_similar(query, context)
+            if result is not None:
+                self.similar_hits += 1
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return result
+
+    def put(self, query: str, context: str, result: str) -> None:
+        key = self.make_key(query, context)
+        created = time.time()
+        vector = self._embed(query) if self.embedder is not None and self.similarity_threshold else None
+        self._remember(key, context, query, result, created, vector)
+        if self.persist_path:
+            with sqlite3.connect(self.persist_path) as db:
+                db.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+                           (key, context, query, result, created, None if vector is None else vector.tobytes()))
+                if self.ttl_seconds:
+                    db.execute("DELETE FROM results WHERE created < ?", (created - self.ttl_seconds,))
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = len(self._entries)
+        return {"hits": self.hits, "similar_hits": self.similar_hits, "misses": self.misses,
+                "entries": entries, "max_entries": self.max_entries}
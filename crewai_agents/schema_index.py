@@ -0,0 +1,132 @@
+import os
+import re
+import threading
+from typing import Optional
+
+import pandas as pd
+
+from file_hashes import content_hash
+
+SUPPORTED_EXTENSIONS = (".csv", ".xlsx", ".pdf")
+TABULAR_EXTENSIONS = (".csv", ".xlsx")
+SAMPLE_ROWS = 200
+SAMPLE_VALUES = 5
+PDF_PREVIEW_CHARS = 4000
+
+# Common question words that should not make a file look relevant.
+STOPWORDS = {
+    "a", "an", "and", "are", "by", "for", "from", "give", "has", "have", "how", "i", "in", "is", "it", "me",
+    "of", "on", "or", "show", "the", "to", "what", "which", "who", "with", "data", "want", "know", "provided",
+    "identify", "highest", "lowest", "top", "most", "least", "based", "all", "each", "per", "their", "this",
+}
+
+
+def tokenize(text: str) -> set:
+    """Lowercase word tokens; snake_case and CamelCase identifiers are split into their parts."""
+    text = re.sub(r"([a-z])([A-Z])", r"\1 \2", str(text))
+    return {token for token in re.split(r"[^a-z0-9]+", text.lower()) if len(token) > 1 and token not in STOPWORDS}
+
+
+def list_knowledge_files(knowledge_dir: str = "knowledge") -> list:
+    """Lists the supported data files in the knowledge folder, ignoring hidden and partial files."""
+    if not os.path.isdir(knowledge_dir):
+        return []
+    return sorted(f for f in os.listdir(knowledge_dir)
+                  if not f.startswith(".") and f.lower().endswith(SUPPORTED_EXTENSIONS)
+                  and os.path.isfile(os.path.join(knowledge_dir, f)))
+
+
+def is_tabular(file_name: str) -> bool:
+    return file_name.lower().endswith(TABULAR_EXTENSIONS)
+
+
+def read_sample(path: str) -> pd.DataFrame:
+    """Reads the first rows of a tabular file."""
+    if path.lower().endswith(".xlsx"):
+        return pd.read_excel(path, nrows=SAMPLE_ROWS)
+    return pd.read_csv(path, nrows=SAMPLE_ROWS)
+
+
+def read_pdf_preview(path: str) -> str:
+    """Extracts the text of the first pages of a PDF."""
+    import pdfplumber
+
+    text = ""
+    with pdfplumber.open(path) as pdf:
+        for page in pdf.pages:
+            text += (page.extract_text() or "") + "\n"
+            if len(text) >= PDF_PREVIEW_CHARS:
+                break
+    return text[:PDF_PREVIEW_CHARS]
+
+
+def build_schema(knowledge_dir: str, file_name: str) -> dict:
+    """Describes one file: column names, types and sample values, or a text preview for PDFs."""
+    path = os.path.join(knowledge_dir, file_name)
+    schema = {"file": file_name, "kind": os.path.splitext(file_name)[1].lower().lstrip(".")}
+    if is_tabular(file_name):
+        sample = read_sample(path)
+        schema["columns"] = [
+            {"name": str(column), "dtype": str(sample[column].dtype),
+             "samples": [str(v) for v in sample[column].dropna().unique()[:SAMPLE_VALUES]]}
+            for column in sample.columns
+        ]
+    else:
+        schema["preview"] = read_pdf_preview(path)
+    return schema
+
+
+class SchemaIndex:
+    """Lightweight metadata index over the knowledge folder used to route questions to files.
+
+    Each file's schema is built from a small sample and cached by content hash,
+    so routing a question costs a few set intersections rather than a retrieval
+    pass over every dataset.
+    """
+
+    def __init__(self, knowledge_dir: str = "knowledge"):
+        self.knowledge_dir = knowledge_dir
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def _entry(self, file_name: str) -> dict:
+        file_hash = content_hash(os.path.join(self.knowledge_dir, file_name))
+        with self._lock:
+            cached = self._entries.get(file_name)
+        if cached and cached["hash"] == file_hash:
+            return cached
+        schema = build_schema(self.knowledge_dir, file_name)
+        columns = schema.get("columns", [])
+        entry = {
+            "hash": file_hash,
+            "schema": schema,
+            "name_tokens": tokenize(os.path.splitext(file_name)[0]),
+            "column_tokens": set().union(*(tokenize(c["name"]) for c in columns)) if columns else set(),
+            "value_tokens": set().union(*(tokenize(" ".join(c["samples"])) for c in columns)) if columns else set(),
+            "text_tokens": tokenize(schema.get("preview", "")),
+        }
+        with self._lock:
+            self._entries[file_name] = entry
+        return entry
+
+    def schemas(self) -> list:
+        """Returns the schema of every file currently in the knowledge folder."""
+        return [self._entry(file_name)["schema"] for file_name in list_knowledge_files(self.knowledge_dir)]
+
+    def score(self, query: str, file_name: str) -> float:
+        tokens = tokenize(query)
+        entry = self._entry(file_name)
+        return (3 * len(tokens & entry["column_tokens"]) + 2 * len(tokens & entry["name_tokens"])
+                + 2 * len(tokens & entry["value_tokens"]) + len(tokens & entry["text_tokens"]))
+
+    def route(self, query: str, max_files: Optional[int] = 3) -> list:
+        """Returns the files most relevant to the query, best first.
+
+        When nothing matches, every file is returned (up to max_files) so the crew
+        still has data to work with.
+        """
+        files = list_knowledge_files(self.knowledge_dir)
+        scored = sorted(((self.score(query, f), f) for f in files), key=lambda item: (-item[0], item[1]))
+        matched = [f for score, f in scored if score > 0]
+        selected = matched or files
+        return selected[:max_files] if max_files else selected
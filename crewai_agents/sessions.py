@@ -0,0 +1,156 @@
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from schema_index import SchemaIndex
+
+logger = logging.getLogger(__name__)
+
+SESSIONS_DIR = "sessions"
+SESSION_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+class Workspace:
+    """One session's data files, in knowledge/sessions/<id>, with their own schema index.
+
+    Knowledge file names of a workspace are relative to the knowledge folder
+    (sessions/<id>/<file>), so crews, profiles and cached answers built for them
+    never mix with another session's or the shared folder's.
+    """
+
+    def __init__(self, knowledge_root: str, session_id: str, last_used: Optional[float] = None):
+        self.id = session_id
+        self.prefix = f"{SESSIONS_DIR}/{session_id}"
+        self.knowledge_dir = os.path.join(knowledge_root, SESSIONS_DIR, session_id)
+        self.schema_index = SchemaIndex(self.knowledge_dir)
+        self.last_used = last_used or time.time()
+        self.memory_bytes = 0
+        self.evictions = 0
+
+    def knowledge_file(self, file_name: str) -> str:
+        return f"{self.prefix}/{file_name}"
+
+    def contains(self, path) -> bool:
+        """Whether a file path (or any path of a tuple of them) lies inside this workspace."""
+        paths = [path] if isinstance(path, (str, os.PathLike)) else list(path)
+        root = os.path.abspath(self.knowledge_dir) + os.sep
+        return any(os.path.abspath(p).startswith(root) for p in paths)
+
+    def route(self, query: str, max_files: Optional[int] = 3) -> list:
+        """Routes a question to this workspace's files, returned as knowledge file names."""
+        return [self.knowledge_file(f) for f in self.schema_index.route(query, max_files)]
+
+    def to_dict(self) -> dict:
+        return {"session_id": self.id, "last_used": self.last_used, "memory_bytes": self.memory_bytes,
+                "evictions": self.evictions}
+
+
+class WorkspaceManager:
+    """Per-session workspaces with a global memory budget and idle expiry.
+
+    measure(workspace) returns the bytes its loaded crews and datasets take in
+    memory; release(workspace) drops them. Once the total passes
+    memory_budget_bytes, the least recently used workspaces are released; their
+    files, columnar copies and knowledge indexes stay on disk, so the next
+    question reloads them cheaply. Workspaces unused for idle_seconds are deleted.
+    """
+
+    def __init__(self, knowledge_root: str = "knowledge", memory_budget_bytes: int = 1024 ** 3,
+                 idle_seconds: float = 3600, measure: Callable = None, release: Callable = None):
+        self.knowledge_root = knowledge_root
+        self.memory_budget_bytes = memory_budget_bytes
+        self.idle_seconds = idle_seconds
+        self._measure = measure or (lambda workspace: 0)
+        self._release = release or (lambda workspace: None)
+        self._workspaces = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+        self._load_existing()
+
+    def _load_existing(self) -> None:
+        # Workspaces left by an earlier run are kept until they have been idle too long.
+        sessions_dir = os.path.join(self.knowledge_root, SESSIONS_DIR)
+        if not os.path.isdir(sessions_dir):
+            return
+        entries = [(os.path.getmtime(os.path.join(sessions_dir, name)), name) for name in os.listdir(sessions_dir)
+                   if SESSION_ID_PATTERN.match(name) and os.path.isdir(os.path.join(sessions_dir, name))]
+        for last_used, name in sorted(entries):
+            self._workspaces[name] = Workspace(self.knowledge_root, name, last_used)
+
+    def create(self) -> Workspace:
+        """Starts a new, empty workspace."""
+        self.expire_idle()
+        workspace = Workspace(self.knowledge_root, uuid.uuid4().hex)
+        os.makedirs(workspace.knowledge_dir, exist_ok=True)
+        with self._lock:
+            self._workspaces[workspace.id] = workspace
+        return workspace
+
+    def get(self, session_id: str) -> Optional[Workspace]:
+        """Returns the session's workspace and marks it as used, or None if unknown or expired."""
+        self.expire_idle()
+        with self._lock:
+            workspace = self._workspaces.get(session_id)
+            if workspace is not None:
+                workspace.last_used = time.time()
+                self._workspaces.move_to_end(session_id)
+            return workspace
+
+    def loaded(self, workspace: Workspace) -> None:
+        """Re-measures a workspace after it loaded data, then evicts others to stay within the budget."""
+        with self._lock:
+            if self._workspaces.get(workspace.id) is not workspace:
+                return
+            workspace.memory_bytes = self._measure(workspace)
+            total = sum(w.memory_bytes for w in self._workspaces.values())
+            for other in list(self._workspaces.values()):
+                if total <= self.memory_budget_bytes:
+                    break
+                if other is workspace or not other.memory_bytes:
+                    continue
+                logger.info("Evicting session %s (%d bytes) from memory", other.id, other.memory_bytes)
+                self._release(other)
+                total -= other.memory_bytes
+                other.memory_bytes = 0
+                other.evictions += 1
+                self.evictions += 1
+
+    def delete(self, session_id: str) -> Optional[Workspace]:
+        """Releases a workspace and deletes its files; returns it, or None if unknown."""
+        with self._lock:
+            workspace = self._workspaces.pop(session_id, None)
+            if workspace is not None:
+                self._release(workspace)
+        if workspace is not None:
+            shutil.rmtree(workspace.knowledge_dir, ignore_errors=True)
+        return workspace
+
+    def expire_idle(self) -> list:
+        """Deletes workspaces unused for idle_seconds; returns their ids."""
+        cutoff = time.time() - self.idle_seconds
+        with self._lock:
+            expired = [w.id for w in self._workspaces.values() if w.last_used < cutoff]
+        for session_id in expired:
+            if self.delete(session_id) is not None:
+                logger.info("Session %s expired", session_id)
+                self.expirations += 1
+        return expired
+
+    def stats(self) -> dict:
+        with self._lock:
+            workspaces = list(self._workspaces.values())
+        return {
+            "sessions": len(workspaces),
+            "resident": sum(1 for w in workspaces if w.memory_bytes),
+            "memory_bytes": sum(w.memory_bytes for w in workspaces),
+            "memory_budget_bytes": self.memory_budget_bytes,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
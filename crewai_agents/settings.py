@@ -0,0 +1,14 @@
+import json
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Load config; kept free of heavy imports so the app can read settings before crewai is loaded.
+try:
+    with open('config.json') as f:
+        config = json.load(f)
+except FileNotFoundError:
+    raise FileNotFoundError("config.json not found")
+except json.JSONDecodeError:
+    raise json.JSONDecodeError("Invalid JSON in config.json")
@@ -1,27 +1,82 @@
 import streamlit as st
 import requests
+from requests.adapters import HTTPAdapter
+import hashlib
 import io
+import json
+from urllib.parse import quote
 
 # --- Configuration ---
 FASTAPI_BASE_URL = "http://localhost:8090" # Replace with your FastAPI server URL
 UPLOAD_ENDPOINT = f"{FASTAPI_BASE_URL}/upload_files/"
+UPLOAD_CHECK_ENDPOINT = f"{FASTAPI_BASE_URL}/upload_files/check"
+UPLOAD_CHUNK_SIZE = 1024 * 1024
 CHAT_ENDPOINT = f"{FASTAPI_BASE_URL}/analyze_data/"
+CHAT_STREAM_ENDPOINT = f"{FASTAPI_BASE_URL}/analyze_data/stream"
+JOBS_ENDPOINT = f"{FASTAPI_BASE_URL}/jobs"
+SESSIONS_ENDPOINT = f"{FASTAPI_BASE_URL}/sessions"
+JOB_POLL_SECONDS = 10
+
+@st.cache_resource
+def backend_session():
+    """One pooled HTTP session for every backend call, kept across Streamlit reruns so connections are reused."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+http = backend_session()
 
 # --- Helper Functions ---
-def upload_files_to_backend(uploaded_files):
-    """Sends files to the FastAPI backend."""
+def file_sha256(uploaded_file) -> str:
+    return hashlib.sha256(uploaded_file.getbuffer()).hexdigest()
+
+def file_chunks(uploaded_file, chunk_size=UPLOAD_CHUNK_SIZE):
+    """Yields the file in chunks; requests sends a generator body with chunked transfer encoding."""
+    buffer = uploaded_file.getbuffer()
+    for start in range(0, len(buffer), chunk_size):
+        yield bytes(buffer[start:start + chunk_size])
+
+def check_uploads(manifest, session_id):
+    """Creates a session if needed (or if it expired) and asks the backend which files it is missing."""
+    if session_id:
+        response = http.post(UPLOAD_CHECK_ENDPOINT, json={"files": manifest, "session_id": session_id})
+    if not session_id or response.status_code == 404: # No session yet, or it expired
+        session = http.post(SESSIONS_ENDPOINT)
+        session.raise_for_status()
+        session_id = session.json()["session_id"]
+        response = http.post(UPLOAD_CHECK_ENDPOINT, json={"files": manifest, "session_id": session_id})
+    response.raise_for_status()
+    return response.json()
+
+def upload_files_to_backend(uploaded_files, session_id=None):
+    """Sends files to the session's workspace on the FastAPI backend, starting a session if needed.
+
+    Only content hashes go first; files the backend already has are not sent again
+    (and not re-indexed), and the missing ones are streamed one by one.
+    """
     if not uploaded_files:
         return None
 
-    files_to_send = []
-    for uploaded_file in uploaded_files:
-        # To send a file, we need its name and a file-like object
-        files_to_send.append(('files', (uploaded_file.name, uploaded_file.getvalue(), uploaded_file.type)))
-
+    hashes = {uploaded_file.name: file_sha256(uploaded_file) for uploaded_file in uploaded_files}
     try:
-        response = requests.post(UPLOAD_ENDPOINT, files=files_to_send)
-        response.raise_for_status() # Raise an exception for HTTP errors
-        return response.json()
+        check = check_uploads([{"name": name, "sha256": digest} for name, digest in hashes.items()], session_id)
+        session_id = check["session_id"]
+        profiles = dict(check["profiles"])
+        for uploaded_file in uploaded_files:
+            if uploaded_file.name not in check["missing"]:
+                continue
+            response = http.put(f"{UPLOAD_ENDPOINT}{quote(uploaded_file.name)}", data=file_chunks(uploaded_file),
+                                params={"sha256": hashes[uploaded_file.name], "session_id": session_id},
+                                headers={"Content-Type": uploaded_file.type or "application/octet-stream"})
+            response.raise_for_status()
+            if response.json().get("profile"):
+                profiles[uploaded_file.name] = response.json()["profile"]
+        reused = len(check["present"]) + len(check["copied"])
+        return {"session_id": session_id, "uploaded": check["missing"], "present": check["present"],
+                "copied": check["copied"], "profiles": profiles, "hashes": hashes,
+                "message": f"{len(check['missing'])} file(s) uploaded, {reused} already on the server."}
     except requests.exceptions.RequestException as e:
         st.error(f"Error uploading files: {e}")
         if hasattr(e, 'response') and e.response is not None:
@@ -40,9 +95,15 @@ def send_chat_message_to_backend(message, session_id=None, file_ids=None):
         payload["file_ids"] = file_ids
 
     try:
-        response = requests.post(CHAT_ENDPOINT, json=payload)
+        response = http.post(CHAT_ENDPOINT, json=payload)
         response.raise_for_status()
-        return response.json()
+        job = response.json()
+        # The backend queues the analysis; long-poll the job until it finishes.
+        while job.get("status") in ("queued", "running"):
+            response = http.get(f"{JOBS_ENDPOINT}/{job['job_id']}", params={"wait": JOB_POLL_SECONDS})
+            response.raise_for_status()
+            job = response.json()
+        return job
     except requests.exceptions.RequestException as e:
         st.error(f"Error sending message: {e}")
         if hasattr(e, 'response') and e.response is not None:
@@ -52,6 +113,53 @@ def send_chat_message_to_backend(message, session_id=None, file_ids=None):
                 st.error(f"Backend response: {e.response.text}")
         return None
 
+def stream_chat_message_from_backend(message, session_id=None):
+    """Sends a chat message and yields (event, data) pairs from the backend's SSE stream."""
+    payload = {"query": message}
+    if session_id:
+        payload["session_id"] = session_id
+
+    with http.post(CHAT_STREAM_ENDPOINT, json=payload, stream=True) as response:
+        response.raise_for_status()
+        event = None
+        for line in response.iter_lines(decode_unicode=True):
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: ") and event:
+                yield event, json.loads(line[len("data: "):])
+                event = None
+
+def render_streamed_response(message, session_id=None):
+    """Renders task progress and tokens as they arrive; returns the final report or None."""
+    with st.chat_message("assistant"):
+        status = st.status("Analyzing...", expanded=False)
+        placeholder = st.empty()
+        partial = ""
+        try:
+            for event, data in stream_chat_message_from_backend(message, session_id=session_id):
+                if event == "task_started":
+                    status.update(label=f"{data['agent']}: {data['task'][:60]}")
+                    partial = ""
+                elif event == "token":
+                    partial += data["chunk"]
+                    placeholder.markdown(partial + "▌")
+                elif event == "task_completed":
+                    status.markdown(f"**{data['agent']}** finished.")
+                    status.markdown(data["output"])
+                elif event == "result":
+                    status.update(label="Analysis complete", state="complete")
+                    placeholder.markdown(data["result"])
+                    return data["result"]
+                elif event in ("error", "cancelled"):
+                    status.update(label="Analysis failed", state="error")
+                    placeholder.empty()
+                    st.error(f"Error from backend: {data.get('detail', data.get('status'))}")
+                    return None
+        except requests.exceptions.RequestException as e:
+            status.update(label="Analysis failed", state="error")
+            st.error(f"Error sending message: {e}")
+    return None
+
 # --- Streamlit UI ---
 st.set_page_config(page_title="Chat with Your Files", layout="wide")
 st.title("📄 Chat with Your Uploaded Files")
@@ -67,8 +175,8 @@ if "uploaded_file_names" not in st.session_state:
 with st.sidebar:
     st.header("Upload Files")
     uploaded_files = st.file_uploader(
-        "Upload your documents (CSV.)",
-        type=['csv' ], # Add more types as supported by your backend
+        "Upload your documents (CSV, XLSX or PDF)",
+        type=['csv', 'xlsx', 'pdf'], # Add more types as supported by your backend
         accept_multiple_files=True,
         key="file_uploader"
     )
@@ -76,7 +184,7 @@ with st.sidebar:
     if uploaded_files:
         if st.button("Process Uploaded Files"):
             with st.spinner("Processing files..."):
-                upload_response = upload_files_to_backend(uploaded_files)
+                upload_response = upload_files_to_backend(uploaded_files, st.session_state.session_id)
                 if upload_response:
                     st.session_state.session_id = upload_response.get("session_id")
                     # Store names of successfully processed files if backend provides them
@@ -115,16 +223,7 @@ if prompt := st.chat_input("Ask a question about your documents..."):
         with st.chat_message("user"):
             st.markdown(prompt)
 
-        # Get assistant response
-        with st.spinner("Thinking..."):
-            # Pass session_id to backend. Backend associates this with the uploaded files.
-            backend_response = send_chat_message_to_backend(prompt, session_id=st.session_state.session_id)
-            if backend_response and "response" in backend_response:
-                response_text = backend_response["response"]
-                st.session_state.messages.append({"role": "assistant", "content": response_text})
-                with st.chat_message("assistant"):
-                    st.markdown(response_text)
-            elif backend_response and "error" in backend_response:
-                st.error(f"Error from backend: {backend_response['error']}")
-            else:
-                st.error("Failed to get a response from the backend.")
\ No newline at end of file
+        # Stream the assistant response. Pass session_id to backend so it can associate the uploaded files.
+        response_text = render_streamed_response(prompt, session_id=st.session_state.session_id)
+        if response_text:
+            st.session_state.messages.append({"role": "assistant", "content": response_text})
\ No newline at end of file
@@ -0,0 +1,173 @@
+import contextvars
+import heapq
+import logging
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from crewai import Crew
+from crewai.crews.utils import prepare_task_execution
+from crewai.tasks.conditional_task import ConditionalTask
+from crewai.utilities.constants import NOT_SPECIFIED
+from pydantic import Field
+
+logger = logging.getLogger(__name__)
+
+
+def task_dependencies(task_config: dict) -> list:
+    """Names of the tasks whose output a tasks.yml entry receives as context.
+
+    `context_tasks` takes a list (or a single name); the older `context_task` key is still accepted.
+    """
+    names = task_config.get("context_tasks") or []
+    names = [names] if isinstance(names, str) else list(names)
+    if task_config.get("context_task") and task_config["context_task"] not in names:
+        names.insert(0, task_config["context_task"])
+    return names
+
+
+def _find_cycle(graph: dict, nodes: set) -> list:
+    """Returns one dependency cycle among nodes, as a list of names starting and ending on the same task."""
+    path, on_path = [], set()
+
+    def visit(name):
+        path.append(name)
+        on_path.add(name)
+        for dependency in graph[name]:
+            if dependency in on_path:
+                return path[path.index(dependency):] + [dependency]
+            if dependency in nodes:
+                cycle = visit(dependency)
+                if cycle:
+                    return cycle
+        nodes.discard(name)
+        on_path.discard(name)
+        path.pop()
+        return None
+
+    for name in list(nodes):
+        if name in nodes:
+            cycle = visit(name)
+            if cycle:
+                return cycle
+    return []
+
+
+def order_task_configs(task_configs: list) -> list:
+    """Orders tasks.yml entries so every task comes after its dependencies.
+
+    Keeps the file order wherever the dependencies allow it. Raises ValueError for
+    duplicate names, unknown dependencies and dependency cycles.
+    """
+    positions = {}
+    for position, task_config in enumerate(task_configs):
+        if task_config["name"] in positions:
+            raise ValueError(f"Duplicate task name '{task_config['name']}' in tasks file")
+        positions[task_config["name"]] = position
+
+    graph = {task_config["name"]: task_dependencies(task_config) for task_config in task_configs}
+    dependents = {name: [] for name in graph}
+    for name, dependencies in graph.items():
+        for dependency in dependencies:
+            if dependency not in graph:
+                raise ValueError(f"Task '{name}' depends on unknown task '{dependency}'")
+            dependents[dependency].append(name)
+
+    waiting = {name: len(set(dependencies)) for name, dependencies in graph.items()}
+    ready = [positions[name] for name, count in waiting.items() if count == 0]
+    heapq.heapify(ready)
+    ordered = []
+    while ready:
+        task_config = task_configs[heapq.heappop(ready)]
+        ordered.append(task_config)
+        for dependent in set(dependents[task_config["name"]]):
+            waiting[dependent] -= 1
+            if waiting[dependent] == 0:
+                heapq.heappush(ready, positions[dependent])
+
+    if len(ordered) < len(task_configs):
+        unresolved = {name for name, count in waiting.items() if count > 0}
+        cycle = _find_cycle(graph, unresolved)
+        raise ValueError(f"Task dependencies form a cycle: {' -> '.join(cycle)}")
+    return ordered
+
+
+class ParallelCrew(Crew):
+    """Sequential-process crew that starts each task as soon as the tasks in its context have finished.
+
+    Independent branches of the task graph run concurrently (up to max_parallel_tasks), so a
+    kickoff takes about as long as the critical path instead of the sum of all tasks. Tasks
+    without an explicit context keep crewai's meaning and wait for every task before them.
+    An agent's executor holds per-task state, so a task whose agent is busy with another
+    task runs on a copy of that agent, which shares its LLM, tools and knowledge.
+    """
+
+    max_parallel_tasks: int = Field(default=4, ge=1, description="Maximum number of tasks running at once.")
+
+    def copy(self):
+        copied = super().copy()
+        fields = {name: getattr(copied, name) for name in copied.model_fields_set}
+        return type(self)(**fields, max_parallel_tasks=self.max_parallel_tasks)
+
+    def _agent_copy(self, agent):
+        # What setup_agents gave the original at kickoff; the copy shares its knowledge as is.
+        copied = agent.copy()
+        copied.crew = self
+        copied.step_callback = agent.step_callback
+        copied.function_calling_llm = agent.function_calling_llm
+        return copied
+
+    def _dependencies(self, tasks: list) -> list:
+        indices = {id(task): index for index, task in enumerate(tasks)}
+        dependencies = []
+        for index, task in enumerate(tasks):
+            if task.context is NOT_SPECIFIED:
+                dependencies.append(set(range(index)))
+            else:
+                dependencies.append({indices[id(context_task)] for context_task in task.context or []
+                                     if id(context_task) in indices})
+        return dependencies
+
+    def _execute_tasks(self, tasks, start_index=0, was_replayed=False):
+        # Replays, conditional and crewai-async tasks keep crewai's own scheduling.
+        if (self.max_parallel_tasks == 1 or was_replayed or self._get_execution_start_index(tasks) is not None
+                or any(task.async_execution or isinstance(task, ConditionalTask) for task in tasks)):
+            return super()._execute_tasks(tasks, start_index, was_replayed)
+
+        dependencies = self._dependencies(tasks)
+        outputs = {}
+        running = {}
+        # Agents in use by a running task, keyed by that task's future.
+        busy_agents = {}
+
+        def run(index, agent_busy):
+            task = tasks[index]
+            exec_data, _, _ = prepare_task_execution(self, task, index, start_index, [], None)
+            agent = self._agent_copy(exec_data.agent) if agent_busy else exec_data.agent
+            context = self._get_context(task, [outputs[i] for i in sorted(outputs) if i < index])
+            return task.execute_sync(agent=agent, context=context, tools=exec_data.tools)
+
+        with ThreadPoolExecutor(max_workers=self.max_parallel_tasks, thread_name_prefix="crew-task") as pool:
+            while len(outputs) < len(tasks):
+                for index, task in enumerate(tasks):
+                    if (len(running) >= self.max_parallel_tasks or index in outputs
+                            or index in running.values() or not dependencies[index] <= outputs.keys()):
+                        continue
+                    agent_busy = id(task.agent) in busy_agents.values()
+                    # Each task runs in a copy of this context so tracing and event scopes follow it.
+                    future = pool.submit(contextvars.copy_context().run, run, index, agent_busy)
+                    running[future] = index
+                    if not agent_busy:
+                        busy_agents[future] = id(task.agent)
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = running.pop(future)
+                    busy_agents.pop(future, None)
+                    try:
+                        outputs[index] = future.result()
+                    except Exception:
+                        for pending in running:
+                            pending.cancel()
+                        raise
+                    self._process_task_result(tasks[index], outputs[index])
+                    self._store_execution_log(tasks[index], outputs[index], index, was_replayed)
+
+        return self._create_crew_output([outputs[index] for index in range(len(tasks))])
@@ -14,6 +14,8 @@ from app import app
 @pytest.fixture
 def client():
     with TestClient(app) as c:
+        # crewai loads in the background after startup; most tests need it.
+        assert c.get("/ready", params={"wait": 60}).status_code == 200
         yield c
 
 @pytest.fixture
@@ -4,14 +4,34 @@ from unittest.mock import patch, MagicMock, mock_open
 import os
 import shutil
 import io
+import subprocess
+import sys
+import json
 
 # client fixture is from conftest.py
 
+def analyze_and_wait(client: TestClient, query: str):
+    """Queues an analysis job and long-polls its result endpoint."""
+    response = client.post("/analyze_data", json={"query": query})
+    assert response.status_code == 202
+    return client.get(f"/jobs/{response.json()['job_id']}", params={"wait": 5})
+
 def test_health_check(client: TestClient):
     response = client.get("/")
     assert response.status_code == 200
     assert response.json() == {"status": "ok"}
 
+def test_ready_check(client: TestClient):
+    response = client.get("/ready")
+    assert response.status_code == 200
+    assert response.json() == {"status": "ready"}
+
+def test_importing_app_does_not_load_crewai():
+    app_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, "-c", "import sys, app; print('crewai' in sys.modules)"],
+                            cwd=app_dir, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "False"
+
 def test_upload_files_success(client: TestClient, setup_teardown_knowledge_dir):
     # Create a dummy file content
     file_content = b"col1,col2\nval1,val2"
@@ -43,6 +63,7 @@ def test_upload_files_success(client: TestClient, setup_teardown_knowledge_dir):
     assert "filenames" in response_json
     assert "paths" in response_json
     assert sorted(response_json["filenames"]) == sorted(["test1.csv", "test2.csv"])
+    assert response_json["profiles"]["test1.csv"] == {"rows": 1, "columns": ["col1", "col2"]}
     
     # Check if files were created in the knowledge directory
     knowledge_dir = os.path.join(os.path.dirname(__file__), "..", "knowledge")
@@ -53,12 +74,32 @@ def test_upload_files_failure(client: TestClient, setup_teardown_knowledge_dir):
     file_content = b"col1,col2\nval1,val2"
     files_data = [('files', ("test_fail.csv", io.BytesIO(file_content), "text/csv"))]
 
-    with patch("shutil.copyfileobj", side_effect=IOError("Disk full")):
+    with patch("app.save_upload", side_effect=IOError("Disk full")):
         response = client.post("/upload_files", files=files_data)
     
     assert response.status_code == 500
     assert "Error uploading test_fail.csv: Disk full" in response.json()["detail"]
 
+def test_upload_identical_file_is_skipped(client: TestClient, setup_teardown_knowledge_dir):
+    file_content = b"col1,col2\nval1,val2"
+    first = client.post("/upload_files", files=[('files', ("same.csv", io.BytesIO(file_content), "text/csv"))])
+    second = client.post("/upload_files", files=[('files', ("same.csv", io.BytesIO(file_content), "text/csv"))])
+
+    assert first.json()["skipped"] == []
+    assert second.json()["skipped"] == ["same.csv"]
+    assert first.json()["hashes"] == second.json()["hashes"]
+
+def test_upload_files_rejects_paths_outside_the_workspace(client: TestClient, setup_teardown_knowledge_dir):
+    session_id = client.post("/sessions").json()["session_id"]
+    for name in ("../../escaped.csv", ".hidden.csv"):
+        response = client.post("/upload_files", params={"session_id": session_id},
+                               files=[("files", ("ok.csv", io.BytesIO(b"a,b\n1,2\n"), "text/csv")),
+                                      ("files", (name, io.BytesIO(b"a,b\n1,2\n"), "text/csv"))])
+        assert response.status_code == 400
+    knowledge_dir = os.path.join(os.path.dirname(__file__), "..", "knowledge")
+    assert not os.path.exists(os.path.join(knowledge_dir, "escaped.csv"))
+    assert not os.path.exists(os.path.join(knowledge_dir, "sessions", session_id, "ok.csv"))
+
 def test_analyze_data_no_csv(client: TestClient, setup_teardown_knowledge_dir):
     # Ensure knowledge directory is empty or has no CSVs
     knowledge_dir = os.path.join(os.path.dirname(__file__), "..", "knowledge")
@@ -68,7 +109,7 @@ def test_analyze_data_no_csv(client: TestClient, setup_teardown_knowledge_dir):
             
     response = client.post("/analyze_data", json={"query": "What are the sales trends?"})
     assert response.status_code == 404
-    assert "No CSV file found in the knowledge folder" in response.json()["detail"]
+    assert "No data file (CSV, XLSX or PDF) found in the knowledge folder" in response.json()["detail"]
 
 @patch("app.create_data_analysis_crew") # Patching where it's used in app.py
 def test_analyze_data_success(mock_create_crew, client: TestClient, setup_teardown_knowledge_dir):
@@ -82,21 +123,37 @@ def test_analyze_data_success(mock_create_crew, client: TestClient, setup_teardo
     mock_result = MagicMock()
     mock_result.raw = "This is a raw analysis result."
     mock_crew_instance.kickoff.return_value = mock_result
+    mock_crew_instance.copy.return_value = mock_crew_instance
     mock_create_crew.return_value = mock_crew_instance
 
-    response = client.post("/analyze_data", json={"query": "Analyze this."})
+    response = analyze_and_wait(client, "Analyze this.")
 
     assert response.status_code == 200
-    assert response.json() == {"result": "This is a raw analysis result."}
+    assert response.json()["status"] == "succeeded"
+    assert response.json()["result"] == "This is a raw analysis result."
     
-    # Check that create_data_analysis_crew was called with the path to the first CSV
-    # Note: os.path.join("", "dummy_data.csv") becomes "dummy_data.csv" on Unix-like
-    # and might be different on Windows. The key is it's called with the filename.
-    # The app.py code `os.path.join("", csv_files[0])` might be better as `os.path.join("knowledge", csv_files[0])`
-    # for robustness, but we test the current implementation.
-    mock_create_crew.assert_called_once_with("dummy_data.csv") 
+    # Check that create_data_analysis_crew was called with the files the query was routed to.
+    # Names are relative to the knowledge folder, as crewai's file knowledge sources expect.
+    mock_create_crew.assert_called_once_with(("dummy_data.csv",))
     mock_crew_instance.kickoff.assert_called_once_with(inputs={"question": "Analyze this."})
 
+@patch("app.create_data_analysis_crew")
+def test_analyze_data_reuses_crew_template(mock_create_crew, client: TestClient, setup_teardown_knowledge_dir):
+    knowledge_dir = os.path.join(os.path.dirname(__file__), "..", "knowledge")
+    with open(os.path.join(knowledge_dir, "dummy_data.csv"), "w") as f:
+        f.write("header1,header2\ndata1,data2")
+
+    mock_crew_instance = MagicMock()
+    mock_crew_instance.copy.return_value.kickoff.return_value.raw = "ok"
+    mock_create_crew.return_value = mock_crew_instance
+
+    for i in range(3):
+        response = analyze_and_wait(client, f"Analyze this {i}.")
+        assert response.status_code == 200
+
+    mock_create_crew.assert_called_once_with(("dummy_data.csv",))
+    assert mock_crew_instance.copy.call_count == 3
+
 @patch("app.create_data_analysis_crew")
 def test_analyze_data_crew_execution_failure(mock_create_crew, client: TestClient, setup_teardown_knowledge_dir):
     knowledge_dir = os.path.join(os.path.dirname(__file__), "..", "knowledge")
@@ -106,9 +163,10 @@ def test_analyze_data_crew_execution_failure(mock_create_crew, client: TestClien
 
     mock_crew_instance = MagicMock()
     mock_crew_instance.kickoff.side_effect = Exception("Crew failed unexpectedly")
+    mock_crew_instance.copy.return_value = mock_crew_instance
     mock_create_crew.return_value = mock_crew_instance
 
-    response = client.post("/analyze_data", json={"query": "Analyze this."})
+    response = analyze_and_wait(client, "Analyze this.")
     assert response.status_code == 500
     assert "CrewAI execution failed: Crew failed unexpectedly" in response.json()["detail"]
 
@@ -119,6 +177,253 @@ def test_analyze_data_crew_creation_file_not_found(mock_create_crew_fnf, client:
     with open(dummy_csv_path, "w") as f:
         f.write("header1,header2\ndata1,data2")
 
-    response = client.post("/analyze_data", json={"query": "Analyze this."})
+    response = analyze_and_wait(client, "Analyze this.")
     assert response.status_code == 404 # As per app.py's FileNotFoundError handling
     assert "utils.py dependent file not found" in response.json()["detail"]
+
+def test_get_unknown_job(client: TestClient):
+    response = client.get("/jobs/does-not-exist")
+    assert response.status_code == 404
+
+@patch("app.create_data_analysis_crew")
+def test_analyze_data_stream(mock_create_crew, client: TestClient, setup_teardown_knowledge_dir):
+    knowledge_dir = os.path.join(os.path.dirname(__file__), "..", "knowledge")
+    with open(os.path.join(knowledge_dir, "dummy_data.csv"), "w") as f:
+        f.write("header1,header2\ndata1,data2")
+
+    mock_crew_instance = MagicMock()
+    mock_crew_instance.copy.return_value.kickoff.return_value.raw = "Streamed report."
+    mock_create_crew.return_value = mock_crew_instance
+
+    with client.stream("POST", "/analyze_data/stream", json={"query": "Analyze this."}) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        body = "".join(response.iter_text())
+
+    events = [line.split(": ", 1)[1] for line in body.splitlines() if line.startswith("event: ")]
+    assert events == ["queued", "result"]
+    assert "Streamed report." in body
+
+@patch("app.create_data_analysis_crew")
+def test_analyze_data_repeated_question_served_from_cache(mock_create_crew, client: TestClient, setup_teardown_knowledge_dir):
+    knowledge_dir = os.path.join(os.path.dirname(__file__), "..", "knowledge")
+    with open(os.path.join(knowledge_dir, "dummy_data.csv"), "w") as f:
+        f.write("header1,header2\ndata1,data2")
+
+    crew_copy = MagicMock()
+    crew_copy.kickoff.return_value.raw = "Top suppliers report."
+    mock_create_crew.return_value.copy.return_value = crew_copy
+
+    first = analyze_and_wait(client, "Top suppliers by defect rate?")
+    second = analyze_and_wait(client, "  top suppliers by DEFECT rate ")
+
+    assert first.json()["result"] == second.json()["result"] == "Top suppliers report."
+    assert second.json()["cached"] is True
+    crew_copy.kickoff.assert_called_once()
+
+    # Changing the dataset invalidates the cached answer.
+    with open(os.path.join(knowledge_dir, "dummy_data.csv"), "w") as f:
+        f.write("header1,header2\ndata1,data2\ndata3,data4")
+    third = analyze_and_wait(client, "Top suppliers by defect rate?")
+    assert "cached" not in third.json()
+    assert crew_copy.kickoff.call_count == 2
+
+@patch("app.create_data_analysis_crew")
+def test_analyze_data_routes_to_relevant_file(mock_create_crew, client: TestClient, setup_teardown_knowledge_dir):
+    knowledge_dir = os.path.join(os.path.dirname(__file__), "..", "knowledge")
+    with open(os.path.join(knowledge_dir, "suppliers.csv"), "w") as f:
+        f.write("Supplier,Defective_Units\nAlpha_Inc,3")
+    with open(os.path.join(knowledge_dir, "sales.csv"), "w") as f:
+        f.write("Product,Revenue\nWidget,100")
+    mock_create_crew.return_value.copy.return_value.kickoff.return_value.raw = "ok"
+
+    response = analyze_and_wait(client, "Explain the defective units of each supplier.")
+
+    assert response.status_code == 200
+    mock_create_crew.assert_called_once_with(("suppliers.csv",))
+    schema = client.get("/knowledge/schema").json()["files"]
+    assert [entry["file"] for entry in schema] == ["sales.csv", "suppliers.csv"]
+
+@patch("app.create_data_analysis_crew")
+def test_analyze_data_answers_simple_aggregates_without_crew(mock_create_crew, client: TestClient, setup_teardown_knowledge_dir):
+    knowledge_dir = os.path.join(os.path.dirname(__file__), "..", "knowledge")
+    with open(os.path.join(knowledge_dir, "suppliers.csv"), "w") as f:
+        f.write("Supplier,Defective_Units\nAlpha_Inc,3\nBeta_Supplies,7\nAlpha_Inc,1")
+
+    response = analyze_and_wait(client, "Which supplier has the most defective units?")
+
+    assert response.status_code == 200
+    assert response.json()["route"] == "fast_path"
+    assert "Highest: Beta_Supplies" in response.json()["result"]
+    mock_create_crew.assert_not_called()
+    assert client.get("/fast_path/stats").json()["fast_path"] == 1
+
+@patch("app.create_data_analysis_crew")
+def test_analyze_data_timings_and_metrics(mock_create_crew, client: TestClient, setup_teardown_knowledge_dir):
+    knowledge_dir = os.path.join(os.path.dirname(__file__), "..", "knowledge")
+    with open(os.path.join(knowledge_dir, "dummy_data.csv"), "w") as f:
+        f.write("header1,header2\ndata1,data2")
+    mock_create_crew.return_value.copy.return_value.kickoff.return_value.raw = "ok"
+
+    response = client.post("/analyze_data", json={"query": "Explain this data.", "include_timings": True})
+    job = client.get(f"/jobs/{response.json()['job_id']}", params={"wait": 5}).json()
+
+    assert {"route_query", "queue_wait", "get_crew", "kickoff"} <= set(job["timings"]["by_stage"])
+    untimed = analyze_and_wait(client, "Explain this data again.")
+    assert "timings" not in untimed.json()
+
+    metrics = client.get("/metrics")
+    assert metrics.headers["content-type"].startswith("text/plain")
+    assert 'analysis_span_seconds_count{span="kickoff"}' in metrics.text
+    assert 'analysis_routed_total{route="crew"}' in metrics.text
+
+def test_analyze_data_map_reduce_mode(client: TestClient, setup_teardown_knowledge_dir):
+    knowledge_dir = os.path.join(os.path.dirname(__file__), "..", "knowledge")
+    with open(os.path.join(knowledge_dir, "orders.csv"), "w") as f:
+        f.write("Supplier,Quantity\n" + "".join(f"S{i % 3},{i}\n" for i in range(30)))
+    map_reduce = client.app.state.map_reduce
+    map_reduce.processes, map_reduce.partition_rows = 0, 10
+    map_reduce.llm = MagicMock()
+    map_reduce.llm.call.return_value = "Merged report"
+
+    response = client.post("/analyze_data", json={"query": "Explain quantities per supplier.", "mode": "map_reduce"})
+    job = client.get(f"/jobs/{response.json()['job_id']}", params={"wait": 5}).json()
+
+    assert job["route"] == "map_reduce"
+    assert job["result"] == "Merged report"
+    # Three partitions analysed, then one reduce call.
+    assert map_reduce.llm.call.call_count == 4
+
+@patch("app.create_data_analysis_crew")
+def test_cached_answers_are_kept_apart_per_route(mock_create_crew, client: TestClient, setup_teardown_knowledge_dir):
+    knowledge_dir = os.path.join(os.path.dirname(__file__), "..", "knowledge")
+    with open(os.path.join(knowledge_dir, "orders.csv"), "w") as f:
+        f.write("Supplier,Quantity\n" + "".join(f"S{i % 3},{i}\n" for i in range(30)))
+    mock_create_crew.return_value.copy.return_value.kickoff.return_value.raw = "Crew report"
+    map_reduce = client.app.state.map_reduce
+    map_reduce.processes, map_reduce.partition_rows = 0, 10
+    map_reduce.llm = MagicMock()
+    map_reduce.llm.call.return_value = "Merged report"
+    query = "Explain quantities per supplier."
+
+    crew = client.post("/analyze_data", json={"query": query, "mode": "crew"})
+    crew = client.get(f"/jobs/{crew.json()['job_id']}", params={"wait": 5}).json()
+    reduced = client.post("/analyze_data", json={"query": query, "mode": "map_reduce"})
+    reduced = client.get(f"/jobs/{reduced.json()['job_id']}", params={"wait": 5}).json()
+
+    # The crew's answer is not served to the map_reduce request, nor the other way round.
+    assert (crew["result"], reduced["result"]) == ("Crew report", "Merged report")
+    assert reduced["route"] == "map_reduce" and "cached" not in reduced
+    batch = client.post("/analyze_data/batch", json={"queries": [query], "mode": "map_reduce", "stream": False})
+    batch = client.get(f"/jobs/{batch.json()['job_id']}", params={"wait": 5}).json()
+    assert batch["result"]["answers"][0]["result"] == "Merged report"
+    assert batch["result"]["answers"][0]["route"] == "cache"
+    batch = client.post("/analyze_data/batch", json={"queries": [query], "mode": "crew", "stream": False})
+    batch = client.get(f"/jobs/{batch.json()['job_id']}", params={"wait": 5}).json()
+    assert batch["result"]["answers"][0]["result"] == "Crew report"
+
+@patch("app.create_data_analysis_crew")
+def test_sessions_analyze_only_their_own_files(mock_create_crew, client: TestClient, setup_teardown_knowledge_dir):
+    mock_create_crew.return_value.copy.return_value.kickoff.return_value.raw = "ok"
+    sessions = [client.post("/sessions").json()["session_id"] for _ in range(2)]
+    for session_id, name in zip(sessions, ("first.csv", "second.csv")):
+        response = client.post("/upload_files", params={"session_id": session_id},
+                               files=[("files", (name, io.BytesIO(b"Supplier,Quantity\nAlpha,1\n"), "text/csv"))])
+        assert response.status_code == 200
+        assert response.json()["session_id"] == session_id
+
+    response = client.post("/analyze_data", json={"query": "Explain this data.", "session_id": sessions[1]})
+    job = client.get(f"/jobs/{response.json()['job_id']}", params={"wait": 5}).json()
+
+    assert job["result"] == "ok"
+    mock_create_crew.assert_called_once_with((f"sessions/{sessions[1]}/second.csv",))
+    assert client.get("/sessions/stats").json()["sessions"] >= 2
+    for session_id in sessions:
+        assert client.delete(f"/sessions/{session_id}").status_code == 200
+    response = client.post("/analyze_data", json={"query": "Explain this data.", "session_id": sessions[0]})
+    assert response.status_code == 404
+
+@patch("app.create_data_analysis_crew")
+def test_analyze_data_batch_streams_each_answer(mock_create_crew, client: TestClient, setup_teardown_knowledge_dir):
+    knowledge_dir = os.path.join(os.path.dirname(__file__), "..", "knowledge")
+    with open(os.path.join(knowledge_dir, "dummy_data.csv"), "w") as f:
+        f.write("header1,header2\ndata1,data2")
+    crew_copy = mock_create_crew.return_value.copy.return_value
+    crew_copy.kickoff.side_effect = lambda inputs: MagicMock(raw=f"Report on {inputs['question']}")
+
+    queries = ["Explain the trends.", "Summarise the data.", "  explain the TRENDS. "]
+    with client.stream("POST", "/analyze_data/batch", json={"queries": queries, "files": ["dummy_data.csv"]}) as response:
+        assert response.status_code == 200
+        body = "".join(response.iter_text())
+
+    events = [line.split(": ", 1)[1] for line in body.splitlines() if line.startswith("event: ")]
+    assert events == ["queued", "answer", "answer", "answer", "result"]
+    result = [json.loads(line[6:]) for line in body.splitlines() if line.startswith("data: ")][-1]["result"]
+    assert [answer["result"] for answer in result["answers"]] == [
+        "Report on Explain the trends.", "Report on Summarise the data.", "Report on Explain the trends."]
+    assert result["answers"][2]["duplicate_of"] == 0
+    assert result["distinct_questions"] == 2
+    mock_create_crew.assert_called_once_with(("dummy_data.csv",))
+    assert crew_copy.kickoff.call_count == 2
+
+    missing = client.post("/analyze_data/batch", json={"queries": ["Why?"], "files": ["missing.csv"]})
+    assert missing.status_code == 404
+
+@patch("app.create_data_analysis_crew")
+def test_analyze_data_returns_partial_result_when_budget_runs_out(mock_create_crew, client: TestClient, setup_teardown_knowledge_dir):
+    import budgets
+
+    knowledge_dir = os.path.join(os.path.dirname(__file__), "..", "knowledge")
+    with open(os.path.join(knowledge_dir, "dummy_data.csv"), "w") as f:
+        f.write("header1,header2\ndata1,data2")
+    crew_copy = mock_create_crew.return_value.copy.return_value
+    crew_copy.tasks = [MagicMock(output=MagicMock(raw="Analysis so far."), token_report=None),
+                       MagicMock(output=None, token_report=None)]
+    crew_copy.tasks[0].name, crew_copy.tasks[1].name = "Analyze Data", "Write Report"
+
+    def kickoff(inputs):
+        # The writer keeps calling its LLM until its max_llm_calls in agents.yml refuses one.
+        writer = MagicMock(role="Technical Report Writer")
+        while budgets._before_llm_call(MagicMock(agent=writer)) is None:
+            pass
+        raise ValueError("LLM call blocked by before_llm_call hook")
+    crew_copy.kickoff.side_effect = kickoff
+
+    response = analyze_and_wait(client, "Explain the ping-pong.")
+
+    assert response.status_code == 200
+    job = response.json()
+    assert job["status"] == "succeeded"
+    assert job["result"].startswith("> **Partial result:**")
+    assert job["result"].endswith("Analysis so far.")
+    assert job["partial"]["pending_tasks"] == ["Write Report"]
+    assert job["partial"]["llm_calls"] == {"Technical Report Writer": 4}
+    # Partial answers are not cached, so asking again runs the crew again.
+    analyze_and_wait(client, "Explain the ping-pong.")
+    assert crew_copy.kickoff.call_count == 2
+
+def test_hash_first_upload_sends_only_missing_files(client: TestClient, setup_teardown_knowledge_dir):
+    import hashlib
+
+    content = b"Supplier,Quantity\nAlpha_Inc,10\nBeta_Supplies,20\n"
+    digest = hashlib.sha256(content).hexdigest()
+    manifest = {"files": [{"name": "orders.csv", "sha256": digest}]}
+
+    assert client.post("/upload_files/check", json=manifest).json()["missing"] == ["orders.csv"]
+    chunks = (content[i:i + 10] for i in range(0, len(content), 10))
+    uploaded = client.put("/upload_files/orders.csv", params={"sha256": digest}, content=chunks)
+    assert uploaded.status_code == 200
+    assert uploaded.json()["profile"] == {"rows": 2, "columns": ["Supplier", "Quantity"]}
+
+    knowledge_dir = os.path.join(os.path.dirname(__file__), "..", "knowledge")
+    mtime = os.stat(os.path.join(knowledge_dir, "orders.csv")).st_mtime_ns
+    manifest["files"].append({"name": "orders_copy.csv", "sha256": digest})
+    check = client.post("/upload_files/check", json=manifest).json()
+    assert (check["present"], check["copied"], check["missing"]) == (["orders.csv"], ["orders_copy.csv"], [])
+    assert os.stat(os.path.join(knowledge_dir, "orders.csv")).st_mtime_ns == mtime
+    assert check["profiles"]["orders_copy.csv"]["rows"] == 2
+
+    corrupted = client.put("/upload_files/other.csv", params={"sha256": digest}, content=b"tampered")
+    assert corrupted.status_code == 400
+    assert not os.path.exists(os.path.join(knowledge_dir, "other.csv"))
+    assert client.put("/upload_files/.hidden", content=b"x").status_code == 400
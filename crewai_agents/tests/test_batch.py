@@ -0,0 +1,55 @@
+import threading
+import time
+
+import pytest
+
+from batch import group_questions, run_batch
+from jobs import JobCancelled
+
+
+def test_group_questions_ignores_case_and_spacing():
+    groups = group_questions(["Top suppliers?", "Defects by region", "  top SUPPLIERS? "])
+
+    assert list(groups.values()) == [[0, 2], [1]]
+
+
+def test_run_batch_answers_each_distinct_question_once_and_concurrently():
+    asked, running, peak = [], [0], [0]
+    lock = threading.Lock()
+
+    def answer(question):
+        with lock:
+            asked.append(question)
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+        if question == "fail":
+            raise ValueError("bad question")
+        return {"result": question.upper(), "route": "crew"}
+
+    reported = []
+    outcomes = run_batch(["a", "b", "A", "fail"], answer, concurrency=3, on_result=reported.append)
+
+    assert sorted(asked) == ["a", "b", "fail"]
+    assert peak[0] == 3
+    assert [o["result"] for o in outcomes[:3]] == ["A", "B", "A"]
+    assert outcomes[2]["duplicate_of"] == 0 and outcomes[0]["duplicate_of"] is None
+    assert outcomes[3]["status"] == "failed" and isinstance(outcomes[3]["error"], ValueError)
+    assert sorted(o["index"] for o in reported) == [0, 1, 2, 3]
+
+
+def test_run_batch_stops_when_cancelled():
+    cancelled = threading.Event()
+
+    def check_cancelled():
+        if cancelled.is_set():
+            raise JobCancelled("batch")
+
+    def answer(question):
+        cancelled.set()
+        return {"result": question}
+
+    with pytest.raises(JobCancelled):
+        run_batch([str(i) for i in range(20)], answer, concurrency=1, check_cancelled=check_cancelled)
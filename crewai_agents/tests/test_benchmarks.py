@@ -0,0 +1,78 @@
+import json
+import httpx
+import pandas as pd
+import pytest
+
+from benchmarks.fake_ollama import start_fake_ollama
+from benchmarks.run import compare_to_baseline, synthetic_procurement_csv
+from benchmarks import kpis, startup
+
+
+@pytest.fixture
+def fake_ollama():
+    server = start_fake_ollama(tokens_per_second=0, latency=0, load_seconds=0.01, response_tokens=12)
+    yield f"http://127.0.0.1:{server.server_address[1]}", server.fake
+    server.shutdown()
+
+
+def test_fake_ollama_chat_and_embeddings(fake_ollama):
+    url, fake = fake_ollama
+    chat = httpx.post(f"{url}/v1/chat/completions",
+                      json={"model": "gemma3", "messages": [{"role": "user", "content": "hi"}]}).json()
+    assert "Final Answer:" in chat["choices"][0]["message"]["content"]
+
+    with httpx.stream("POST", f"{url}/v1/chat/completions",
+                      json={"model": "gemma3", "stream": True, "messages": []}) as response:
+        body = "".join(response.iter_text())
+    assert body.rstrip().endswith("data: [DONE]")
+
+    embeddings = httpx.post(f"{url}/v1/embeddings", json={"input": ["a", "b", "a"]}).json()["data"]
+    assert embeddings[0]["embedding"] == embeddings[2]["embedding"] != embeddings[1]["embedding"]
+    assert fake.stats()["generated_tokens"] == 24
+
+
+def test_fake_ollama_warm_up_reports_load_once(fake_ollama):
+    url, _ = fake_ollama
+    first = httpx.post(f"{url}/api/generate", json={"model": "gemma3", "prompt": ""}).json()
+    second = httpx.post(f"{url}/api/generate", json={"model": "gemma3", "prompt": ""}).json()
+
+    assert first["load_duration"] > 0
+    assert second["load_duration"] == 0
+
+
+def test_synthetic_procurement_csv(tmp_path):
+    df = pd.read_csv(synthetic_procurement_csv(str(tmp_path / "data.csv"), 1000))
+
+    assert len(df) == 1000
+    assert list(df.columns)[:3] == ["PO_ID", "Supplier", "Order_Date"]
+    assert df["PO_ID"].is_unique
+
+
+def test_compare_to_baseline_flags_regressions():
+    baseline = {"datasets": [{"rows": 778, "peak_rss_mb": 300, "levels": [
+        {"concurrency": 1, "failed": 0, "p95_seconds": 2.0, "throughput_rps": 1.0}]}]}
+    report = {"datasets": [{"rows": 778, "peak_rss_mb": 310, "levels": [
+        {"concurrency": 1, "failed": 0, "p95_seconds": 3.0, "throughput_rps": 0.95}]}]}
+
+    regressions = compare_to_baseline(report, baseline, tolerance=0.25)
+
+    assert regressions == ["778 rows @ concurrency 1: p95 3.0s > 2.0s"]
+
+
+def test_startup_compare_to_baseline():
+    baseline = {"summary": {"import_seconds": {"p50": 1.0}, "first_health_seconds": {"p50": 2.0},
+                            "ready_seconds": {"p50": 6.0}, "crewai_imported": False}}
+    report = {"summary": startup.summarize([
+        {"import_seconds": 1.1, "first_health_seconds": 3.0, "ready_seconds": 6.5, "crewai_imported": True}])}
+
+    regressions = startup.compare_to_baseline(report, baseline, tolerance=0.25)
+
+    assert regressions == ["first_health_seconds: p50 3.0s > 2.0s", "import app loads crewai again"]
+
+
+def test_kpi_benchmark_agrees_with_groupby_apply(tmp_path):
+    output = tmp_path / "kpis.json"
+    assert kpis.main(["--rows", "2000", "--repeat", "1", "--output", str(output)]) == 0
+    results = json.loads(output.read_text())["results"]
+    assert {result["kpi"] for result in results} == {"defect_rate", "price_savings", "lead_time",
+                                                     "compliance_rate", "scorecard"}
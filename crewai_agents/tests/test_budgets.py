@@ -0,0 +1,72 @@
+from types import SimpleNamespace
+
+import pytest
+
+import budgets
+from budgets import AgentLimits, RequestBudget, load_agent_limits, partial_report, use_budget
+
+
+def hook_context(role, tool_name=None):
+    return SimpleNamespace(agent=SimpleNamespace(role=role), tool_name=tool_name)
+
+
+def test_agent_limits_come_from_agents_yml_with_defaults(tmp_path):
+    agents_file = tmp_path / "agents.yml"
+    agents_file.write_text("- name: Analyst\n  role: Analyst\n  max_delegations: 1\n"
+                           "- name: Writer\n  role: Writer\n  max_llm_calls: 3\n")
+
+    limits = load_agent_limits(str(agents_file), AgentLimits(max_llm_calls=20, max_delegations=2))
+
+    assert limits["Analyst"].to_dict() == {"max_llm_calls": 20, "max_delegations": 1}
+    assert limits["Writer"].to_dict() == {"max_llm_calls": 3, "max_delegations": 2}
+
+
+def test_llm_calls_are_refused_once_an_agent_reaches_its_limit():
+    budget = RequestBudget(limits={"Writer": AgentLimits(max_llm_calls=2)})
+
+    assert [budget.allow_llm_call("Writer") for _ in range(3)] == [True, True, False]
+    # Once exhausted, the whole request stops, other agents included.
+    assert not budget.allow_llm_call("Analyst")
+    assert (budget.exhausted, budget.exhausted_by) == (budgets.LLM_CALLS, "Writer")
+    assert budget.usage()["llm_calls"] == {"Writer": 2}
+
+
+def test_llm_calls_are_refused_after_the_deadline(monkeypatch):
+    budget = RequestBudget(deadline_seconds=30)
+    assert budget.allow_llm_call("Analyst")
+
+    monkeypatch.setattr(budgets.time, "monotonic", lambda: budget.started + 31)
+    assert not budget.allow_llm_call("Analyst")
+    assert budget.exhausted == budgets.DEADLINE
+
+
+def test_hooks_apply_the_budget_of_the_current_request_only():
+    budget = RequestBudget(limits={"Analyst": AgentLimits(max_llm_calls=0, max_delegations=1)})
+    delegate = hook_context("Analyst", "Delegate work to coworker")
+
+    assert budgets._before_llm_call(hook_context("Analyst")) is None
+    with use_budget(budget):
+        assert budgets._before_tool_call(hook_context("Analyst", "Dataset Query")) is None
+        assert budgets._before_tool_call(delegate) is None
+        # A blocked delegation leaves the agent to answer with what it has; the request goes on.
+        assert budgets._before_tool_call(delegate) is False
+        assert budget.exhausted is None
+        assert budgets._before_llm_call(hook_context("Analyst")) is False
+    assert budget.usage()["delegations"] == {"Analyst": 1}
+    assert budget.delegations_blocked == 1
+
+
+def test_partial_report_is_marked_and_keeps_the_last_finished_output():
+    budget = RequestBudget(deadline_seconds=60)
+    budget._exhaust(budgets.DEADLINE, "Senior Data Analyst")
+    tasks = [SimpleNamespace(name="Retrieve Data", description="", output=SimpleNamespace(raw="Rows 1-10.")),
+             SimpleNamespace(name="Analyze Data", description="", output=SimpleNamespace(raw="Totals by supplier.")),
+             SimpleNamespace(name="Write Report", description="", output=None)]
+
+    report, partial = partial_report(budget, tasks)
+
+    assert report.startswith("> **Partial result:** the analysis stopped early because the deadline of 60s passed.")
+    assert report.endswith("\n\nTotals by supplier.")
+    assert partial["completed_tasks"] == ["Retrieve Data", "Analyze Data"]
+    assert partial["pending_tasks"] == ["Write Report"]
+    assert partial["reason"] == "deadline"
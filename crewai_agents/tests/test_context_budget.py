@@ -0,0 +1,72 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from crewai import LLM, Agent, Task
+
+from context_budget import (BudgetedTask, compact_context, count_tokens, dedupe_lines, summarize_tables,
+                            truncate_by_relevance)
+
+ROWS = "\n".join(f"PO-{i},Alpha_Inc,{i * 10},{i * 1.5}" for i in range(40))
+
+
+def test_count_tokens_grows_with_text():
+    assert count_tokens("") == 0
+    assert count_tokens("Alpha_Inc, 12.5") < count_tokens("Alpha_Inc, 12.5 " * 10)
+
+
+def test_dedupe_lines_keeps_first_occurrence():
+    text = "| a | b |\n|---|---|\n| 1 | 2 |\n| 1 | 2 |\n\n| a | b |\n|---|---|"
+
+    assert dedupe_lines(text) == "| a | b |\n|---|---|\n| 1 | 2 |\n\n|---|---|"
+
+
+def test_summarize_tables_collapses_long_tables():
+    summary = summarize_tables("Rows:\nPO_ID,Supplier,Quantity,Price\n" + ROWS)
+
+    assert "PO-2,Alpha_Inc" in summary and "PO-3,Alpha_Inc" not in summary
+    assert "37 more rows omitted" in summary
+    assert "Quantity: min=0, mean=195, max=390" in summary
+
+
+def test_truncate_by_relevance_keeps_matching_paragraphs():
+    text = "Defects by supplier: Beta has most defects.\n\n" + "Unrelated filler text. " * 50
+
+    truncated = truncate_by_relevance(text, 40, "Which supplier has the most defects?")
+
+    assert truncated.startswith("Defects by supplier")
+    assert "1 less relevant sections omitted" in truncated
+
+
+def test_compact_context_fits_budget():
+    text = "Supplier data:\nPO_ID,Supplier,Quantity,Price\n" + ROWS + "\n" + ROWS + "\n\n" + "filler " * 300
+
+    assert compact_context("short context", 100) == "short context"
+    assert count_tokens(compact_context(text, 150, "supplier quantity")) <= 150
+
+
+def test_budgeted_task_reports_tokens_and_survives_copy():
+    task = BudgetedTask(description="Analyze supplier quantity", expected_output="A report",
+                        context_token_budget=50)
+
+    context = task._budget_context("Supplier quantity is high.\n\n" + "filler " * 200, agent=None)
+
+    assert count_tokens(context) <= 50
+    assert task.token_report["context_tokens"] > 50
+    assert task.token_report["compacted_context_tokens"] == count_tokens(context)
+    assert task.copy(agents=[], task_mapping={}).context_token_budget == 50
+
+
+def test_budgeted_task_llm_runs_on_a_copy_of_the_agent():
+    own = LLM(model="ollama/agent-model")
+    agent = Agent(role="Writer", goal="Write reports", backstory="b", llm=own)
+    small = LLM(model="ollama/small-model")
+    task = BudgetedTask(description="Write the report", expected_output="A report", llm=small)
+
+    with patch.object(Task, "_execute_core", side_effect=lambda agent, context, tools: agent) as execute_core:
+        runner = task._execute_core(agent, None, [])
+    # Other tasks of the agent, possibly running at the same time, keep its own LLM.
+    assert runner is not agent and runner.llm is small and runner.role == "Writer"
+    assert agent.llm is own
+    execute_core.assert_called_once()
+    assert BudgetedTask(description="d", expected_output="o")._task_agent(agent) is agent
+    assert task.copy(agents=[], task_mapping={}).llm is small
@@ -0,0 +1,73 @@
+import os
+import threading
+from unittest.mock import MagicMock
+
+from crew_registry import CrewRegistry
+
+
+def make_registry(tmp_path, build_crew):
+    agents_file = tmp_path / "agents.yml"
+    agents_file.write_text("- name: a\n")
+    return CrewRegistry(build_crew, lambda knowledge_file: [str(agents_file), str(tmp_path / knowledge_file)]), agents_file
+
+
+def test_template_is_built_once_and_copied(tmp_path):
+    build_crew = MagicMock()
+    registry, _ = make_registry(tmp_path, build_crew)
+
+    first = registry.get_crew("data.csv")
+    second = registry.get_crew("data.csv")
+
+    build_crew.assert_called_once_with("data.csv")
+    assert first is build_crew.return_value.copy.return_value
+    assert second is first
+    assert build_crew.return_value.copy.call_count == 2
+
+
+def test_template_rebuilt_when_source_file_changes(tmp_path):
+    build_crew = MagicMock()
+    registry, agents_file = make_registry(tmp_path, build_crew)
+
+    registry.get_crew("data.csv")
+    agents_file.write_text("- name: a\n- name: b\n")
+    stat = os.stat(agents_file)
+    os.utime(agents_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    registry.get_crew("data.csv")
+
+    assert build_crew.call_count == 2
+    assert registry.builds == 2
+
+
+def test_concurrent_misses_build_once(tmp_path):
+    started = threading.Event()
+
+    def slow_build(knowledge_file):
+        started.wait(1)
+        return MagicMock()
+
+    build_crew = MagicMock(side_effect=slow_build)
+    registry, _ = make_registry(tmp_path, build_crew)
+    threads = [threading.Thread(target=registry.get_crew, args=("data.csv",)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    started.set()
+    for thread in threads:
+        thread.join()
+
+    assert build_crew.call_count == 1
+
+
+def test_templates_are_measured_and_evicted(tmp_path):
+    build_crew = MagicMock()
+    agents_file = tmp_path / "agents.yml"
+    agents_file.write_text("- name: a\n")
+    registry = CrewRegistry(build_crew, lambda knowledge_file: [str(agents_file)], measure=lambda crew: 100)
+    registry.get_crew(("sessions/a/data.csv",))
+    registry.get_crew(("sessions/b/data.csv",))
+
+    in_session_a = lambda key: key[0].startswith("sessions/a/")
+    assert registry.memory_bytes(in_session_a) == 100
+    assert registry.evict(in_session_a) == 1
+    assert registry.memory_bytes(lambda key: True) == 100
+    registry.get_crew(("sessions/a/data.csv",))
+    assert build_crew.call_count == 3
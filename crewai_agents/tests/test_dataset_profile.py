@@ -0,0 +1,73 @@
+import pandas as pd
+import pytest
+
+from dataset_profile import DatasetProfile, DatasetProfileStore, load_dataset
+from dataset_tools import DatasetQueryTool
+
+CSV = """PO_ID,Supplier,Order_Date,Item_Category,Order_Status,Quantity,Negotiated_Price
+PO-1,Alpha_Inc,2023-01-01,MRO,Delivered,10,5.0
+PO-2,Alpha_Inc,2023-01-02,Electronics,Delivered,20,15.0
+PO-3,Beta_Supplies,2023-01-03,MRO,Pending,30,7.0
+PO-4,Beta_Supplies,2023-01-04,Electronics,Delivered,40,25.0
+"""
+
+
+@pytest.fixture
+def csv_file(tmp_path):
+    path = tmp_path / "procurement.csv"
+    path.write_text(CSV)
+    return path
+
+
+def test_load_dataset_types_columns(csv_file):
+    df = load_dataset(csv_file)
+
+    assert isinstance(df["Supplier"].dtype, pd.CategoricalDtype)
+    assert pd.api.types.is_datetime64_any_dtype(df["Order_Date"])
+    assert pd.api.types.is_numeric_dtype(df["Quantity"])
+
+
+def test_aggregate_with_filters_and_groups(csv_file):
+    profile = DatasetProfile.from_path(csv_file)
+
+    delivered = profile.aggregate("Negotiated_Price", "mean", "Item_Category", {"Order_Status": "Delivered"})
+    assert delivered.index[0] == "Electronics"
+    assert delivered.iloc[0, 0] == 20.0
+    assert profile.aggregate("Quantity", "sum").iloc[0, 0] == 100
+    # Unfiltered grouped means come from the precomputed summaries.
+    assert profile.aggregate("Quantity", "mean", "Supplier", top_k=1).iloc[0, 0] == 35.0
+
+
+def test_aggregate_rejects_unknown_column(csv_file):
+    profile = DatasetProfile.from_path(csv_file)
+    with pytest.raises(ValueError, match="Unknown column"):
+        profile.aggregate("Price", "mean")
+
+
+def test_aggregate_rejects_arithmetic_on_text_columns(csv_file):
+    profile = DatasetProfile.from_path(csv_file)
+    for agg in ("sum", "mean", "median"):
+        with pytest.raises(ValueError, match="Numeric columns: Quantity, Negotiated_Price"):
+            profile.aggregate("Supplier", agg, "Item_Category")
+    assert profile.aggregate("Supplier", "count", "Item_Category").iloc[0, 0] == 2
+
+    tool = DatasetQueryTool(profiles={"procurement.csv": profile})
+    assert tool.run(metric="Order_Status", agg="sum").startswith("Error: Cannot compute the sum")
+
+
+def test_tool_returns_compact_text(csv_file):
+    tool = DatasetQueryTool(profiles={"procurement.csv": DatasetProfile.from_path(csv_file, name="procurement.csv")})
+
+    assert "4 rows" in tool.run(operation="describe")
+    assert "Electronics" in tool.run(metric="Negotiated_Price", agg="max", group_by="Item_Category")
+    assert tool.run(metric="Quantity", agg="variance").startswith("Error:")
+    assert "Unknown dataset" in tool.run(dataset="other.csv", metric="Quantity")
+
+
+def test_store_reuses_profile_until_file_changes(csv_file):
+    store = DatasetProfileStore()
+    first = store.get(csv_file)
+
+    assert store.get(csv_file) is first
+    csv_file.write_text(CSV + "PO-5,Gamma_Co,2023-01-05,MRO,Delivered,50,9.0\n")
+    assert len(store.get(csv_file).df) == 5
@@ -0,0 +1,90 @@
+import pytest
+
+from dataset_profile import DatasetProfile
+from fast_path import FastPathStats, classify, try_fast_path
+
+CSV = """PO_ID,Supplier,Item_Category,Order_Status,Compliance,Quantity,Negotiated_Price
+PO-1,Alpha_Inc,MRO,Delivered,Yes,10,5.0
+PO-2,Alpha_Inc,Electronics,Partially Delivered,No,20,15.0
+PO-3,Beta_Supplies,MRO,Pending,Yes,30,7.0
+PO-4,Beta_Supplies,Electronics,Delivered,No,40,25.0
+PO-5,Gamma_Co,MRO,Delivered,Yes,5,9.0
+"""
+
+
+@pytest.fixture
+def profile(tmp_path):
+    path = tmp_path / "procurement.csv"
+    path.write_text(CSV)
+    return DatasetProfile.from_path(path, name="procurement.csv")
+
+
+def test_classify_group_top_k(profile):
+    plan = classify("Which supplier has the highest and lowest quantity?", profile)
+
+    assert plan.to_dict() == {"metric": "Quantity", "agg": "sum", "group_by": "Supplier", "filters": {},
+                              "top_k": 5, "directions": ["desc", "asc"]}
+
+
+def test_classify_averages_prices_and_reads_filters(profile):
+    plan = classify("Top 2 item categories by average negotiated price for partially delivered orders", profile)
+
+    assert (plan.metric, plan.agg, plan.group_by, plan.top_k) == ("Negotiated_Price", "mean", "Item_Category", 2)
+    # The longer category value wins over the one it contains.
+    assert plan.filters == {"Order_Status": "Partially Delivered"}
+
+
+def test_classify_counts_rows_per_group(profile):
+    plan = classify("How many orders per supplier?", profile)
+
+    assert (plan.metric, plan.agg, plan.group_by) == ("Supplier", "count", "Supplier")
+
+
+@pytest.mark.parametrize("query", [
+    "Why do some suppliers deliver late?",
+    "Summarize the procurement data.",
+    "Identify the products with the highest and lowest sales",
+    "What is the monthly trend of quantity by supplier?",
+    # Negations and exclusions would be answered as if the filter were asked for, or not at all.
+    "What is the total quantity excluding Delivered orders?",
+    "Total quantity not counting cancelled orders",
+    "Which supplier is not compliant the most?",
+    "Which supplier has the most quantity besides Alpha_Inc?",
+    # Words with no column, value or aggregation behind them must not be skipped.
+    "How many orders per supplier with compliance yes?",
+    "Which supplier has the most quantity in Europe?",
+])
+def test_classify_leaves_open_questions_to_the_crew(profile, query):
+    assert classify(query, profile) is None
+
+
+def test_try_fast_path_computes_answer(profile):
+    result, plan, file_name = try_fast_path("Which supplier has the most quantity?", {"procurement.csv": profile})
+
+    assert file_name == "procurement.csv"
+    assert "Highest: Beta_Supplies" in result
+    assert "| Beta_Supplies | 70 |" in result
+
+
+def test_try_fast_path_phrases_once_and_falls_back(profile):
+    calls = []
+
+    def phrase(question, computed):
+        calls.append(question)
+        raise RuntimeError("LLM unavailable")
+
+    result, _, _ = try_fast_path("What is the total quantity?", {"procurement.csv": profile}, phrase)
+
+    assert calls == ["What is the total quantity?"]
+    assert "Total Quantity: 105" in result
+
+
+def test_stats_estimate_saving():
+    stats = FastPathStats()
+    stats.record_fast_path(0.5)
+    stats.record_fast_path(0.5)
+    stats.record_crew_route()
+    stats.record_crew_run(10.5)
+
+    assert stats.stats() == {"fast_path": 2, "crew": 1, "crew_runs": 1, "fast_path_avg_seconds": 0.5,
+                             "crew_avg_seconds": 10.5, "estimated_seconds_saved": 20.0}
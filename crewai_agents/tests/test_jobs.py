@@ -0,0 +1,96 @@
+import threading
+import time
+
+import pytest
+
+from jobs import JobManager, QueueFullError, CANCELLED, FAILED, SUCCEEDED, TIMED_OUT
+
+
+def wait_for(job, timeout=5):
+    deadline = time.time() + timeout
+    while job.status in ("queued", "running") and time.time() < deadline:
+        time.sleep(0.01)
+    return job
+
+
+def test_job_runs_and_stores_result():
+    manager = JobManager(max_workers=1, max_queued=1)
+    job = manager.submit(lambda job, x: x * 2, 21)
+
+    assert wait_for(job).status == SUCCEEDED
+    assert job.to_dict() == {"job_id": job.id, "status": SUCCEEDED, "result": 42}
+    manager.shutdown()
+
+
+def test_failed_job_keeps_error():
+    manager = JobManager()
+
+    def boom(job):
+        raise ValueError("bad query")
+
+    job = wait_for(manager.submit(boom))
+    assert job.status == FAILED
+    assert isinstance(job.error, ValueError)
+    job.route = "crew"
+    assert job.to_dict()["error"] == "bad query"
+    manager.shutdown()
+
+
+def test_queue_full_raises():
+    release = threading.Event()
+    manager = JobManager(max_workers=1, max_queued=1)
+    manager.submit(lambda job: release.wait(5))
+    manager.submit(lambda job: None)
+
+    with pytest.raises(QueueFullError):
+        manager.submit(lambda job: None)
+    release.set()
+    manager.shutdown()
+
+
+def test_cancel_queued_job():
+    release = threading.Event()
+    manager = JobManager(max_workers=1, max_queued=2)
+    manager.submit(lambda job: release.wait(5))
+    queued = manager.submit(lambda job: "never")
+
+    manager.cancel(queued.id)
+    release.set()
+
+    assert queued.status == CANCELLED
+    assert queued.result is None
+    manager.shutdown()
+
+
+def test_running_job_times_out_at_next_check():
+    manager = JobManager(timeout=0.1)
+
+    def slow(job):
+        while True:
+            job.check_cancelled()
+            time.sleep(0.01)
+
+    job = wait_for(manager.submit(slow))
+    assert job.status == TIMED_OUT
+    manager.shutdown()
+
+
+def test_cancelled_job_holds_its_slot_until_its_worker_is_free():
+    release = threading.Event()
+    manager = JobManager(max_workers=1, max_queued=0)
+    # Never checks for cancellation, like a crew between two steps.
+    running = manager.submit(lambda job: release.wait(5))
+    while running.status != "running":
+        time.sleep(0.01)
+
+    manager.cancel(running.id)
+    assert running.status == CANCELLED
+    with pytest.raises(QueueFullError):
+        manager.submit(lambda job: None)
+
+    release.set()
+    deadline = time.time() + 5
+    while manager.stats()["occupied"] and time.time() < deadline:
+        time.sleep(0.01)
+    assert wait_for(manager.submit(lambda job: "next")).result == "next"
+    manager.shutdown()
@@ -0,0 +1,152 @@
+import numpy as np
+import pytest
+
+from knowledge_index import (KnowledgeIndexCache, KnowledgeIndexStorage, CachedCSVKnowledgeSource, ChunkStore,
+                             RetrievalMemo, chunk_rows, stream_csv_chunks, use_retrieval_memo)
+
+
+def fake_embedder(documents):
+    return [np.array([len(doc), doc.count(","), 1.0]) for doc in documents]
+
+
+@pytest.fixture
+def csv_file(tmp_path):
+    path = tmp_path / "data.csv"
+    path.write_text("Supplier,Quantity\nAlpha_Inc,10\nBeta_Supplies,20\n")
+    return path
+
+
+def test_cache_miss_then_hit(tmp_path, csv_file):
+    cache = KnowledgeIndexCache(str(tmp_path / "index"), max_bytes=10 * 1024 * 1024)
+    key = cache.make_key([csv_file], 4000, 200, {"provider": "fake"})
+
+    assert cache.get(key) is None
+    cache.put(key, ["chunk"], [[1.0, 0.0]])
+    chunks, embeddings = cache.get(key)
+
+    assert list(chunks) == ["chunk"]
+    assert embeddings.shape == (1, 2)
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_key_depends_on_content_and_settings(tmp_path, csv_file):
+    cache = KnowledgeIndexCache(str(tmp_path / "index"), max_bytes=1024)
+    key = cache.make_key([csv_file], 4000, 200, {"provider": "fake"})
+
+    assert key != cache.make_key([csv_file], 2000, 200, {"provider": "fake"})
+    assert key != cache.make_key([csv_file], 4000, 200, {"provider": "other"})
+    csv_file.write_text("Supplier,Quantity\nAlpha_Inc,11\n")
+    assert key != cache.make_key([csv_file], 4000, 200, {"provider": "fake"})
+
+
+def test_eviction_keeps_store_under_budget(tmp_path):
+    cache = KnowledgeIndexCache(str(tmp_path / "index"), max_bytes=6000)
+    for i in range(5):
+        cache.put(f"key{i}", ["x" * 100], np.zeros((1, 256)))
+
+    stats = cache.stats()
+    assert stats["bytes"] <= 6000
+    assert stats["evictions"] > 0
+    assert cache.get("key4") is not None
+
+
+def test_source_reuses_cached_index(tmp_path, csv_file):
+    cache = KnowledgeIndexCache(str(tmp_path / "index"), max_bytes=10 * 1024 * 1024)
+    calls = []
+
+    def counting_embedder(documents):
+        calls.append(len(documents))
+        return fake_embedder(documents)
+
+    for _ in range(2):
+        source = CachedCSVKnowledgeSource(file_paths=[csv_file], index_cache=cache, embedder_spec={"provider": "fake"})
+        source.storage = KnowledgeIndexStorage(embedder=counting_embedder)
+        source.add()
+
+    assert calls == [1]
+    assert cache.stats()["hits"] == 1
+    assert source.storage.search(["Alpha_Inc"], score_threshold=0)[0]["content"].count("Alpha_Inc") == 1
+
+
+def test_chunk_rows_keeps_edits_local():
+    lines = [f"PO-{i} Supplier_{i % 7} {i * 13 % 997}\n" for i in range(3000)]
+    chunks = chunk_rows(lines, 2000)
+    edited = lines[:1500] + ["PO-1500 Edited_Supplier 1\n"] + lines[1501:]
+
+    assert "".join(chunks) == "".join(lines)
+    assert all(len(chunk) <= 2000 for chunk in chunks)
+    assert len(set(chunk_rows(edited, 2000)) - set(chunks)) <= 3
+
+
+def test_changed_file_only_embeds_new_chunks(tmp_path):
+    cache = KnowledgeIndexCache(str(tmp_path / "index"), max_bytes=100 * 1024 * 1024)
+    path = tmp_path / "orders.csv"
+    rows = [f"PO-{i},Supplier_{i % 7},{i * 13 % 997}\n" for i in range(5000)]
+    embedded = []
+
+    def build():
+        calls = []
+        source = CachedCSVKnowledgeSource(file_paths=[path], index_cache=cache, chunk_size=1000,
+                                          embedder_spec={"provider": "fake"})
+        source.storage = KnowledgeIndexStorage(embedder=lambda documents: calls.append(len(documents))
+                                               or fake_embedder(documents))
+        source.add()
+        embedded.append(sum(calls))
+        return source
+
+    path.write_text("PO_ID,Supplier,Quantity\n" + "".join(rows))
+    full = build()
+    path.write_text("PO_ID,Supplier,Quantity\n" + "".join(rows + [f"PO-{i},Supplier_1,5\n" for i in range(5000, 5050)]))
+    appended = build()
+
+    assert embedded[1] <= embedded[0] * 0.02 + 2
+    assert len(appended.chunks) > len(full.chunks)
+    assert cache.stats()["reused_chunks"] >= len(full.chunks) - 2
+    chunks, embeddings = cache.get(cache.make_key([path], 1000, 200, {"provider": "fake"}))
+    assert embeddings.shape[0] == len(chunks) == len(appended.chunks)
+
+    path.write_text("PO_ID,Supplier,Quantity\n" + "".join(rows[:2000] + rows[2001:]))
+    build()
+    assert embedded[2] <= 3
+
+
+def test_stream_csv_chunks_repeat_header_and_keep_every_row(tmp_path):
+    path = tmp_path / "orders.csv"
+    path.write_text('PO_ID,Note\n' + "".join(f'PO-{i},"line one\nline two {i}"\n' for i in range(400)))
+
+    chunks = list(stream_csv_chunks(path, 500, batch_rows=7))
+
+    assert len(chunks) > 1
+    assert all(chunk.startswith("PO_ID Note\n") and len(chunk) <= 500 for chunk in chunks)
+    rows = "".join(chunk[len("PO_ID Note\n"):] for chunk in chunks)
+    assert rows == "".join(f"PO-{i} line one\nline two {i}\n" for i in range(400))
+
+
+def test_loaded_index_stays_on_disk_and_survives_eviction(tmp_path, csv_file):
+    cache = KnowledgeIndexCache(str(tmp_path / "index"), max_bytes=1)
+    source = CachedCSVKnowledgeSource(file_paths=[csv_file], index_cache=cache, embedder_spec={"provider": "fake"})
+    source.storage = KnowledgeIndexStorage(embedder=fake_embedder)
+    source.add()
+    cache.put("other", ["x" * 100], np.zeros((1, 3)))
+
+    assert isinstance(source.chunks, ChunkStore)
+    assert source.storage.nbytes() < 100
+    assert cache.stats()["entries"] == 1
+    assert "Alpha_Inc" in source.storage.search(["Alpha_Inc"], score_threshold=0)[0]["content"]
+
+
+def test_retrieval_memo_runs_searches_with_the_same_words_once():
+    embedded = []
+    storage = KnowledgeIndexStorage(embedder=lambda docs: embedded.extend(docs) or fake_embedder(docs))
+    storage.load(["Alpha_Inc,10", "Beta_Co,200"], fake_embedder(["Alpha_Inc,10", "Beta_Co,200"]))
+
+    with use_retrieval_memo(RetrievalMemo()) as memo:
+        first = storage.search(["Supplier defects"], score_threshold=0)
+        second = storage.search(["defects  SUPPLIER"], score_threshold=0)
+        storage.search(["Supplier prices"], score_threshold=0)
+    storage.search(["Supplier defects"], score_threshold=0)
+
+    assert first == second
+    assert memo.stats() == {"searches": 2, "reused_searches": 1}
+    assert embedded == ["Supplier defects", "Supplier prices", "Supplier defects"]
@@ -0,0 +1,110 @@
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+from llm_backends import Backend, BackendRouter, RoutingTransport, limit_llm_calls
+
+BASE_URL = "http://ollama.test:11434"
+
+
+def routed_client(router, handler):
+    return httpx.Client(transport=RoutingTransport(router, BASE_URL, httpx.MockTransport(handler)))
+
+
+def chat(client, model="gemma3"):
+    return client.post(BASE_URL + "/v1/chat/completions", json={"model": model, "messages": []})
+
+
+def test_calls_go_to_the_backend_with_the_shortest_expected_wait():
+    slow, fast = Backend("http://slow:11434"), Backend("http://fast:11434")
+    slow.latency, fast.latency = 2.0, 0.5
+    router = BackendRouter([slow, fast])
+
+    chosen = [router.acquire("gemma3").url for _ in range(4)]
+
+    # Three queued calls on the fast server wait as long as one on the slow server.
+    assert chosen == ["http://fast:11434"] * 3 + ["http://slow:11434"]
+    router.release(fast, seconds=1.0)
+    assert (fast.in_flight, fast.calls, round(fast.latency, 2)) == (2, 1, 0.65)
+
+
+def test_models_route_to_the_servers_that_serve_them():
+    hosts = []
+
+    def handler(request):
+        hosts.append(request.url.host)
+        return httpx.Response(200, json={})
+
+    router = BackendRouter([Backend("http://big:11434", models=["ollama/gemma3"]),
+                            Backend("http://small:11434", models=["gemma3:1b"])])
+    client = routed_client(router, handler)
+
+    chat(client, "gemma3:1b")
+    chat(client, "gemma3")
+    client.get("http://elsewhere:8000/")
+
+    assert hosts == ["small", "big", "elsewhere"]
+    assert all(backend.in_flight == 0 for backend in router.backends)
+
+
+def test_failed_backend_is_routed_around_until_healthy_again():
+    down = {"dead"}
+    served = []
+
+    def handler(request):
+        if request.url.host in down:
+            raise httpx.ConnectError("connection refused", request=request)
+        served.append((request.url.host, request.url.path))
+        return httpx.Response(200, json={})
+
+    dead, alive = Backend("http://dead:11434"), Backend("http://alive:11434")
+    router = BackendRouter([dead, alive])
+    client = routed_client(router, handler)
+
+    assert chat(client).status_code == 200
+    assert chat(client).status_code == 200
+    assert served == [("alive", "/v1/chat/completions")] * 2
+    assert (dead.healthy, dead.failures) == (False, 1)
+
+    down.clear()
+    router.check_health(client)
+    assert dead.healthy
+    dead.latency = alive.latency
+    chat(client)
+    assert served[-1] == ("dead", "/v1/chat/completions")
+
+
+def test_overloaded_backend_fails_over_and_last_response_is_returned():
+    def handler(request):
+        return httpx.Response(503 if request.url.host == "busy" else 200, json={})
+
+    router = BackendRouter([Backend("http://busy:11434"), Backend("http://idle:11434")])
+
+    assert chat(routed_client(router, handler)).status_code == 200
+    assert [b["healthy"] for b in router.stats()] == [False, True]
+
+    only_busy = BackendRouter([Backend("http://busy:11434")])
+    assert chat(routed_client(only_busy, handler)).status_code == 503
+
+
+def test_limited_calls_wait_for_a_slot():
+    running, peak = [0], [0]
+    lock = threading.Lock()
+
+    def handler(request):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+        return httpx.Response(200, json={})
+
+    client = routed_client(BackendRouter([Backend(BASE_URL)]), handler)
+    with limit_llm_calls(threading.Semaphore(2)), ThreadPoolExecutor(max_workers=6) as pool:
+        calls = [pool.submit(contextvars.copy_context().run, lambda: chat(client).read()) for _ in range(6)]
+        [call.result() for call in calls]
+    assert peak[0] == 2
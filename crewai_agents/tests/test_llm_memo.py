@@ -0,0 +1,168 @@
+import json
+import os
+
+import httpx
+import pytest
+from crewai import Agent, Crew, Task
+from crewai.knowledge.knowledge import Knowledge
+from crewai.rag.embeddings.factory import build_embedder
+
+from benchmarks.fake_ollama import start_fake_ollama
+from knowledge_index import CachedCSVKnowledgeSource, KnowledgeIndexCache, KnowledgeIndexStorage
+from llm_memo import LLMCallStore, MemoTransport, ReplayMissError, embedder_model, memo_embedder
+from llm_pool import LLMPool
+
+BASE_URL = "http://ollama.test:11434"
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = LLMCallStore(str(tmp_path / "memo.db"))
+    yield store
+    store.close()
+
+
+def backend(calls):
+    def handler(request):
+        calls.append(json.loads(request.content or b"null"))
+        return httpx.Response(200, json={"choices": [{"message": {"content": f"reply {len(calls)}"}}]})
+    return handler
+
+
+def memo_client(store, handler, mode="memo"):
+    return httpx.Client(transport=MemoTransport(store, httpx.MockTransport(handler), mode))
+
+
+def chat(client, content="hi", temperature=0, **extra):
+    return client.post(BASE_URL + "/v1/chat/completions",
+                       json={"model": "gemma3", "temperature": temperature,
+                             "messages": [{"role": "user", "content": content}], **extra})
+
+
+def test_deterministic_calls_are_answered_from_the_store(store):
+    calls = []
+    client = memo_client(store, backend(calls))
+
+    first = chat(client).json()
+    assert chat(client).json() == first
+    chat(client, "something else")
+    chat(client, temperature=0.7)
+    chat(client, temperature=0.7)
+    client.get(BASE_URL + "/api/version")
+
+    # The repeat is a hit; sampled calls and other requests always go to the backend, and are not stored.
+    assert len(calls) == 5
+    assert (store.stats()["hits"], store.stats()["entries"]) == (1, 2)
+
+
+def test_streamed_reply_is_stored_only_once_read_to_the_end(store):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, headers={"content-type": "text/event-stream"},
+                              content=iter([b"data: {\"a\": 1}\n\n", b"data: [DONE]", b"\n\n"]))
+
+    client = memo_client(store, handler)
+    streamed = {"model": "gemma3", "temperature": 0, "stream": True, "messages": []}
+    with client.stream("POST", BASE_URL + "/v1/chat/completions", json=streamed) as response:
+        next(response.iter_raw())
+    assert store.stats()["entries"] == 0
+
+    # Like the OpenAI client, stop at the end marker without reading the trailing newlines.
+    with client.stream("POST", BASE_URL + "/v1/chat/completions", json=streamed) as response:
+        for chunk in response.iter_raw():
+            if chunk.endswith(b"[DONE]"):
+                break
+    replayed = client.post(BASE_URL + "/v1/chat/completions", json=streamed)
+    assert replayed.headers["content-type"] == "text/event-stream"
+    assert replayed.text.endswith("data: [DONE]\n\n")
+    assert len(calls) == 2
+
+
+def test_least_recently_used_replies_are_evicted_past_max_bytes(tmp_path):
+    store = LLMCallStore(str(tmp_path / "memo.db"), max_bytes=120)
+    client = memo_client(store, backend([]))
+    for content in ("a", "b", "c"):
+        chat(client, content)
+        chat(client, "a")
+
+    stats = store.stats()
+    assert stats["evictions"] == 1 and stats["bytes"] <= 120
+    # "a" was used after "b", so "b" went.
+    assert chat(client, "a").json() == {"choices": [{"message": {"content": "reply 1"}}]}
+    assert store.stats()["entries"] == 2
+
+    reopened = LLMCallStore(str(tmp_path / "memo.db"), max_bytes=120)
+    assert reopened.stats()["bytes"] == stats["bytes"]
+
+
+def test_record_then_replay_runs_without_a_backend(store):
+    calls = []
+    recorder = memo_client(store, backend(calls), mode="record")
+    chat(recorder, temperature=0.7)
+    latest = chat(recorder, temperature=0.7).json()
+    # Record mode always asks the backend, and keeps its latest reply.
+    assert len(calls) == 2
+
+    def offline(request):
+        raise AssertionError("replay must not reach a backend")
+
+    replayer = memo_client(store, offline, mode="replay")
+    assert chat(replayer, temperature=0.7).json() == latest
+    missed = chat(replayer, "never recorded")
+    assert missed.status_code == 400
+    assert missed.json()["error"]["type"] == "replay_miss"
+
+
+def test_unknown_mode_is_rejected(store):
+    with pytest.raises(ValueError):
+        MemoTransport(store, httpx.MockTransport(backend([])), "sometimes")
+
+
+def analyse_orders(tmp_path, url, mode):
+    """Runs a one-agent crew that searches a CSV's knowledge index, with LLM and embeddings memoized in mode."""
+    store = LLMCallStore(str(tmp_path / "memo.db"))
+    pool = LLMPool(default_model="ollama/gemma3", base_url=url, memo=store, memo_mode=mode)
+    spec = {"provider": "openai", "config": {"model_name": "nomic-embed-text", "api_key": "fake",
+                                             "api_base": url + "/v1"}}
+    embedder = memo_embedder(build_embedder(spec), store, embedder_model(spec), mode)
+    # A fresh index per run, so replay has to embed the chunks again too.
+    # crewai resolves file sources against the knowledge folder.
+    csv_path = os.path.relpath(tmp_path / "orders.csv", "knowledge")
+    source = CachedCSVKnowledgeSource(file_paths=[csv_path], embedder_spec=spec,
+                                      index_cache=KnowledgeIndexCache(str(tmp_path / f"index-{mode}"), 1024 * 1024))
+    knowledge = Knowledge(collection_name="orders", sources=[source], storage=KnowledgeIndexStorage(embedder=embedder))
+    knowledge.add_sources()
+    agent = Agent(role="Analyst", goal="Answer questions about orders", backstory="b", llm=pool.get(temperature=0),
+                  knowledge=knowledge, allow_delegation=False)
+    task = Task(description="Which supplier ordered the most?", expected_output="A supplier", agent=agent)
+    result = Crew(agents=[agent], tasks=[task]).kickoff()
+    pool.warm()
+    pool.start_keep_alive(0.01)
+    pool.start_health_checks(0.01)
+    pool.close()
+    return result.raw, pool.stats(), embedder
+
+
+def test_retrieval_crew_replays_with_no_backend(tmp_path):
+    (tmp_path / "orders.csv").write_text("Supplier,Quantity\nAlpha_Inc,10\nBeta_Supplies,20\n")
+    server = start_fake_ollama(tokens_per_second=0, latency=0, load_seconds=0, response_tokens=12)
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        recorded, _, _ = analyse_orders(tmp_path, url, "record")
+        requests = server.fake.stats()["requests"]
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert requests["/v1/chat/completions"] >= 1 and requests["/v1/embeddings"] >= 2
+
+    # Nothing listens on the port any more: every call, chat or embedding, must come from the store.
+    replayed, stats, embedder = analyse_orders(tmp_path, url, "replay")
+    assert replayed == recorded
+    assert stats["memo"]["misses"] == 0 and stats["memo"]["hits"] >= requests["/v1/chat/completions"]
+    # Warm-up and health checks left the absent server alone.
+    assert stats["models"]["gemma3"]["error"] is None
+    assert all(backend["healthy"] for backend in stats["backends"])
+    with pytest.raises(ReplayMissError):
+        embedder(["never embedded"])
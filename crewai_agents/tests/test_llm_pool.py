@@ -0,0 +1,79 @@
+import json
+
+import httpx
+import pytest
+
+from llm_pool import LLMPool, ollama_model_name, parse_keep_alive
+
+
+@pytest.fixture
+def pool():
+    pool = LLMPool(default_model="ollama/gemma3", base_url="http://ollama.test:11434", keep_alive="30m")
+    yield pool
+    pool.close()
+
+
+def test_parse_keep_alive():
+    assert parse_keep_alive("30m") == 1800
+    assert parse_keep_alive("1h") == 3600
+    assert parse_keep_alive(-1) == -1
+    with pytest.raises(ValueError):
+        parse_keep_alive("soon")
+
+
+def test_ollama_model_name():
+    assert ollama_model_name("ollama/gemma3") == "gemma3"
+    assert ollama_model_name("gemma3") == "gemma3"
+
+
+def test_clients_are_shared_by_settings(pool):
+    first = pool.get(temperature=0)
+    second = pool.get(temperature=0)
+    hotter = pool.get(temperature=0.7)
+
+    assert first is second
+    assert hotter is not first
+    # Both clients send requests through the pool's HTTP connections.
+    assert first._client._client is pool.http_client
+    assert hotter._client._client is pool.http_client
+    assert pool.stats()["clients"] == 2
+
+
+def test_warm_records_cold_start_and_keep_alive(pool):
+    requests = []
+
+    def handler(request):
+        requests.append(json.loads(request.content))
+        return httpx.Response(200, json={"model": "gemma3", "done": True, "load_duration": 2_500_000_000})
+
+    pool.http_client = httpx.Client(transport=httpx.MockTransport(handler))
+    stats = pool.warm(["ollama/gemma3"])
+
+    assert requests == [{"model": "gemma3", "prompt": "", "keep_alive": "30m"}]
+    assert stats["models"]["gemma3"]["load_seconds"] == 2.5
+    assert stats["models"]["gemma3"]["resident"] is True
+
+    pool.refresh()
+    assert len(requests) == 2
+
+
+def test_warm_failure_is_reported(pool):
+    pool.http_client = httpx.Client(transport=httpx.MockTransport(lambda request: httpx.Response(500)))
+
+    stats = pool.warm(["gemma3"])
+
+    assert stats["models"]["gemma3"]["error"]
+    assert stats["models"]["gemma3"]["resident"] is False
+
+
+def test_calls_split_into_cold_and_warm(pool):
+    pool.record_call("gemma3", 8.0, started_at=1000.0)
+    pool.record_call("gemma3", 1.0, started_at=1010.0)
+    pool.record_call("gemma3", 2.0, started_at=1020.0)
+    # Idle past keep_alive: the model was unloaded, so this call pays the load again.
+    pool.record_call("gemma3", 9.0, started_at=1020.0 + 3600)
+
+    stats = pool.stats()["models"]["gemma3"]
+    assert (stats["cold_calls"], stats["warm_calls"]) == (2, 2)
+    assert stats["cold_p50_seconds"] == 8.5
+    assert stats["warm_p50_seconds"] == 1.5
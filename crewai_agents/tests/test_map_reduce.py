@@ -0,0 +1,103 @@
+import threading
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from map_reduce import MapReduceAnalyzer, key_partitions, merge_stats, partition_stats, row_partitions
+
+
+class RecordingLLM:
+    """Returns a canned finding per call, recording prompts and how many calls overlap."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.prompts = []
+        self.running = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def call(self, messages):
+        with self._lock:
+            self.prompts.append(messages[0]["content"])
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        time.sleep(self.delay)
+        with self._lock:
+            self.running -= 1
+        return f"finding {len(self.prompts)}"
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    df = pd.DataFrame({
+        "Supplier": ["Alpha_Inc", "Beta_Supplies", "Gamma_Co", "Beta_Supplies"] * 25,
+        "Quantity": range(100),
+        "Defective_Units": [1, 5, 0, 3] * 25,
+    })
+    path = tmp_path / "orders.csv"
+    df.to_csv(path, index=False)
+    return str(path)
+
+
+def test_row_partitions_cover_all_rows():
+    assert row_partitions(10, 3) == [{"label": "rows 1-3", "start": 0, "stop": 3},
+                                     {"label": "rows 4-7", "start": 3, "stop": 7},
+                                     {"label": "rows 8-10", "start": 7, "stop": 10}]
+
+
+def test_key_partitions_balance_rows_and_keep_keys_whole():
+    partitions = key_partitions("Supplier", {"A": 50, "B": 30, "C": 20, "D": 10}, 2)
+
+    assert [(p["values"], p["rows"]) for p in partitions] == [(["A", "D"], 60), (["B", "C"], 50)]
+    assert partitions[0]["label"] == "Supplier: A, D"
+
+
+def test_merged_partition_stats_equal_whole_dataset_stats():
+    df = pd.DataFrame({"Supplier": ["A", "B", "A", "C"], "Quantity": [1.0, 2.0, 3.0, 4.0]})
+
+    merged = merge_stats([partition_stats(df[:2], ["Quantity"], ["Supplier"]),
+                          partition_stats(df[2:], ["Quantity"], ["Supplier"])])
+
+    assert merged == partition_stats(df, ["Quantity"], ["Supplier"])
+    assert merged["groups"]["Supplier"]["A"] == {"Quantity": [4.0, 2]}
+
+
+def test_plan_rejects_unknown_partition_column(tmp_path):
+    analyzer = MapReduceAnalyzer(RecordingLLM(), str(tmp_path), processes=0)
+    with pytest.raises(ValueError, match="Unknown partition column 'Region'"):
+        analyzer.plan(pa.table({"Supplier": ["A"]}), "Region")
+    analyzer.close()
+
+
+def test_run_maps_partitions_and_reduces_with_exact_totals(csv_path, tmp_path):
+    llm = RecordingLLM(delay=0.05)
+    analyzer = MapReduceAnalyzer(llm, str(tmp_path / "columnar"), processes=0, llm_concurrency=2,
+                                 partition_rows=25)
+    parts_seen = []
+
+    outcome = analyzer.run(csv_path, "Which supplier has the most defects?", partition_by="Supplier",
+                           on_partition=lambda part, done, total: parts_seen.append((done, total)))
+    analyzer.close()
+
+    assert outcome["report"] == "finding 4"
+    assert outcome["rows"] == 100
+    assert sorted(p["rows"] for p in outcome["partitions"]) == [25, 25, 50]
+    assert parts_seen[-1] == (3, 3)
+    assert llm.peak <= 2
+    # Three map prompts, then one reduce prompt with the exact whole-dataset figures.
+    reduce_prompt = llm.prompts[-1]
+    assert "all 3 partitions" in reduce_prompt
+    assert "| Beta_Supplies | 2,500 | 200 | 50 | 4 |" in reduce_prompt
+
+
+def test_run_stops_when_cancelled(csv_path, tmp_path):
+    analyzer = MapReduceAnalyzer(RecordingLLM(), str(tmp_path / "columnar"), processes=0, partition_rows=25)
+
+    def cancelled():
+        raise RuntimeError("cancelled")
+
+    with pytest.raises(RuntimeError, match="cancelled"):
+        analyzer.run(csv_path, "Summarize", check_cancelled=cancelled)
+    analyzer.close()
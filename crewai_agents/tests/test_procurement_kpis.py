@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from dataset_profile import DatasetProfile, DatasetProfileStore
+from dataset_tools import ProcurementKPITool
+from procurement_kpis import KpiMemo, compute_kpi, group_percentiles, lead_time, scorecard
+
+CSV = """PO_ID,Supplier,Order_Date,Delivery_Date,Order_Status,Quantity,Unit_Price,Negotiated_Price,Defective_Units,Compliance
+PO-1,Alpha_Inc,2023-01-01,2023-01-05,Delivered,100,10.0,9.0,5,Yes
+PO-2,Alpha_Inc,2023-01-02,2023-01-12,Delivered,300,20.0,20.0,,No
+PO-3,Beta_Supplies,2023-01-03,2023-01-05,Delivered,200,5.0,4.0,20,Yes
+PO-4,Beta_Supplies,2023-01-04,,Pending,100,5.0,5.0,,Yes
+"""
+
+
+@pytest.fixture
+def csv_file(tmp_path):
+    path = tmp_path / "procurement.csv"
+    path.write_text(CSV)
+    return path
+
+
+def test_kpis_per_group(csv_file):
+    card = scorecard(DatasetProfile.from_path(csv_file).df)
+
+    alpha, beta = card.loc["Alpha_Inc"], card.loc["Beta_Supplies"]
+    # Only orders with a defect count are inspected: 5 of Alpha's 100 units, 20 of Beta's 200.
+    assert (alpha["defect_rate_pct"], beta["defect_rate_pct"]) == (5.0, 10.0)
+    assert alpha["spend"] == 100 * 9.0 + 300 * 20.0
+    assert alpha["savings_pct"] == pytest.approx(100 * 100 / 7000)
+    # Beta's pending order has no delivery date, so only its delivered order has a lead time.
+    assert (alpha["mean_lead_days"], beta["mean_lead_days"]) == (7.0, 2.0)
+    assert (alpha["compliance_rate_pct"], beta["compliance_rate_pct"]) == (50.0, 100.0)
+    assert list(card["orders"]) == [2, 2]
+
+
+def test_group_percentiles_match_numpy():
+    rng = np.random.default_rng(0)
+    codes = rng.integers(-1, 3, 2000)
+    for values in (rng.integers(1, 30, 2000).astype(float), rng.normal(10, 3, 2000)):
+        values[rng.random(2000) < 0.1] = np.nan
+        result = group_percentiles(codes, values, 4, (0.0, 0.5, 0.9, 1.0))
+        for group in range(3):
+            expected = np.percentile(values[(codes == group) & ~np.isnan(values)], [0, 50, 90, 100])
+            assert np.allclose(result[:, group], expected)
+        assert np.isnan(result[:, 3]).all()
+
+
+def test_lead_time_distribution_overall(csv_file):
+    table = lead_time(DatasetProfile.from_path(csv_file).df)
+
+    assert table.loc["all", "orders"] == 3
+    assert (table.loc["all", "min_days"], table.loc["all", "p50_days"], table.loc["all", "max_days"]) == (2, 4, 10)
+
+
+def test_kpis_are_memoized_per_dataset_content_and_filters(csv_file):
+    store, memo = DatasetProfileStore(), KpiMemo(max_entries=2)
+    profile = store.get(csv_file)
+
+    delivered = compute_kpi(profile, "defect_rate", "Supplier", {"Order_Status": "Delivered"}, memo)
+    again = compute_kpi(profile, "defect_rate", "Supplier", {"Order_Status": ["Delivered"]}, memo, ascending=True)
+    assert memo.stats()["hits"] == 1
+    assert list(delivered.index) == ["Beta_Supplies", "Alpha_Inc"]
+    assert list(again.index) == ["Alpha_Inc", "Beta_Supplies"]
+
+    csv_file.write_text(CSV.replace("PO-3,Beta_Supplies,2023-01-03,2023-01-05,Delivered,200,5.0,4.0,20",
+                                    "PO-3,Beta_Supplies,2023-01-03,2023-01-05,Delivered,200,5.0,4.0,2"))
+    changed = compute_kpi(store.get(csv_file), "defect_rate", "Supplier", {"Order_Status": "Delivered"}, memo)
+    assert changed.loc["Beta_Supplies", "defect_rate_pct"] == 1.0
+    assert memo.stats()["misses"] == 2
+
+
+def test_tool_reports_kpis_and_errors(csv_file):
+    profile = DatasetProfile.from_path(csv_file, name="procurement.csv")
+    tool = ProcurementKPITool(profiles={"procurement.csv": profile}, memo=KpiMemo())
+
+    text = tool.run(kpi="compliance_rate", group_by="Supplier", top_k=1)
+    assert "Beta_Supplies" in text and "Alpha_Inc" not in text
+    assert tool.run(kpi="velocity").startswith("Error: Unknown KPI 'velocity'")
+    assert tool.run(kpi="defect_rate", group_by="Region").startswith("Error: Unknown column 'Region'")
@@ -0,0 +1,23 @@
+import asyncio
+from types import SimpleNamespace
+
+from progress import ProgressChannel, crew_progress, format_sse, _on_stream_chunk
+
+
+def test_format_sse():
+    assert format_sse("token", {"chunk": "hi"}) == 'event: token\ndata: {"chunk": "hi"}\n\n'
+
+
+def test_events_routed_only_to_subscribed_crew():
+    async def run():
+        channel = ProgressChannel(asyncio.get_running_loop())
+        crew = SimpleNamespace(tasks=[SimpleNamespace(id="task-1")])
+        with crew_progress(crew, channel):
+            _on_stream_chunk(None, SimpleNamespace(task_id="task-1", task_name="Retrieve Data", chunk="Hel"))
+            _on_stream_chunk(None, SimpleNamespace(task_id="other-task", task_name="Other", chunk="x"))
+        _on_stream_chunk(None, SimpleNamespace(task_id="task-1", task_name="Retrieve Data", chunk="late"))
+        await asyncio.sleep(0)
+        return channel.drain()
+
+    events = asyncio.run(run())
+    assert events == [("token", {"task": "Retrieve Data", "chunk": "Hel"})]
@@ -0,0 +1,69 @@
+import sqlite3
+import time
+
+import numpy as np
+
+from result_cache import ResultCache, normalize_query
+
+
+def test_normalize_query():
+    assert normalize_query("  Top Suppliers   by defect rate?? ") == "top suppliers by defect rate"
+
+
+def test_hit_requires_same_context():
+    cache = ResultCache()
+    cache.put("Top suppliers?", "ctx-a", "report")
+
+    assert cache.get("top suppliers", "ctx-a") == "report"
+    assert cache.get("top suppliers", "ctx-b") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_lru_and_ttl():
+    cache = ResultCache(max_entries=2, ttl_seconds=0.05)
+    cache.put("q1", "ctx", "r1")
+    cache.put("q2", "ctx", "r2")
+    cache.put("q3", "ctx", "r3")
+
+    assert cache.get("q1", "ctx") is None
+    assert cache.get("q3", "ctx") == "r3"
+    time.sleep(0.1)
+    assert cache.get("q3", "ctx") is None
+
+
+def test_persistent_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "results.sqlite")
+    ResultCache(persist_path=path).put("q1", "ctx", "r1")
+
+    assert ResultCache(persist_path=path).get("q1", "ctx") == "r1"
+
+
+def test_similar_question_hits():
+    vectors = {"top suppliers by defect rate": [1.0, 0.1], "best suppliers by defect rate": [1.0, 0.12],
+               "average price per category": [0.0, 1.0]}
+    cache = ResultCache(embedder=lambda docs: [np.array(vectors[d]) for d in docs], similarity_threshold=0.99)
+    cache.put("Top suppliers by defect rate", "ctx", "report")
+
+    assert cache.get("Best suppliers by defect rate", "ctx") == "report"
+    assert cache.get("Average price per category", "ctx") is None
+    assert cache.stats()["similar_hits"] == 1
+
+
+def test_similar_question_hits_after_restart(tmp_path):
+    path = str(tmp_path / "results.sqlite")
+    # A file from before embeddings were persisted gains the column.
+    with sqlite3.connect(path) as db:
+        db.execute("CREATE TABLE results (key TEXT PRIMARY KEY, context TEXT, query TEXT, result TEXT, created REAL)")
+    vectors = {"top suppliers by defect rate": [1.0, 0.1], "best suppliers by defect rate": [1.0, 0.12]}
+
+    def embedder(docs):
+        return [np.array(vectors[d]) for d in docs]
+
+    ResultCache(persist_path=path, embedder=embedder, similarity_threshold=0.99).put(
+        "Top suppliers by defect rate", "ctx", "report")
+    reopened = ResultCache(persist_path=path, embedder=embedder, similarity_threshold=0.99)
+
+    assert reopened.get("Best suppliers by defect rate", "ctx") == "report"
+    assert reopened.get("Best suppliers by defect rate", "other ctx") is None
+    assert reopened.stats()["similar_hits"] == 1
@@ -0,0 +1,41 @@
+import pytest
+
+from schema_index import SchemaIndex, list_knowledge_files, tokenize
+
+
+@pytest.fixture
+def knowledge_dir(tmp_path):
+    (tmp_path / "procurement.csv").write_text(
+        "Supplier,Item_Category,Negotiated_Price\nAlpha_Inc,Electronics,10.5\nBeta_Supplies,MRO,7.0\n")
+    (tmp_path / "sales.csv").write_text("Product,Region,Revenue\nWidget,North,100\nGadget,South,250\n")
+    (tmp_path / ".hidden.csv").write_text("a\n1\n")
+    (tmp_path / "notes.txt").write_text("ignored")
+    return tmp_path
+
+
+def test_tokenize_splits_identifiers():
+    assert tokenize("Negotiated_Price by ItemCategory?") == {"negotiated", "price", "item", "category"}
+
+
+def test_list_knowledge_files_skips_hidden_and_unsupported(knowledge_dir):
+    assert list_knowledge_files(str(knowledge_dir)) == ["procurement.csv", "sales.csv"]
+
+
+def test_schema_has_columns_and_samples(knowledge_dir):
+    schemas = SchemaIndex(str(knowledge_dir)).schemas()
+    columns = schemas[0]["columns"]
+
+    assert [c["name"] for c in columns] == ["Supplier", "Item_Category", "Negotiated_Price"]
+    assert columns[0]["samples"] == ["Alpha_Inc", "Beta_Supplies"]
+
+
+def test_route_by_columns_and_values(knowledge_dir):
+    index = SchemaIndex(str(knowledge_dir))
+
+    assert index.route("average negotiated price per category") == ["procurement.csv"]
+    assert index.route("revenue in the North region") == ["sales.csv"]
+    assert index.route("how is Alpha Inc doing?") == ["procurement.csv"]
+
+
+def test_route_falls_back_to_all_files(knowledge_dir):
+    assert SchemaIndex(str(knowledge_dir)).route("summarize everything", max_files=5) == ["procurement.csv", "sales.csv"]
@@ -0,0 +1,63 @@
+import os
+import time
+
+from sessions import WorkspaceManager
+
+
+def make_manager(tmp_path, sizes, released, **kwargs):
+    return WorkspaceManager(str(tmp_path), measure=lambda workspace: sizes.get(workspace.id, 0),
+                            release=lambda workspace: released.append(workspace.id), **kwargs)
+
+
+def test_workspaces_route_only_their_own_files(tmp_path):
+    manager = WorkspaceManager(str(tmp_path))
+    first, second = manager.create(), manager.create()
+    (tmp_path / "sessions" / first.id / "sales.csv").write_text("Region,Sales\nNorth,1\n")
+    (tmp_path / "sessions" / second.id / "orders.csv").write_text("Supplier,Quantity\nAlpha,2\n")
+
+    assert first.route("sales by region") == [f"sessions/{first.id}/sales.csv"]
+    assert second.route("sales by region") == [f"sessions/{second.id}/orders.csv"]
+    assert first.contains(os.path.join(str(tmp_path), "sessions", first.id, "sales.csv"))
+    assert not first.contains(os.path.join(str(tmp_path), "sessions", second.id, "orders.csv"))
+    assert manager.get("unknown") is None
+
+
+def test_least_recently_used_workspace_is_released_over_budget(tmp_path):
+    sizes, released = {}, []
+    manager = make_manager(tmp_path, sizes, released, memory_budget_bytes=100)
+    first, second, third = manager.create(), manager.create(), manager.create()
+    for workspace in (first, second):
+        sizes[workspace.id] = 40
+        manager.loaded(workspace)
+    manager.get(first.id)
+
+    sizes[third.id] = 40
+    manager.loaded(third)
+
+    assert released == [second.id]
+    assert (first.memory_bytes, second.memory_bytes, third.memory_bytes) == (40, 0, 40)
+    assert manager.stats()["evictions"] == 1
+    assert manager.stats()["memory_bytes"] == 80
+    # Its files stay on disk; only the in-memory state was dropped.
+    assert os.path.isdir(second.knowledge_dir)
+
+
+def test_idle_workspaces_expire_and_are_deleted(tmp_path):
+    released = []
+    manager = make_manager(tmp_path, {}, released, idle_seconds=60)
+    idle, active = manager.create(), manager.create()
+    idle.last_used = time.time() - 120
+
+    assert manager.expire_idle() == [idle.id]
+    assert released == [idle.id]
+    assert not os.path.exists(idle.knowledge_dir)
+    assert manager.get(idle.id) is None
+    assert manager.get(active.id) is active
+
+
+def test_workspaces_on_disk_are_picked_up_after_restart(tmp_path):
+    workspace = WorkspaceManager(str(tmp_path)).create()
+
+    restarted = WorkspaceManager(str(tmp_path))
+
+    assert restarted.get(workspace.id).knowledge_dir == workspace.knowledge_dir
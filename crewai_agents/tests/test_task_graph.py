@@ -0,0 +1,98 @@
+import threading
+import time
+
+import pytest
+from crewai import Agent, Process, Task
+from crewai.llms.base_llm import BaseLLM
+
+from task_graph import ParallelCrew, order_task_configs, task_dependencies
+
+
+DELAY = 0.5
+# Agents copy their LLM, so overlapping calls are counted here rather than on the instance.
+calls = {"running": 0, "peak": 0}
+_lock = threading.Lock()
+
+
+class SlowLLM(BaseLLM):
+    """Answers every call after DELAY seconds."""
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None, from_task=None,
+             from_agent=None, response_model=None):
+        with _lock:
+            calls["running"] += 1
+            calls["peak"] = max(calls["peak"], calls["running"])
+        time.sleep(DELAY)
+        with _lock:
+            calls["running"] -= 1
+        return f"Final Answer: done by {from_agent.role if from_agent else 'agent'}"
+
+
+def names(configs):
+    return [config["name"] for config in configs]
+
+
+def test_task_dependencies_accepts_both_keys():
+    assert task_dependencies({"context_tasks": ["A", "B"]}) == ["A", "B"]
+    assert task_dependencies({"context_tasks": "A"}) == ["A"]
+    assert task_dependencies({"context_task": "A"}) == ["A"]
+    assert task_dependencies({}) == []
+
+
+def test_order_puts_dependencies_first_and_keeps_file_order():
+    configs = [
+        {"name": "Report", "context_tasks": ["Suppliers", "Prices"]},
+        {"name": "Retrieve"},
+        {"name": "Suppliers", "context_tasks": ["Retrieve"]},
+        {"name": "Prices", "context_tasks": ["Retrieve"]},
+    ]
+
+    assert names(order_task_configs(configs)) == ["Retrieve", "Suppliers", "Prices", "Report"]
+
+
+def test_order_rejects_cycles_and_unknown_tasks():
+    with pytest.raises(ValueError, match="cycle: (A -> B -> A|B -> A -> B)"):
+        order_task_configs([{"name": "Start"}, {"name": "A", "context_tasks": ["B", "Start"]},
+                            {"name": "B", "context_tasks": ["A"]}])
+    with pytest.raises(ValueError, match="unknown task 'Missing'"):
+        order_task_configs([{"name": "A", "context_tasks": ["Missing"]}])
+
+
+def test_parallel_crew_runs_independent_branches_concurrently():
+    llm = SlowLLM(model="slow")
+    agents = [Agent(role=role, goal="g", backstory="b", llm=llm, allow_delegation=False)
+              for role in ("Retriever", "Supplier Analyst", "Price Analyst", "Writer")]
+    retrieve = Task(description="Retrieve", expected_output="data", agent=agents[0], context=[])
+    suppliers = Task(description="Suppliers", expected_output="x", agent=agents[1], context=[retrieve])
+    prices = Task(description="Prices", expected_output="x", agent=agents[2], context=[retrieve])
+    report = Task(description="Report", expected_output="x", agent=agents[3], context=[suppliers, prices])
+    crew = ParallelCrew(agents=agents, tasks=[retrieve, suppliers, prices, report], process=Process.sequential)
+
+    copy = crew.copy()
+    started = time.perf_counter()
+    result = copy.kickoff()
+    elapsed = time.perf_counter() - started
+
+    assert isinstance(copy, ParallelCrew)
+    assert calls["peak"] == 2
+    # Three steps on the critical path rather than four tasks in a row.
+    assert elapsed < 4 * DELAY
+    assert result.raw == "done by Writer"
+    assert [output.raw for output in result.tasks_output] == [
+        "done by Retriever", "done by Supplier Analyst", "done by Price Analyst", "done by Writer"]
+
+
+def test_branches_of_one_agent_run_concurrently_on_copies():
+    calls["peak"] = 0
+    llm = SlowLLM(model="slow")
+    analyst = Agent(role="Senior Data Analyst", goal="g", backstory="b", llm=llm, allow_delegation=False)
+    suppliers = Task(description="Supplier defects", expected_output="x", agent=analyst, context=[])
+    prices = Task(description="Category prices", expected_output="x", agent=analyst, context=[])
+    crew = ParallelCrew(agents=[analyst], tasks=[suppliers, prices], process=Process.sequential)
+
+    started = time.perf_counter()
+    result = crew.kickoff()
+
+    assert calls["peak"] == 2
+    assert time.perf_counter() - started < 2 * DELAY
+    assert [output.raw for output in result.tasks_output] == ["done by Senior Data Analyst"] * 2
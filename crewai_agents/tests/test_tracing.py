@@ -0,0 +1,45 @@
+from datetime import datetime, timezone
+
+from tracing import MetricsRegistry, Trace, record_span, span, traced, use_trace
+
+
+def test_render_counters_and_escaped_labels():
+    registry = MetricsRegistry()
+    registry.counter("calls_total", "Calls.")
+    registry.inc("calls_total", agent='Senior "Data" Analyst')
+    registry.inc("calls_total", 2, agent='Senior "Data" Analyst')
+
+    assert registry.render() == ("# HELP calls_total Calls.\n# TYPE calls_total counter\n"
+                                 'calls_total{agent="Senior \\"Data\\" Analyst"} 3\n')
+
+
+def test_render_histogram_buckets():
+    registry = MetricsRegistry()
+    registry.histogram("stage_seconds", "Stages.", buckets=(0.1, 1))
+    registry.observe("stage_seconds", 0.05, span="kickoff")
+    registry.observe("stage_seconds", 0.5, span="kickoff")
+
+    lines = registry.render().splitlines()
+    assert lines[2:] == ['stage_seconds_bucket{span="kickoff",le="0.1"} 1',
+                         'stage_seconds_bucket{span="kickoff",le="1"} 2',
+                         'stage_seconds_bucket{span="kickoff",le="+Inf"} 2',
+                         'stage_seconds_sum{span="kickoff"} 0.55',
+                         'stage_seconds_count{span="kickoff"} 2']
+
+
+def test_spans_go_to_the_current_trace_only():
+    @traced()
+    def load_tools():
+        return "tools"
+
+    trace = Trace()
+    with use_trace(trace):
+        with span("route_query", files=2):
+            pass
+        assert load_tools() == "tools"
+    record_span("outside", datetime.now(timezone.utc), 1.0)
+
+    breakdown = trace.breakdown()
+    assert [s["name"] for s in breakdown["spans"]] == ["route_query", "load_tools"]
+    assert breakdown["spans"][0]["files"] == 2
+    assert set(breakdown["by_stage"]) == {"route_query", "load_tools"}
@@ -0,0 +1,136 @@
+import asyncio
+import hashlib
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from starlette.datastructures import UploadFile
+
+from columnar import convert_csv, find_columnar, read_table
+from dataset_profile import DatasetProfileStore
+import uploads
+from uploads import place_content, save_stream, save_upload
+
+CSV = b"Supplier,Quantity,Order_Date\nAlpha_Inc,10,2023-01-01\nBeta_Supplies,20,2023-01-02\n"
+
+
+def upload(content: bytes) -> UploadFile:
+    return UploadFile(file=io.BytesIO(content), filename="data.csv")
+
+
+def test_save_upload_hashes_while_writing(tmp_path):
+    dest = tmp_path / "data.csv"
+    file_hash, size, skipped = asyncio.run(save_upload(upload(CSV), str(dest), chunk_size=8))
+
+    assert dest.read_bytes() == CSV
+    assert file_hash == hashlib.sha256(CSV).hexdigest()
+    assert size == len(CSV)
+    assert not skipped
+    assert not list(tmp_path.glob("*.part"))
+
+
+def test_identical_reupload_leaves_file_untouched(tmp_path):
+    dest = tmp_path / "data.csv"
+    asyncio.run(save_upload(upload(CSV), str(dest)))
+    mtime = dest.stat().st_mtime_ns
+
+    _, _, skipped = asyncio.run(save_upload(upload(CSV), str(dest)))
+    assert skipped
+    assert dest.stat().st_mtime_ns == mtime
+
+    _, _, skipped = asyncio.run(save_upload(upload(CSV + b"Gamma_Co,30,2023-01-03\n"), str(dest)))
+    assert not skipped
+
+
+
+async def chunks(content: bytes, size: int = 8):
+    for start in range(0, len(content), size):
+        yield content[start:start + size]
+
+
+def test_streamed_content_must_match_announced_hash(tmp_path):
+    dest = tmp_path / "data.csv"
+    with pytest.raises(ValueError, match="not the announced"):
+        asyncio.run(save_stream(chunks(CSV), str(dest), hashlib.sha256(b"other").hexdigest()))
+    assert list(tmp_path.iterdir()) == []
+
+    file_hash, _, _ = asyncio.run(save_stream(chunks(CSV), str(dest), hashlib.sha256(CSV).hexdigest().upper()))
+    assert file_hash == hashlib.sha256(CSV).hexdigest()
+
+
+def test_concurrent_uploads_of_one_name_do_not_mix(tmp_path):
+    dest = tmp_path / "data.csv"
+    other = CSV + b"Gamma_Co,30,2023-01-03\n"
+
+    async def both():
+        return await asyncio.gather(save_stream(chunks(CSV, 4), str(dest)), save_stream(chunks(other, 4), str(dest)))
+
+    asyncio.run(both())
+    assert dest.read_bytes() in (CSV, other)
+    assert not list(tmp_path.glob("*.part"))
+
+
+def test_upload_file_io_runs_off_the_event_loop(tmp_path, monkeypatch):
+    loop_threads, io_threads = set(), []
+
+    def recorded(function):
+        def wrapper(*args, **kwargs):
+            io_threads.append(threading.get_ident())
+            return function(*args, **kwargs)
+        return wrapper
+
+    monkeypatch.setattr(uploads, "open", recorded(open), raising=False)
+    monkeypatch.setattr(uploads.os, "replace", recorded(os.replace))
+    monkeypatch.setattr(uploads, "_write_chunk", recorded(uploads._write_chunk))
+
+    async def upload():
+        loop_threads.add(threading.get_ident())
+        return await save_stream(chunks(CSV), str(tmp_path / "data.csv"))
+
+    asyncio.run(upload())
+    assert len(io_threads) > 3
+    assert not loop_threads & set(io_threads)
+
+
+def test_known_content_is_placed_without_upload(tmp_path):
+    shared, session = tmp_path / "knowledge", tmp_path / "session"
+    shared.mkdir()
+    session.mkdir()
+    (shared / "orders.csv").write_bytes(CSV)
+    digest = hashlib.sha256(CSV).hexdigest()
+
+    assert place_content(digest, str(session / "mine.csv"), [str(session), str(shared)]) == "copied"
+    assert (session / "mine.csv").read_bytes() == CSV
+    mtime = (session / "mine.csv").stat().st_mtime_ns
+    assert place_content(digest, str(session / "mine.csv"), [str(session), str(shared)]) == "present"
+    assert (session / "mine.csv").stat().st_mtime_ns == mtime
+    assert place_content(hashlib.sha256(b"new").hexdigest(), str(session / "new.csv"), [str(shared)]) is None
+
+
+def test_columnar_copy_converted_once_and_memory_mapped(tmp_path):
+    csv_path = tmp_path / "data.csv"
+    csv_path.write_bytes(CSV)
+    columnar_dir = str(tmp_path / "columnar")
+
+    path = convert_csv(csv_path, columnar_dir)
+    assert find_columnar(csv_path, columnar_dir) == path
+    assert convert_csv(csv_path, columnar_dir) == path
+    assert read_table(path).num_rows == 2
+
+    profile = DatasetProfileStore(columnar_dir).get(csv_path)
+    assert profile.aggregate("Quantity", "sum").iloc[0, 0] == 30
+
+
+def test_concurrent_conversions_of_one_csv_share_a_copy(tmp_path):
+    csv_path = tmp_path / "data.csv"
+    csv_path.write_bytes(CSV)
+    columnar_dir = str(tmp_path / "columnar")
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        paths = set(pool.map(lambda _: convert_csv(csv_path, columnar_dir), range(8)))
+    assert len(paths) == 1
+    assert read_table(paths.pop()).num_rows == 2
+    assert os.listdir(columnar_dir) == [os.path.basename(find_columnar(csv_path, columnar_dir))]
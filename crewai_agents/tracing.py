@@ -0,0 +1,313 @@
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Optional
+
+SPAN_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+# crewai's delegation tools are named "Delegate work to coworker" and "Ask question to coworker".
+DELEGATION_TOOL_MARKER = "coworker"
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted((k, "" if v is None else str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: tuple, extra: Optional[tuple] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class MetricsRegistry:
+    """Counters, gauges and histograms rendered in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _metric(self, name: str, kind: str, help_text: str, buckets: tuple = ()) -> dict:
+        with self._lock:
+            return self._metrics.setdefault(name, {"kind": kind, "help": help_text, "buckets": buckets,
+                                                   "values": {}})
+
+    def counter(self, name: str, help_text: str) -> None:
+        self._metric(name, "counter", help_text)
+
+    def gauge(self, name: str, help_text: str) -> None:
+        self._metric(name, "gauge", help_text)
+
+    def histogram(self, name: str, help_text: str, buckets: tuple = SPAN_BUCKETS) -> None:
+        self._metric(name, "histogram", help_text, buckets)
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        metric = self._metrics[name]
+        key = _label_key(labels)
+        with self._lock:
+            metric["values"][key] = metric["values"].get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels) -> None:
+        metric = self._metrics[name]
+        with self._lock:
+            metric["values"][_label_key(labels)] = value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        metric = self._metrics[name]
+        key = _label_key(labels)
+        with self._lock:
+            series = metric["values"].setdefault(key, {"buckets": [0] * len(metric["buckets"]), "sum": 0.0,
+                                                       "count": 0})
+            for i, bound in enumerate(metric["buckets"]):
+                if value <= bound:
+                    series["buckets"][i] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def value(self, name: str, **labels):
+        with self._lock:
+            return self._metrics[name]["values"].get(_label_key(labels))
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for name, metric in self._metrics.items():
+                lines.append(f"# HELP {name} {metric['help']}")
+                lines.append(f"# TYPE {name} {metric['kind']}")
+                for key, value in metric["values"].items():
+                    if metric["kind"] != "histogram":
+                        lines.append(f"{name}{_format_labels(key)} {value}")
+                        continue
+                    for bound, count in zip(metric["buckets"], value["buckets"]):
+                        lines.append(f"{name}_bucket{_format_labels(key, ('le', f'{bound:g}'))} {count}")
+                    lines.append(f"{name}_bucket{_format_labels(key, ('le', '+Inf'))} {value['count']}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {round(value['sum'], 6)}")
+                    lines.append(f"{name}_count{_format_labels(key)} {value['count']}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+metrics.histogram("analysis_span_seconds", "Duration of instrumented stages of an analysis request.")
+metrics.counter("analysis_llm_calls_total", "LLM calls by model and agent.")
+metrics.counter("analysis_llm_tokens_total", "LLM prompt and completion tokens by model and agent.")
+metrics.counter("analysis_delegations_total", "Delegations between agents, by delegating agent.")
+
+
+class Trace:
+    """Spans recorded for one request, for the optional timing breakdown in its response."""
+
+    def __init__(self):
+        self.started_at = datetime.now(timezone.utc)
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add(self, name: str, start: datetime, seconds: float, attributes: dict) -> None:
+        span = {"name": name, "start_seconds": round((start - self.started_at).total_seconds(), 4),
+                "seconds": round(seconds, 4)}
+        span.update({k: v for k, v in attributes.items() if v is not None})
+        with self._lock:
+            self.spans.append(span)
+
+    def breakdown(self) -> dict:
+        """Spans in start order plus the total time per span name."""
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span["start_seconds"])
+        totals = {}
+        for span in spans:
+            totals[span["name"]] = round(totals.get(span["name"], 0) + span["seconds"], 4)
+        elapsed = (datetime.now(timezone.utc) - self.started_at).total_seconds()
+        return {"total_seconds": round(elapsed, 4), "by_stage": totals, "spans": spans}
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("analysis_trace", default=None)
+
+
+@contextmanager
+def use_trace(trace: Optional[Trace]):
+    """Makes spans recorded in this context (and crewai events it emits) go to trace."""
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+def record_span(name: str, start: datetime, seconds: float, trace: Optional[Trace] = None, **attributes) -> None:
+    metrics.observe("analysis_span_seconds", seconds, span=name)
+    trace = trace or _current_trace.get()
+    if trace is not None:
+        trace.add(name, start, seconds, attributes)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Times a block as a span of the current trace and in the span duration histogram."""
+    start = datetime.now(timezone.utc)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, start, time.perf_counter() - started, **attributes)
+
+
+def traced(name: Optional[str] = None):
+    """Decorator form of span(), named after the function by default."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name or fn.__name__):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# Start events waiting for their completion, keyed by event pairing key.
+_pending = {}
+_pending_lock = threading.Lock()
+_handlers_registered = False
+
+
+def _start(key, event) -> None:
+    with _pending_lock:
+        _pending[key] = event
+
+
+def _finish(key, event):
+    """Returns (start event, seconds) for the completion event, or (None, None) if unpaired."""
+    with _pending_lock:
+        started = _pending.pop(key, None)
+    if started is None:
+        return None, None
+    return started, max(0.0, (event.timestamp - started.timestamp).total_seconds())
+
+
+def _on_task_started(source, event):
+    if event.task is not None:
+        _start(("task", str(event.task.id)), event)
+
+
+def _on_task_finished(source, event, failed=None):
+    task = getattr(event, "task", None)
+    if task is None:
+        return
+    started, seconds = _finish(("task", str(task.id)), event)
+    if started is not None:
+        record_span("task", started.timestamp, seconds, task=task.name or task.description[:80],
+                    agent=task.agent.role if task.agent else None,
+                    failed=failed)
+
+
+def _on_task_failed(source, event):
+    _on_task_finished(source, event, failed=True)
+
+
+def _message_text(messages) -> str:
+    if isinstance(messages, str):
+        return messages
+    return "\n".join(str(message.get("content", "")) for message in messages or [] if isinstance(message, dict))
+
+
+def _on_llm_started(source, event):
+    _start(("llm", event.call_id), event)
+
+
+def _on_llm_finished(source, event, failed=None):
+    started, seconds = _finish(("llm", event.call_id), event)
+    if started is None:
+        return
+    usage = getattr(event, "usage", None) or {}
+    prompt_tokens = usage.get("prompt_tokens")
+    completion_tokens = usage.get("completion_tokens")
+    estimated = None
+    if not prompt_tokens:
+        # Streamed responses usually carry no usage; estimate from the text instead.
+        from context_budget import count_tokens
+        prompt_tokens = count_tokens(_message_text(started.messages))
+        completion_tokens = count_tokens(str(getattr(event, "response", "") or ""))
+        estimated = True
+    model, agent = event.model, event.agent_role or started.agent_role
+    metrics.inc("analysis_llm_calls_total", model=model, agent=agent)
+    metrics.inc("analysis_llm_tokens_total", prompt_tokens, model=model, agent=agent, type="prompt")
+    metrics.inc("analysis_llm_tokens_total", completion_tokens or 0, model=model, agent=agent, type="completion")
+    record_span("llm_call", started.timestamp, seconds, model=model, agent=agent, task=event.task_name,
+                prompt_tokens=prompt_tokens, completion_tokens=completion_tokens, estimated_tokens=estimated,
+                failed=failed)
+
+
+def _on_llm_failed(source, event):
+    _on_llm_finished(source, event, failed=True)
+
+
+def _tool_key(event) -> tuple:
+    return ("tool", event.task_id, event.agent_id, event.tool_name)
+
+
+def _on_tool_started(source, event):
+    _start(_tool_key(event), event)
+
+
+def _on_tool_finished(source, event, failed=None):
+    started, seconds = _finish(_tool_key(event), event)
+    if started is None:
+        return
+    delegation = DELEGATION_TOOL_MARKER in event.tool_name.lower()
+    if delegation:
+        metrics.inc("analysis_delegations_total", agent=event.agent_role)
+    record_span("delegation" if delegation else "tool", started.timestamp, seconds, tool=event.tool_name,
+                agent=event.agent_role, task=event.task_name,
+                failed=failed)
+
+
+def _on_tool_error(source, event):
+    _on_tool_finished(source, event, failed=True)
+
+
+def _knowledge_key(event) -> tuple:
+    return ("knowledge", event.task_id, event.agent_id)
+
+
+def _on_knowledge_started(source, event):
+    _start(_knowledge_key(event), event)
+
+
+def _on_knowledge_finished(source, event):
+    started, seconds = _finish(_knowledge_key(event), event)
+    if started is not None:
+        record_span("knowledge_retrieval", started.timestamp, seconds, agent=event.agent_role, task=event.task_name)
+
+
+def register_event_handlers():
+    """Records spans for crewai task, LLM, tool and knowledge events; call once crewai is loaded.
+
+    crewai is imported here rather than at module level so the app can time requests
+    (and start serving) before crewai is loaded.
+    """
+    global _handlers_registered
+    with _pending_lock:
+        if _handlers_registered:
+            return
+        from crewai.events import crewai_event_bus
+        from crewai.events.types.knowledge_events import (KnowledgeRetrievalCompletedEvent,
+                                                          KnowledgeRetrievalStartedEvent)
+        from crewai.events.types.llm_events import LLMCallCompletedEvent, LLMCallFailedEvent, LLMCallStartedEvent
+        from crewai.events.types.task_events import TaskCompletedEvent, TaskFailedEvent, TaskStartedEvent
+        from crewai.events.types.tool_usage_events import (ToolUsageErrorEvent, ToolUsageFinishedEvent,
+                                                           ToolUsageStartedEvent)
+        crewai_event_bus.on(TaskStartedEvent)(_on_task_started)
+        crewai_event_bus.on(TaskCompletedEvent)(_on_task_finished)
+        crewai_event_bus.on(TaskFailedEvent)(_on_task_failed)
+        crewai_event_bus.on(LLMCallStartedEvent)(_on_llm_started)
+        crewai_event_bus.on(LLMCallCompletedEvent)(_on_llm_finished)
+        crewai_event_bus.on(LLMCallFailedEvent)(_on_llm_failed)
+        crewai_event_bus.on(ToolUsageStartedEvent)(_on_tool_started)
+        crewai_event_bus.on(ToolUsageFinishedEvent)(_on_tool_finished)
+        crewai_event_bus.on(ToolUsageErrorEvent)(_on_tool_error)
+        crewai_event_bus.on(KnowledgeRetrievalStartedEvent)(_on_knowledge_started)
+        crewai_event_bus.on(KnowledgeRetrievalCompletedEvent)(_on_knowledge_finished)
+        _handlers_registered = True
@@ -0,0 +1,113 @@
+import asyncio
+import hashlib
+import os
+import shutil
+import uuid
+from typing import Optional
+
+from file_hashes import content_hash, remember_content_hash
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def part_path(dest_path: str) -> str:
+    """A temporary path next to dest_path that no other upload of the same name uses."""
+    # Uploads share the event loop's thread, so the thread id would not tell them apart.
+    return f"{dest_path}.{uuid.uuid4().hex}.part"
+
+
+async def upload_chunks(upload, chunk_size: int = CHUNK_SIZE):
+    """Yields an UploadFile's content chunk by chunk."""
+    while chunk := await upload.read(chunk_size):
+        yield chunk
+
+
+async def save_upload(upload, dest_path: str, chunk_size: int = CHUNK_SIZE):
+    """Streams an UploadFile to dest_path in chunks, hashing while writing; see save_stream."""
+    return await save_stream(upload_chunks(upload, chunk_size), dest_path)
+
+
+async def save_stream(chunks, dest_path: str, expected_hash: Optional[str] = None):
+    """Writes an async iterable of byte chunks (e.g. a request body) to dest_path, hashing while writing.
+
+    File I/O and hashing run off the event loop. If dest_path already holds the same
+    content, the new copy is discarded and the existing file (and everything
+    derived from it) is left untouched. With expected_hash, content that hashes
+    differently is discarded and ValueError is raised. Returns (sha256, size, skipped).
+    """
+    digest = hashlib.sha256()
+    size = 0
+    tmp_path = part_path(dest_path)
+    try:
+        buffer = await asyncio.to_thread(open, tmp_path, "wb")
+        try:
+            async for chunk in chunks:
+                size += len(chunk)
+                await asyncio.to_thread(_write_chunk, buffer, digest, chunk)
+        finally:
+            await asyncio.to_thread(buffer.close)
+        file_hash = digest.hexdigest()
+        if expected_hash is not None and file_hash != expected_hash.lower():
+            raise ValueError(f"Content of {os.path.basename(dest_path)} has SHA-256 {file_hash}, "
+                             f"not the announced {expected_hash}.")
+        skipped = await asyncio.to_thread(_commit_part, tmp_path, dest_path, file_hash)
+    except BaseException:
+        await asyncio.to_thread(_discard, tmp_path)
+        raise
+    return file_hash, size, skipped
+
+
+def _write_chunk(buffer, digest, chunk: bytes) -> None:
+    digest.update(chunk)
+    buffer.write(chunk)
+
+
+def _commit_part(tmp_path: str, dest_path: str, file_hash: str) -> bool:
+    """Moves a finished upload into place; returns True (and drops it) if dest_path already has this content."""
+    if os.path.exists(dest_path) and content_hash(dest_path) == file_hash:
+        os.remove(tmp_path)
+        return True
+    os.replace(tmp_path, dest_path)
+    remember_content_hash(dest_path, file_hash)
+    return False
+
+
+def _discard(tmp_path: str) -> None:
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+
+def find_content(file_hash: str, directories: list) -> Optional[str]:
+    """Path of a file in one of the directories (not their subfolders) with this content, if any."""
+    for directory in directories:
+        if not os.path.isdir(directory):
+            continue
+        for entry in os.scandir(directory):
+            if entry.is_file() and not entry.name.startswith(".") and not entry.name.endswith(".part") \
+                    and content_hash(entry.path) == file_hash:
+                return entry.path
+    return None
+
+
+def place_content(file_hash: str, dest_path: str, directories: list) -> Optional[str]:
+    """Puts content the server already has at dest_path without it being uploaded again.
+
+    Returns "present" if dest_path already holds it, "copied" if it was copied
+    there from another file in directories, or None if the content must be uploaded.
+    """
+    file_hash = file_hash.lower()
+    if os.path.isfile(dest_path) and content_hash(dest_path) == file_hash:
+        return "present"
+    source = find_content(file_hash, directories)
+    if source is None:
+        return None
+    tmp_path = part_path(dest_path)
+    try:
+        shutil.copyfile(source, tmp_path)
+        os.replace(tmp_path, dest_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    remember_content_hash(dest_path, file_hash)
+    return "copied"
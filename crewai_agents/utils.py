@@ -1,45 +1,84 @@
-from crewai import Agent, Task, Process, Crew, LLM
+from crewai import Agent, Process, LLM
 from crewai.knowledge.source.csv_knowledge_source import CSVKnowledgeSource
 from crewai.knowledge.source.excel_knowledge_source import ExcelKnowledgeSource
 from crewai.knowledge.source.pdf_knowledge_source import PDFKnowledgeSource
+from crewai.knowledge.knowledge import Knowledge
+from crewai.rag.embeddings.factory import build_embedder
 import yaml
 import os
-from dotenv import load_dotenv
-import json
+from settings import config
+from knowledge_index import (KnowledgeIndexCache, KnowledgeIndexStorage, CachedCSVKnowledgeSource,
+                             CachedExcelKnowledgeSource, CachedPDFKnowledgeSource)
+from file_hashes import content_hash
+from dataset_profile import DatasetProfileStore
+from dataset_tools import DatasetQueryTool, ProcurementKPITool
+from procurement_kpis import KpiMemo
+from schema_index import is_tabular
+from context_budget import BudgetedTask
+from llm_pool import LLMPool
+from llm_memo import LLMCallStore, embedder_model, memo_embedder
+from tracing import register_event_handlers, traced
+from budgets import register_budget_hooks
+from task_graph import ParallelCrew, order_task_configs, task_dependencies
 # from crewai.knowledge.knowledge_config import KnowledgeConfig
 
 # knowledge_config = KnowledgeConfig(results_limit=10, score_threshold=0.5)
 
 
-load_dotenv()
-
-# Load config and setup LLM
-try:
-    with open('config.json') as f:
-        config = json.load(f)
-except FileNotFoundError:
-    raise FileNotFoundError("config.json not found")
-except json.JSONDecodeError:
-    raise json.JSONDecodeError("Invalid JSON in config.json")
-
-llm = LLM(model=config.get("llm_model", "ollama/gemma3"),
-          base_url=config.get("ollama_base_url", "http://localhost:11434"),
-          temperature=config.get("llm_temperature", 0))
+# Deterministic LLM calls are answered from this on-disk memo (see llm_memo.py); "replay" runs offline.
+llm_memo_mode = config.get("llm_memo_mode", "memo")
+llm_memo = (LLMCallStore(config.get("llm_memo_path", ".llm_memo.db"), config.get("llm_memo_max_mb", 256) * 1024 * 1024)
+            if llm_memo_mode != "off" else None)
+# Every agent gets its LLM client from this pool so clients and HTTP connections are shared.
+llm_pool = LLMPool(default_model=config.get("llm_model", "ollama/gemma3"),
+                   base_url=config.get("ollama_base_url", "http://localhost:11434"),
+                   keep_alive=config.get("llm_keep_alive", "30m"),
+                   max_connections=config.get("llm_max_connections", 8),
+                   backends=config.get("llm_backends"),
+                   small_model=config.get("llm_small_model"),
+                   memo=llm_memo, memo_mode=llm_memo_mode)
+llm = llm_pool.get(temperature=config.get("llm_temperature", 0))
+register_event_handlers()
+# Lets per-request deadlines and agent limits (see budgets.py) stop LLM calls and delegations.
+register_budget_hooks()
+# Streaming makes the LLM emit per-token events that /analyze_data/stream forwards.
+llm_stream = config.get("llm_stream", True)
+
+embedder_spec = config.get("embedder", {
+    "provider": "ollama",
+    "config": {"model_name": "nomic-embed-text",
+               "url": config.get("ollama_base_url", "http://localhost:11434") + "/api/embeddings"},
+})
+
+index_cache = KnowledgeIndexCache(config.get("knowledge_index_dir", ".knowledge_index"),
+                                  config.get("knowledge_index_max_mb", 512) * 1024 * 1024)
+
+dataset_profiles = DatasetProfileStore(config.get("columnar_dir", ".columnar"))
+
+# KPI tables shared by every crew, keyed by dataset content so they survive crew rebuilds.
+kpi_memo = KpiMemo(config.get("kpi_memo_max_entries", 256))
 
 # CSV_FILE_PATH = "Procurement KPI Analysis Dataset.csv"
 
-def load_agents(agents_file: str, llm: LLM, knowledge_sources: list):
-    """Loads agent configurations from a YAML file."""
+@traced()
+def load_agents(agents_file: str, llm: LLM, knowledge_sources: list, tools: dict = None):
+    """Loads agent configurations from a YAML file.
+
+    Tool names listed under an agent's `tools` key are looked up in the tools mapping.
+    """
+    tools = tools or {}
     agents = {}
+    knowledge = build_knowledge(knowledge_sources) if knowledge_sources else None
 
     with open(agents_file, 'r') as f:
         agent_configs = yaml.safe_load(f)
         if agent_configs:
             for config in agent_configs:
                 llm_config = config.get("llm_model_config") or {"temperature": 0}
-                agent_llm = LLM(model=config.get("llm_model", llm.model),
-                               base_url=config.get("llm_base_url", llm.base_url),
-                               temperature=llm_config.get("temperature", 0))
+                agent_llm = llm_pool.get(model=config.get("llm_model"),
+                                         base_url=config.get("llm_base_url"),
+                                         temperature=llm_config.get("temperature", 0),
+                                         stream=llm_stream)
                 agent = Agent(
                     role=config['role'],
                     goal=config['goal'],
@@ -47,26 +86,39 @@ def load_agents(agents_file: str, llm: LLM, knowledge_sources: list):
                     llm=agent_llm,
                     verbose=True,
                     allow_delegation=config.get('allow_delegation', True),
-                    knowledge_source = knowledge_sources,
+                    knowledge=knowledge,
+                    tools=[tools[name] for name in config.get('tools', []) if name in tools],
                 )
                 agents[config['name']] = agent
     return agents
 
-def load_tasks(tasks_file: str, agents: dict):
-    """Loads task configurations from a YAML file and associates them with agents."""
+@traced()
+def load_tasks(tasks_file: str, agents: dict, context_token_budget: int = None):
+    """Loads task configurations from a YAML file and associates them with agents.
+
+    A task's `context_tasks` list names the tasks whose output it receives; tasks are
+    returned in dependency order. Its `context_token_budget` key (default: the
+    context_token_budget argument) caps how many tokens of upstream output it receives,
+    and its `llm_model` key (e.g. "small") runs it on another model than its agent's.
+    """
     tasks = {}
     task_list = []
     with open(tasks_file, 'r') as f:
         task_configs = yaml.safe_load(f)
         if task_configs:
-            for config in task_configs:
+            for config in order_task_configs(task_configs):
                 agent_name = config.get('agent_name')
                 if agent_name and agent_name in agents:
-                    task = Task(
+                    task_llm = llm_pool.get(model=config['llm_model'], temperature=agents[agent_name].llm.temperature,
+                                            stream=llm_stream) if config.get('llm_model') else None
+                    task = BudgetedTask(
+                        name=config['name'],
                         description=config['description'],
                         expected_output=config['expected_output'],
                         agent=agents[agent_name],
-                        context=[tasks[config['context_task']]] if config.get('context_task') and config['context_task'] in tasks else []
+                        context=[tasks[name] for name in task_dependencies(config)],
+                        context_token_budget=config.get('context_token_budget', context_token_budget),
+                        llm=task_llm,
                     )
                     tasks[config['name']] = task
                     task_list.append(task)
@@ -75,39 +127,102 @@ def load_tasks(tasks_file: str, agents: dict):
     return task_list
 
 
-def load_knowledge(knowledge_folder: str):
-    """Loads knowledge sources based on files in the knowledge folder."""
-    knowledge = []
-    # csv_files = [os.path.join(knowledge_folder, f) for f in os.listdir(knowledge_folder) if f.endswith(".csv")]
-    # pdf_files = [os.path.join(knowledge_folder, f) for f in os.listdir(knowledge_folder) if f.endswith(".pdf")]
-    # excel_files = [os.path.join(knowledge_folder, f) for f in os.listdir(knowledge_folder) if f.endswith(".xlsx")]
+def embedding_function():
+    """The embedder of embedder_spec, recorded and replayed with the LLM calls so replays need no server."""
+    return memo_embedder(build_embedder(embedder_spec), llm_memo, embedder_model(embedder_spec), llm_memo_mode)
 
-    # if csv_files:
-    knowledge.append(CSVKnowledgeSource(file_paths=knowledge_folder)) 
 
-    # if pdf_files:
-    #     knowledge.append(PDFKnowledgeSource(file_paths=pdf_files)) 
+@traced()
+def build_knowledge(knowledge_sources: list):
+    """Indexes knowledge sources once so all agents share the same cached index."""
+    storage = KnowledgeIndexStorage(embedder=embedding_function())
+    knowledge = Knowledge(collection_name="data_analysis", sources=knowledge_sources, storage=storage)
+    knowledge.add_sources()
+    return knowledge
+
+KNOWLEDGE_SOURCES = {
+    ".csv": CachedCSVKnowledgeSource,
+    ".xlsx": CachedExcelKnowledgeSource,
+    ".pdf": CachedPDFKnowledgeSource,
+}
 
-    # if excel_files:
-    #     knowledge.append(ExcelKnowledgeSource(file_paths=excel_files))
+def as_file_list(knowledge_files):
+    """Accepts a single file name or a sequence of them."""
+    return [knowledge_files] if isinstance(knowledge_files, str) else list(knowledge_files)
+
+@traced()
+def load_knowledge(knowledge_files):
+    """Loads one knowledge source per file in the knowledge folder, so each file is indexed separately."""
+    knowledge = []
+    for file_name in as_file_list(knowledge_files):
+        source_class = KNOWLEDGE_SOURCES.get(os.path.splitext(file_name)[1].lower())
+        if source_class:
+            knowledge.append(source_class(file_paths=file_name, index_cache=index_cache,
+                                          embedder_spec=embedder_spec,
+                                          batch_rows=config.get("knowledge_stream_batch_rows", 10_000),
+                                          batch_bytes=config.get("knowledge_stream_batch_mb", 4) << 20))
     if not knowledge:
         raise ValueError("No valid knowledge sources found in the specified folder.")
 
     return knowledge
 
-def create_data_analysis_crew(knowledge_folder: str):
+@traced()
+def load_tools(knowledge_files):
+    """Builds the tools agents can reference by name in agents.yml."""
+    profiles = {file_name: dataset_profiles.get(os.path.join("knowledge", file_name))
+                for file_name in as_file_list(knowledge_files) if is_tabular(file_name)}
+    if not profiles:
+        return {}
+    return {"dataset_query": DatasetQueryTool(profiles=profiles),
+            "procurement_kpis": ProcurementKPITool(profiles=profiles, memo=kpi_memo)}
+
+@traced()
+def create_data_analysis_crew(knowledge_files):
     """Creates the data analysis crew with dynamic knowledge sources."""
     agents_file =  config['agent_name']
     tasks_file = config['task_name']
-    knowledge_sources = load_knowledge(knowledge_folder)
-    agents = load_agents(agents_file, llm, knowledge_sources)
-    tasks = load_tasks(tasks_file, agents)
+    knowledge_sources = load_knowledge(knowledge_files)
+    tools = load_tools(knowledge_files)
+    agents = load_agents(agents_file, llm, knowledge_sources, tools)
+    tasks = load_tasks(tasks_file, agents, config.get("context_token_budget"))
 
-    data_analysis_crew = Crew(
+    data_analysis_crew = ParallelCrew(
         agents=list(agents.values()),
         tasks=tasks,
         process=Process.sequential,
+        max_parallel_tasks=config.get("max_parallel_tasks", 4),
         verbose=True
     )
     return data_analysis_crew
 
+def crew_memory_bytes(crew) -> int:
+    """Approximate memory held by a crew's knowledge indexes (agents share theirs)."""
+    storages = {id(agent.knowledge.storage): agent.knowledge.storage for agent in crew.agents
+                if agent.knowledge is not None}
+    return sum(storage.nbytes() for storage in storages.values() if isinstance(storage, KnowledgeIndexStorage))
+
+def configured_models(agents_file: str = None):
+    """Lists the default model and any per-agent or per-task models in agents.yml and tasks.yml."""
+    models = [llm_pool.default_model]
+    for file_name in (agents_file or config['agent_name'], config['task_name']):
+        with open(file_name, 'r') as f:
+            for item_config in yaml.safe_load(f) or []:
+                model = item_config.get("llm_model") and llm_pool.resolve_model(item_config["llm_model"])
+                if model and model not in models:
+                    models.append(model)
+    return models
+
+def crew_source_files(knowledge_files):
+    """Lists the files a crew built by create_data_analysis_crew depends on."""
+    return [config['agent_name'], config['task_name']] + [
+        os.path.join("knowledge", file_name) for file_name in as_file_list(knowledge_files)]
+
+def crew_fingerprint():
+    """Identifies the crew configuration (YAML files and model settings) an answer was produced with."""
+    return {
+        "agents": content_hash(config['agent_name']),
+        "tasks": content_hash(config['task_name']),
+        "llm": [llm_pool.default_model, llm_pool.small_model, llm.base_url, llm.temperature],
+        "embedder": embedder_spec,
+        "context_token_budget": config.get("context_token_budget"),
+    }